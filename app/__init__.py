@@ -1,21 +1,11 @@
 from flask import Flask
 from flask_pymongo import PyMongo
 from app.config import config
-from bson import ObjectId
-import json
+from app.json_provider import MongoJSONProvider
 
 # Initialize PyMongo extension
 mongo = PyMongo()
 
-# Custom JSON encoder to handle MongoDB ObjectId
-class MongoJSONEncoder(json.JSONEncoder):
-    def default(self, obj):
-        if isinstance(obj, ObjectId):
-            return str(obj)
-        if hasattr(obj, 'isoformat'):  # Handle datetime objects
-            return obj.isoformat()
-        return super(MongoJSONEncoder, self).default(obj)
-
 def create_app(config_name='default'):
     """
     Application factory pattern to create Flask app instance
@@ -33,11 +23,17 @@ def create_app(config_name='default'):
     if not app.config.get('SECRET_KEY'):
         app.config['SECRET_KEY'] = 'dev-key-for-recipe-platform'
     
-    # Custom JSON encoder for MongoDB ObjectId
-    app.json_encoder = MongoJSONEncoder
+    # JSON provider that encodes ObjectId, datetime and Decimal128 values
+    app.json = MongoJSONProvider(app)
+    
+    # Initialize extensions; the monitor attributes every MongoDB command to its request
+    from app.services import command_monitor
+    monitor = command_monitor.CommandMonitor(app)
+    mongo.init_app(app, event_listeners=[monitor])
+    command_monitor.init_app(app, monitor)
     
-    # Initialize extensions
-    mongo.init_app(app)
+    from app.services import identity_map
+    identity_map.init_app(app)
     
     # Register blueprints
     from app.views.main import main_bp
@@ -54,6 +50,10 @@ def create_app(config_name='default'):
     # Register context processors
     register_template_context(app)
     
+    # Register CLI commands
+    from app.commands import register_commands
+    register_commands(app)
+    
     return app
 
 def register_error_handlers(app):
@@ -0,0 +1,98 @@
+import click
+from app import mongo
+from app.config import Config
+from app.models.recipe import Recipe
+from app.models.comment import CommentBucket
+from app.models.user import User
+
+
+def register_commands(app):
+    """Register maintenance CLI commands with the Flask application."""
+
+    @app.cli.command('create-indexes')
+    def create_indexes():
+        """Create MongoDB indexes for all collections."""
+        Recipe.create_indexes(mongo.db[Config.RECIPES_COLLECTION])
+        User.create_indexes(mongo.db[Config.USERS_COLLECTION])
+        CommentBucket.create_indexes(mongo.db[Config.COMMENTS_COLLECTION])
+        click.echo("Indexes created")
+
+    @app.cli.command('rebuild-ratings')
+    def rebuild_ratings():
+        """Recompute denormalized rating aggregates for every recipe."""
+        from app.services.recipe_service import RecipeService
+        modified = RecipeService().rebuild_rating_aggregates()
+        click.echo(f"Updated rating aggregates on {modified} recipes")
+
+    @app.cli.command('rebuild-stats')
+    def rebuild_stats():
+        """Rebuild the materialized recipe statistics snapshot."""
+        from app.services.recipe_service import RecipeService
+        snapshot = RecipeService().rebuild_recipe_stats()
+        click.echo(f"Rebuilt statistics snapshot for {snapshot['total_recipes']} recipes "
+                   f"(version {snapshot['version']})")
+
+    @app.cli.command('import-recipes')
+    @click.argument('source', type=click.File('rb'))
+    @click.option('--batch-size', default=Config.INGEST_BATCH_SIZE, show_default=True,
+                  help='Number of recipes inserted per batch.')
+    @click.option('--checkpoint', type=click.Path(dir_okay=False),
+                  help='File recording the last imported line; an existing one resumes after it.')
+    @click.option('--user-id', help='Attribute the imported recipes to this user.')
+    def import_recipes(source, batch_size, checkpoint, user_id):
+        """Bulk import recipes from an NDJSON file ('-' for stdin)."""
+        import os
+        from app.services.ingest_service import IngestService
+        start_line = 0
+        if checkpoint and os.path.exists(checkpoint):
+            with open(checkpoint) as handle:
+                start_line = int(handle.read().strip() or 0)
+            click.echo(f"Resuming after line {start_line}")
+        totals = {"received": 0, "inserted": 0, "existing": 0, "failed": 0}
+        for batch in IngestService().ingest(source, start_line, batch_size, user_id):
+            for error in batch["errors"]:
+                click.echo(f"line {error['line']}: {'; '.join(error['errors'])}", err=True)
+            for key in totals:
+                totals[key] += batch[key]
+            if checkpoint:
+                # Replace atomically so an interrupted run never leaves a torn checkpoint
+                with open(f"{checkpoint}.tmp", 'w') as handle:
+                    handle.write(str(batch["checkpoint"]))
+                os.replace(f"{checkpoint}.tmp", checkpoint)
+        click.echo(f"Imported {totals['inserted']} of {totals['received']} recipes "
+                   f"({totals['existing']} already imported, {totals['failed']} rejected)")
+
+    @app.cli.command('migrate-comments')
+    @click.option('--batch-size', default=Config.MIGRATION_BATCH_SIZE, show_default=True,
+                  help='Number of recipes migrated per batch.')
+    def migrate_comments(batch_size):
+        """Move comments embedded in recipes into the bucketed comments collection."""
+        from app.services.comment_service import CommentService
+        result = CommentService().migrate_embedded_comments(batch_size)
+        click.echo(f"Migrated {result['comments']} comments from {result['recipes']} recipes")
+
+    @app.cli.command('rebuild-comment-counts')
+    @click.option('--batch-size', default=Config.MIGRATION_BATCH_SIZE, show_default=True,
+                  help='Number of users updated per batch.')
+    def rebuild_comment_counts(batch_size):
+        """Backfill per-user comment counters from the comments collection."""
+        from app.services.user_service import UserService
+        updated = UserService().rebuild_comment_counts(batch_size)
+        click.echo(f"Updated comment counters on {updated} users")
+
+    @app.cli.command('refresh-recommendations')
+    @click.option('--batch-size', default=Config.MIGRATION_BATCH_SIZE, show_default=True,
+                  help='Number of recommendation lists read per batch.')
+    @click.option('--interval', default=0, type=int,
+                  help='Keep running, checking for recipe changes every N seconds.')
+    def refresh_recommendations(batch_size, interval):
+        """Regenerate recommendation lists computed against an older recipe corpus."""
+        import time
+        from app.services.recommendation_service import RecommendationService
+        service = RecommendationService()
+        while True:
+            refreshed = service.refresh_stale(batch_size)
+            click.echo(f"Refreshed {refreshed} recommendation lists")
+            if not interval:
+                break
+            time.sleep(interval)
@@ -9,16 +9,52 @@ class Config:
     TESTING = False
     RECIPES_COLLECTION = 'recipes'
     USERS_COLLECTION = 'users'
+    STATS_COLLECTION = 'recipe_stats'
+    COMMENTS_COLLECTION = 'comments'
+    RECOMMENDATIONS_COLLECTION = 'user_recommendations'
     API_TITLE = 'Recipe Discovery Platform API'
     API_VERSION = 'v1'
     DEFAULT_PAGE_SIZE = 10
     MAX_PAGE_SIZE = 100
-    CACHE_TYPE = 'SimpleCache'
+    JSON_STREAM_CHUNK_SIZE = 100
+    EXPORT_BATCH_SIZE = 500
+    # Serve JSON listings by converting raw BSON straight to JSON bytes
+    RAW_JSON_RESPONSES = os.environ.get('RAW_JSON_RESPONSES', 'false').lower() == 'true'
+    CACHE_TYPE = os.environ.get('CACHE_TYPE', 'SimpleCache')  # SimpleCache or RedisCache
     CACHE_DEFAULT_TIMEOUT = 300
+    CACHE_MAX_ENTRIES = 10000
+    CACHE_REDIS_URL = os.environ.get('CACHE_REDIS_URL', 'redis://localhost:6379/0')
+    QUERY_POOL_SIZE = int(os.environ.get('QUERY_POOL_SIZE', 8))
+    SEARCH_COUNT_MODE = os.environ.get('SEARCH_COUNT_MODE', 'cached')  # exact, cached or capped
+    SEARCH_COUNT_CACHE_TTL = 60
+    SEARCH_COUNT_CACHE_SIZE = 1024
+    SEARCH_COUNT_CAP = 1000
+    COMMENTS_BUCKET_SIZE = 50
+    COMMENTS_PAGE_SIZE = 10
+    RECENT_COMMENTS_LIMIT = 10
+    MIGRATION_BATCH_SIZE = 500
+    INGEST_BATCH_SIZE = 1000
+    RECOMMENDATIONS_LIMIT = 200
+    RECOMMENDATIONS_MAX_AGE = 86400
+    SIMILARITY_INDEX_ENABLED = os.environ.get('SIMILARITY_INDEX_ENABLED', 'true').lower() == 'true'
+    SIMILARITY_INDEX_TTL = 300
+    SIMILARITY_INDEX_REBUILD_INTERVAL = 3600
+    SIMILARITY_POSTINGS_CAP = 5000
+    VOCABULARY_TTL = 60
+    FACET_TAG_LIMIT = 30
+    SLOW_QUERY_MS = int(os.environ.get('SLOW_QUERY_MS', 100))
+    # Count reply sizes in the command stats (re-encodes every reply)
+    MONGO_COMMAND_BYTES = os.environ.get('MONGO_COMMAND_BYTES', 'false').lower() == 'true'
+    FACET_COOKING_TIME_LIMITS = [15, 30, 45, 60]
+    RATING_MIN = 1
+    RATING_MAX = 5
+    RATING_PRIOR_MEAN = 3.0
+    RATING_PRIOR_WEIGHT = 5
 
 class DevelopmentConfig(Config):
     """Development environment configuration"""
     DEBUG = True
+    MONGO_COMMAND_BYTES = True
     
 class TestingConfig(Config):
     """Testing environment configuration"""
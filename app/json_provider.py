@@ -0,0 +1,107 @@
+import datetime
+import decimal
+import json
+from typing import Any, Callable, Iterable, Iterator, Optional
+from bson import ObjectId, Decimal128
+from flask import Response, current_app, stream_with_context
+from flask.json.provider import JSONProvider
+from app.config import Config
+
+try:
+    import orjson
+except ImportError:  # falls back to the standard library encoder
+    orjson = None
+
+
+def _default(obj: Any) -> Any:
+    """Encode the BSON and Python types MongoDB documents contain"""
+    if isinstance(obj, ObjectId):
+        return str(obj)
+    if isinstance(obj, (datetime.datetime, datetime.date)):
+        return obj.isoformat()
+    if isinstance(obj, Decimal128):
+        # Strings keep the full decimal precision
+        return str(obj.to_decimal())
+    if isinstance(obj, decimal.Decimal):
+        return str(obj)
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+class MongoJSONProvider(JSONProvider):
+    """JSON provider that encodes ObjectId, datetime and Decimal128 values natively
+
+    Uses orjson when it is installed and the standard library otherwise.
+    Documents can be passed to jsonify() as they come from MongoDB,
+    without converting them field by field first.
+    """
+
+    mimetype = 'application/json'
+
+    def dumps(self, obj: Any, **kwargs: Any) -> str:
+        if orjson is not None and not kwargs:
+            return self.dumps_bytes(obj).decode('utf-8')
+        kwargs.setdefault('default', _default)
+        kwargs.setdefault('ensure_ascii', False)
+        return json.dumps(obj, **kwargs)
+
+    def dumps_bytes(self, obj: Any) -> bytes:
+        """Serialize to UTF-8 encoded JSON, skipping the str round trip with orjson"""
+        if orjson is not None:
+            return orjson.dumps(obj, default=_default, option=orjson.OPT_NON_STR_KEYS)
+        return json.dumps(obj, default=_default, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+    def loads(self, s: Any, **kwargs: Any) -> Any:
+        if orjson is not None and not kwargs:
+            return orjson.loads(s)
+        return json.loads(s, **kwargs)
+
+    def response(self, *args: Any, **kwargs: Any) -> Response:
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(self.dumps_bytes(obj), mimetype=self.mimetype)
+
+
+def stream_array(items: Iterable[Any], serialize: Optional[Callable[[Any], Any]] = None,
+                 chunk_size: Optional[int] = None) -> Response:
+    """Stream an iterable as a JSON array without building it in memory
+
+    The response has no Content-Length, so the server sends it chunked.
+    Items are encoded in groups of chunk_size to keep the number of
+    writes down. Items that serialize to bytes are taken as already
+    encoded JSON. The request context stays available while the body is
+    generated.
+    """
+    provider = current_app.json
+    chunk_size = chunk_size or Config.JSON_STREAM_CHUNK_SIZE
+
+    def generate() -> Iterator[bytes]:
+        yield b'['
+        separator = b''
+        chunk = []
+        for item in items:
+            value = serialize(item) if serialize else item
+            chunk.append(value if isinstance(value, bytes) else provider.dumps_bytes(value))
+            if len(chunk) >= chunk_size:
+                yield separator + b','.join(chunk)
+                separator = b','
+                chunk = []
+        if chunk:
+            yield separator + b','.join(chunk)
+        yield b']'
+
+    return current_app.response_class(stream_with_context(generate()), mimetype=provider.mimetype)
+
+
+def stream_lines(items: Iterable[Any]) -> Response:
+    """Stream an iterable as newline-delimited JSON, one document per item
+
+    Each line is sent as soon as its item is produced, so a client sees
+    progress on a long-running request and keeps everything received
+    before a dropped connection.
+    """
+    provider = current_app.json
+
+    def generate() -> Iterator[bytes]:
+        for item in items:
+            yield provider.dumps_bytes(item) + b'\n'
+
+    return current_app.response_class(stream_with_context(generate()), mimetype='application/x-ndjson')
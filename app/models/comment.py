@@ -0,0 +1,65 @@
+from datetime import datetime
+from bson import ObjectId
+from typing import Dict, List, Optional, Any
+
+class CommentBucket:
+    """Comment bucket model: a fixed-size page of one recipe's comments"""
+
+    def __init__(self,
+                 recipe_id: str,
+                 seq: int,
+                 comments: Optional[List[Dict[str, Any]]] = None,
+                 created_at: Optional[datetime] = None,
+                 updated_at: Optional[datetime] = None,
+                 _id: Optional[str] = None):
+        """
+        Initialize a CommentBucket object
+
+        Args:
+            recipe_id: ID of the recipe the comments belong to
+            seq: Bucket sequence number, starting at 0 for the oldest comments
+            comments: Comments in the order they were posted
+            created_at: Creation timestamp (optional)
+            updated_at: Last update timestamp (optional)
+            _id: MongoDB ObjectID (optional)
+        """
+        self.recipe_id = recipe_id
+        self.seq = seq
+        self.comments = comments or []
+        self.created_at = created_at or datetime.utcnow()
+        self.updated_at = updated_at or datetime.utcnow()
+        self._id = str(ObjectId()) if _id is None else _id
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Convert CommentBucket object to dictionary for MongoDB storage"""
+        return {
+            "_id": ObjectId(self._id) if isinstance(self._id, str) else self._id,
+            "recipe_id": ObjectId(self.recipe_id) if isinstance(self.recipe_id, str) else self.recipe_id,
+            "seq": self.seq,
+            "count": len(self.comments),
+            "comments": self.comments,
+            "created_at": self.created_at,
+            "updated_at": self.updated_at
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'CommentBucket':
+        """Create CommentBucket object from MongoDB document"""
+        if data is None:
+            return None
+        return cls(
+            recipe_id=str(data.get('recipe_id')) if data.get('recipe_id') else None,
+            seq=data.get('seq', 0),
+            comments=data.get('comments', []),
+            created_at=data.get('created_at'),
+            updated_at=data.get('updated_at'),
+            _id=str(data.get('_id')) if data.get('_id') else None
+        )
+
+    @classmethod
+    def create_indexes(cls, collection):
+        """Create MongoDB indexes for comments collection"""
+        collection.create_index([
+            ("recipe_id", 1),
+            ("seq", -1)
+        ], unique=True, name="recipe_comment_buckets_index")
@@ -0,0 +1,138 @@
+from typing import Any, Callable, Dict, Iterable, Optional, Tuple
+from bson import ObjectId
+
+
+def to_object_id(value: Any) -> Any:
+    """Encoder for id fields held as strings on the model"""
+    return ObjectId(value) if isinstance(value, str) else value
+
+
+class Field:
+    """Model attribute decoded from the wrapped MongoDB document on first access
+
+    A non-data descriptor: the first read stores the value in the instance
+    __dict__, which shadows the descriptor, so every later read is a plain
+    attribute lookup. Assignments go straight to the __dict__ as well.
+
+    load    -- builds the attribute value from the whole document (defaults
+               to decode() of the document key)
+    decode  -- converts the stored value, e.g. ObjectId to str
+    encode  -- converts the attribute value back for storage
+    default -- factory for a key missing from the document
+    """
+
+    __slots__ = ('name', 'load', 'decode', 'encode', 'default')
+
+    def __init__(self,
+                 decode: Optional[Callable[[Any], Any]] = None,
+                 encode: Optional[Callable[[Any], Any]] = None,
+                 default: Optional[Callable[[], Any]] = None,
+                 load: Optional[Callable[[Dict[str, Any]], Any]] = None):
+        self.name = None
+        self.decode = decode
+        self.encode = encode
+        self.default = default
+        self.load = load
+
+    def __set_name__(self, owner: type, name: str) -> None:
+        self.name = name
+
+    def __get__(self, instance: Any, owner: Optional[type] = None) -> Any:
+        if instance is None:
+            return self
+        if self.load is not None:
+            value = self.load(instance._doc)
+        else:
+            value = instance._doc.get(self.name)
+            if value is None:
+                value = self.default() if self.default is not None else None
+            elif self.decode is not None:
+                value = self.decode(value)
+        instance.__dict__[self.name] = value
+        return value
+
+    def copy(self) -> 'Field':
+        field = Field(self.decode, self.encode, self.default, self.load)
+        field.name = self.name
+        return field
+
+
+class Document:
+    """Model wrapping a raw MongoDB document
+
+    from_dict() keeps a reference to the document and a field is decoded
+    the first time it is read. to_dict() and to_api_dict() copy fields that
+    were never read or set straight from the document instead of
+    re-encoding them. Fields read without a decoder are the document's own
+    objects, so in-place changes show up either way. The wrapped document
+    is shared with its source and is never modified.
+
+    Decoded values live in the instance __dict__, not in per-field slots.
+    The saving is in never decoding unread fields, not in a smaller
+    instance: once fields are read the model holds about as much as an
+    eagerly built one. Slots would save a few bytes per model but turn
+    every first read into a slot miss handled by __getattr__, which
+    doubles the cost of reading card fields.
+    """
+
+    __slots__ = ('_doc', '__dict__')
+    # Fields returned by to_api_dict, all of them when None
+    API_FIELDS: Optional[Tuple[str, ...]] = None
+    _fields: Dict[str, Field] = {}
+    _api_fields: Tuple[Field, ...] = ()
+
+    def __init_subclass__(cls, **kwargs: Any):
+        super().__init_subclass__(**kwargs)
+        fields = {}
+        for base in reversed(cls.__mro__[1:]):
+            fields.update(getattr(base, '_fields', {}))
+        for name, field in list(fields.items()):
+            if name not in vars(cls):
+                # Each class owns its descriptors, so a subclass never changes its parent's
+                fields[name] = field.copy()
+                setattr(cls, name, fields[name])
+        fields.update((name, value) for name, value in vars(cls).items() if isinstance(value, Field))
+        cls._fields = fields
+        cls._api_fields = tuple(fields[name] for name in (cls.API_FIELDS or fields))
+
+    def __new__(cls, *args: Any, **kwargs: Any):
+        instance = super().__new__(cls)
+        instance._doc = {}
+        return instance
+
+    @classmethod
+    def wrap(cls, data: Optional[Dict[str, Any]]) -> Any:
+        """Model over a loaded document, without decoding any field yet"""
+        if data is None:
+            return None
+        instance = object.__new__(cls)
+        instance._doc = data
+        return instance
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Fields in their stored form"""
+        return self._export(self._fields.values(), True)
+
+    def to_api_dict(self) -> Dict[str, Any]:
+        """Fields for API responses; ids and dates are left to the JSON provider"""
+        return self._export(self._api_fields, False)
+
+    def _export(self, fields: Iterable[Field], encode: bool) -> Dict[str, Any]:
+        doc = self._doc
+        values = self.__dict__
+        result = {}
+        for field in fields:
+            name = field.name
+            if name in values:
+                value = values[name]
+            else:
+                # Never read or set, so the stored value can be used as is
+                value = field.load(doc) if field.load is not None else doc.get(name)
+                if value is not None:
+                    result[name] = value
+                    continue
+                value = getattr(self, name)
+            if encode and field.encode is not None and value is not None:
+                value = field.encode(value)
+            result[name] = value
+        return result
@@ -1,10 +1,54 @@
 from datetime import datetime
 from bson import ObjectId
-from typing import Dict, List, Optional, Any, Union
+from typing import Dict, List, Optional, Any, Tuple, Union
+from app.config import Config
+from app.models.document import Document, Field, to_object_id
 
-class Recipe:
+# Rules of the recipes collection's $jsonSchema validator
+REQUIRED_FIELDS = ('name', 'ingredients', 'instructions', 'cuisine', 'difficulty')
+DIFFICULTIES = ('Easy', 'Medium', 'Hard')
+
+def _recent_comments(data: Dict[str, Any]) -> List[Dict[str, Any]]:
+    if data.get('comment_count') is None:
+        # Document not yet migrated to the comments collection
+        return (data.get('comments') or [])[-Config.RECENT_COMMENTS_LIMIT:]
+    return data.get('recent_comments') or []
+
+def _comment_count(data: Dict[str, Any]) -> int:
+    comment_count = data.get('comment_count')
+    return len(data.get('comments') or []) if comment_count is None else comment_count
+
+def _rating_aggregate(index: int):
+    def load(data: Dict[str, Any]) -> Any:
+        if data.get('ratings_count') is None:
+            return Recipe.rating_aggregates(data.get('user_ratings'))[index]
+        return data.get(('average_rating', 'ratings_count', 'weighted_rating')[index])
+    return load
+
+class Recipe(Document):
     """Recipe data model representing MongoDB document structure"""
     
+    _id = Field(decode=str, encode=to_object_id)
+    name = Field()
+    ingredients = Field(default=list)
+    instructions = Field(default=list)
+    cuisine = Field()
+    difficulty = Field()
+    preparation_time = Field()
+    cooking_time = Field()
+    nutritional_info = Field(default=dict)
+    tags = Field(default=list)
+    image_url = Field()
+    user_id = Field(decode=str, encode=to_object_id)
+    user_ratings = Field(default=list)
+    recent_comments = Field(load=_recent_comments)
+    comment_count = Field(load=_comment_count)
+    average_rating = Field(load=_rating_aggregate(0))
+    ratings_count = Field(load=_rating_aggregate(1))
+    weighted_rating = Field(load=_rating_aggregate(2))
+    created_at = Field()
+    updated_at = Field()
+    
     def __init__(self, 
                  name: str,
                  ingredients: List[Dict[str, str]],
@@ -18,7 +62,11 @@ class Recipe:
                  image_url: Optional[str] = None,
                  user_id: Optional[str] = None,
                  user_ratings: Optional[List[Dict[str, Any]]] = None,
-                 comments: Optional[List[Dict[str, Any]]] = None,
+                 recent_comments: Optional[List[Dict[str, Any]]] = None,
+                 comment_count: int = 0,
+                 average_rating: Optional[float] = None,
+                 ratings_count: Optional[int] = None,
+                 weighted_rating: Optional[float] = None,
                  created_at: Optional[datetime] = None,
                  updated_at: Optional[datetime] = None,
                  _id: Optional[str] = None):
@@ -38,7 +86,11 @@ class Recipe:
             image_url: URL to recipe image (optional)
             user_id: ID of the user who created the recipe (optional)
             user_ratings: List of user ratings (optional)
-            comments: List of user comments (optional)
+            recent_comments: Newest comments, the rest live in the comments collection (optional)
+            comment_count: Total number of comments (optional)
+            average_rating: Mean of user ratings (optional, derived from user_ratings)
+            ratings_count: Number of user ratings (optional, derived from user_ratings)
+            weighted_rating: Bayesian-weighted rating used for ranking (optional)
             created_at: Creation timestamp (optional)
             updated_at: Last update timestamp (optional)
             _id: MongoDB ObjectID (optional)
@@ -55,95 +107,55 @@ class Recipe:
         self.image_url = image_url
         self.user_id = user_id
         self.user_ratings = user_ratings or []
-        self.comments = comments or []
+        self.recent_comments = recent_comments or []
+        self.comment_count = comment_count
+        if ratings_count is None:
+            average_rating, ratings_count, weighted_rating = self.rating_aggregates(self.user_ratings)
+        self.average_rating = average_rating
+        self.ratings_count = ratings_count
+        self.weighted_rating = weighted_rating
         self.created_at = created_at or datetime.utcnow()
         self.updated_at = updated_at or datetime.utcnow()
         self._id = str(ObjectId()) if _id is None else _id
     
-    def to_dict(self) -> Dict[str, Any]:
-        """Convert Recipe object to dictionary for MongoDB storage"""
-        user_id_obj = ObjectId(self.user_id) if self.user_id and isinstance(self.user_id, str) else self.user_id
-        
-        return {
-            "_id": ObjectId(self._id) if isinstance(self._id, str) else self._id,
-            "name": self.name,
-            "ingredients": self.ingredients,
-            "instructions": self.instructions,
-            "cuisine": self.cuisine,
-            "difficulty": self.difficulty,
-            "preparation_time": self.preparation_time,
-            "cooking_time": self.cooking_time,
-            "nutritional_info": self.nutritional_info,
-            "tags": self.tags,
-            "image_url": self.image_url,
-            "user_id": user_id_obj,
-            "user_ratings": self.user_ratings,
-            "comments": self.comments,
-            "created_at": self.created_at,
-            "updated_at": self.updated_at
-        }
-        
-    def to_api_dict(self) -> Dict[str, Any]:
-        """Convert Recipe object to dictionary for API responses with string IDs"""
-        return {
-            "_id": str(self._id),
-            "name": self.name,
-            "ingredients": self.ingredients,
-            "instructions": self.instructions,
-            "cuisine": self.cuisine,
-            "difficulty": self.difficulty,
-            "preparation_time": self.preparation_time,
-            "cooking_time": self.cooking_time,
-            "nutritional_info": self.nutritional_info,
-            "tags": self.tags,
-            "image_url": self.image_url,
-            "user_id": str(self.user_id) if self.user_id else None,
-            "user_ratings": self._convert_ids_to_str(self.user_ratings),
-            "comments": self._convert_ids_to_str(self.comments),
-            "created_at": self.created_at.isoformat() if self.created_at else None,
-            "updated_at": self.updated_at.isoformat() if self.updated_at else None
-        }
-    
     @staticmethod
-    def _convert_ids_to_str(items: List[Dict]) -> List[Dict]:
-        """Convert ObjectId values to strings in a list of dictionaries"""
-        if not items:
-            return []
-            
-        result = []
-        for item in items:
-            item_copy = item.copy()
-            for key, value in item_copy.items():
-                if isinstance(value, ObjectId):
-                    item_copy[key] = str(value)
-                elif hasattr(value, 'isoformat'):
-                    item_copy[key] = value.isoformat()
-            result.append(item_copy)
-        return result
+    def rating_aggregates(ratings: List[Dict[str, Any]]) -> Tuple[Optional[float], int, float]:
+        """Compute average, count and Bayesian-weighted score for a list of ratings"""
+        values = [r["rating"] for r in ratings or []]
+        total = sum(values)
+        count = len(values)
+        average = total / count if count else None
+        weighted = (Config.RATING_PRIOR_MEAN * Config.RATING_PRIOR_WEIGHT + total) / (Config.RATING_PRIOR_WEIGHT + count)
+        return average, count, weighted
     
     @classmethod
     def from_dict(cls, data: Dict[str, Any]) -> 'Recipe':
-        """Create Recipe object from MongoDB document"""
-        if data is None:
-            return None
-        return cls(
-            name=data.get('name'),
-            ingredients=data.get('ingredients', []),
-            instructions=data.get('instructions', []),
-            cuisine=data.get('cuisine'),
-            difficulty=data.get('difficulty'),
-            preparation_time=data.get('preparation_time'),
-            cooking_time=data.get('cooking_time'),
-            nutritional_info=data.get('nutritional_info', {}),
-            tags=data.get('tags', []),
-            image_url=data.get('image_url'),
-            user_id=str(data.get('user_id')) if data.get('user_id') else None,
-            user_ratings=data.get('user_ratings', []),
-            comments=data.get('comments', []),
-            created_at=data.get('created_at'),
-            updated_at=data.get('updated_at'),
-            _id=str(data.get('_id')) if data.get('_id') else None
-        )
+        """Create Recipe object from MongoDB document, decoding fields on first access"""
+        return cls.wrap(data)
+
+    @staticmethod
+    def validation_errors(data: Dict[str, Any]) -> List[str]:
+        """Violations of the recipes collection's $jsonSchema (docker/mongo/init-mongo.js)"""
+        errors = [f"'{field}' is required" for field in REQUIRED_FIELDS if data.get(field) is None]
+        for field in ('name', 'cuisine', 'difficulty'):
+            if data.get(field) is not None and not isinstance(data[field], str):
+                errors.append(f"'{field}' must be a string")
+        if data.get('difficulty') is not None and data['difficulty'] not in DIFFICULTIES:
+            errors.append(f"'difficulty' must be one of {', '.join(DIFFICULTIES)}")
+        ingredients = data.get('ingredients')
+        if ingredients is not None:
+            if not isinstance(ingredients, list):
+                errors.append("'ingredients' must be an array")
+            elif not all(isinstance(item, dict) and isinstance(item.get('name'), str)
+                         and isinstance(item.get('quantity'), str) for item in ingredients):
+                errors.append("'ingredients' items must have string 'name' and 'quantity'")
+        instructions = data.get('instructions')
+        if instructions is not None:
+            if not isinstance(instructions, list):
+                errors.append("'instructions' must be an array")
+            elif not all(isinstance(step, str) for step in instructions):
+                errors.append("'instructions' items must be strings")
+        return errors
 
     @classmethod
     def create_indexes(cls, collection):
@@ -157,4 +169,99 @@ class Recipe:
         collection.create_index("difficulty")
         collection.create_index("tags")
         collection.create_index("user_id")
-        collection.create_index("created_at")
\ No newline at end of file
+        collection.create_index("created_at")
+        collection.create_index("updated_at")
+        collection.create_index([
+            ("weighted_rating", -1),
+            ("ratings_count", -1)
+        ], name="popular_recipes_index")
+        collection.create_index([
+            ("created_at", -1),
+            ("_id", -1)
+        ], name="recent_recipes_index")
+        collection.create_index([
+            ("user_id", 1),
+            ("created_at", -1),
+            ("_id", -1)
+        ], name="user_recent_recipes_index")
+        collection.create_index([
+            ("cuisine", 1),
+            ("created_at", -1),
+            ("_id", -1)
+        ], name="cuisine_recent_recipes_index")
+
+
+class RecipeSummary(Document):
+    """Lightweight recipe model holding only the fields rendered on recipe cards"""
+    
+    # Fixed projection for list and card queries. Leaves out the unbounded
+    # embedded arrays (comments, user_ratings) and the full instructions.
+    PROJECTION = {
+        "name": 1,
+        "cuisine": 1,
+        "difficulty": 1,
+        "preparation_time": 1,
+        "cooking_time": 1,
+        "tags": 1,
+        "image_url": 1,
+        "nutritional_info.calories": 1,
+        "average_rating": 1,
+        "ratings_count": 1,
+        "weighted_rating": 1,
+        "user_id": 1,
+        "created_at": 1,
+        "updated_at": 1
+    }
+    
+    _id = Field(decode=str, encode=to_object_id)
+    name = Field()
+    cuisine = Field()
+    difficulty = Field()
+    preparation_time = Field()
+    cooking_time = Field()
+    tags = Field(default=list)
+    image_url = Field()
+    nutritional_info = Field(default=dict)
+    average_rating = Field()
+    ratings_count = Field(default=int)
+    weighted_rating = Field()
+    user_id = Field(decode=str, encode=to_object_id)
+    created_at = Field()
+    updated_at = Field()
+    
+    def __init__(self,
+                 name: str,
+                 cuisine: str,
+                 difficulty: str,
+                 preparation_time: int,
+                 cooking_time: int,
+                 tags: List[str],
+                 image_url: Optional[str] = None,
+                 nutritional_info: Optional[Dict[str, Union[int, float]]] = None,
+                 average_rating: Optional[float] = None,
+                 ratings_count: int = 0,
+                 weighted_rating: Optional[float] = None,
+                 user_id: Optional[str] = None,
+                 created_at: Optional[datetime] = None,
+                 updated_at: Optional[datetime] = None,
+                 _id: Optional[str] = None):
+        self.name = name
+        self.cuisine = cuisine
+        self.difficulty = difficulty
+        self.preparation_time = preparation_time
+        self.cooking_time = cooking_time
+        self.tags = tags
+        self.image_url = image_url
+        self.nutritional_info = nutritional_info or {}
+        self.average_rating = average_rating
+        self.ratings_count = ratings_count
+        self.weighted_rating = weighted_rating
+        self.user_id = user_id
+        self.created_at = created_at
+        self.updated_at = updated_at
+        self._id = _id
+    
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'RecipeSummary':
+        """Create RecipeSummary object from a projected MongoDB document"""
+        return cls.wrap(data)
@@ -2,10 +2,35 @@ from datetime import datetime
 from bson import ObjectId
 from typing import Dict, List, Optional, Any, Set
 import hashlib
+from app.models.document import Document, Field, to_object_id
 
-class User:
+def _favorite_ids(recipe_ids: List[Any]) -> List[str]:
+    return [str(recipe_id) for recipe_id in recipe_ids]
+
+def _favorite_object_ids(recipe_ids: List[Any]) -> List[Any]:
+    return [to_object_id(recipe_id) for recipe_id in recipe_ids]
+
+class User(Document):
     """User data model representing MongoDB document structure"""
     
+    # password_hash stays out of API responses
+    API_FIELDS = ('_id', 'username', 'email', 'dietary_preferences', 'favorite_cuisines',
+                  'favorite_recipes', 'cooking_skill_level', 'comment_count', 'last_comment_at',
+                  'created_at', 'updated_at')
+    
+    _id = Field(decode=str, encode=to_object_id)
+    username = Field()
+    email = Field()
+    password_hash = Field()
+    dietary_preferences = Field(default=list)
+    favorite_cuisines = Field(default=list)
+    favorite_recipes = Field(decode=_favorite_ids, encode=_favorite_object_ids, default=list)
+    cooking_skill_level = Field(default=lambda: "Beginner")
+    comment_count = Field(default=int)
+    last_comment_at = Field()
+    created_at = Field()
+    updated_at = Field()
+    
     def __init__(self,
                  username: str,
                  email: str,
@@ -14,6 +39,8 @@ class User:
                  favorite_cuisines: Optional[List[str]] = None,
                  favorite_recipes: Optional[List[str]] = None,
                  cooking_skill_level: str = "Beginner",
+                 comment_count: int = 0,
+                 last_comment_at: Optional[datetime] = None,
                  created_at: Optional[datetime] = None,
                  updated_at: Optional[datetime] = None,
                  _id: Optional[str] = None):
@@ -28,6 +55,8 @@ class User:
             favorite_cuisines: List of favorite cuisine types
             favorite_recipes: List of favorite recipe IDs
             cooking_skill_level: User's cooking skill level
+            comment_count: Number of comments the user has posted
+            last_comment_at: Timestamp of the user's latest comment
             created_at: Creation timestamp
             updated_at: Last update timestamp
             _id: MongoDB ObjectID
@@ -39,51 +68,16 @@ class User:
         self.favorite_cuisines = favorite_cuisines or []
         self.favorite_recipes = favorite_recipes or []
         self.cooking_skill_level = cooking_skill_level
+        self.comment_count = comment_count
+        self.last_comment_at = last_comment_at
         self.created_at = created_at or datetime.utcnow()
         self.updated_at = updated_at or datetime.utcnow()
         self._id = str(ObjectId()) if _id is None else _id
     
-    def to_dict(self) -> Dict[str, Any]:
-        """Convert User object to dictionary for MongoDB storage"""
-        favorite_recipes_as_objids = [
-            ObjectId(recipe_id) if isinstance(recipe_id, str) else recipe_id
-            for recipe_id in self.favorite_recipes
-        ]
-        
-        return {
-            "_id": ObjectId(self._id) if isinstance(self._id, str) else self._id,
-            "username": self.username,
-            "email": self.email,
-            "password_hash": self.password_hash,
-            "dietary_preferences": self.dietary_preferences,
-            "favorite_cuisines": self.favorite_cuisines,
-            "favorite_recipes": favorite_recipes_as_objids,
-            "cooking_skill_level": self.cooking_skill_level,
-            "created_at": self.created_at,
-            "updated_at": self.updated_at
-        }
-    
     @classmethod
     def from_dict(cls, data: Dict[str, Any]) -> 'User':
-        """Create User object from MongoDB document"""
-        if data is None:
-            return None
-        favorite_recipes = []
-        if data.get("favorite_recipes"):
-            favorite_recipes = [str(recipe_id) for recipe_id in data["favorite_recipes"]]
-            
-        return cls(
-            username=data.get("username"),
-            email=data.get("email"),
-            password_hash=data.get("password_hash"),
-            dietary_preferences=data.get("dietary_preferences", []),
-            favorite_cuisines=data.get("favorite_cuisines", []),
-            favorite_recipes=favorite_recipes,
-            cooking_skill_level=data.get("cooking_skill_level", "Beginner"),
-            created_at=data.get("created_at"),
-            updated_at=data.get("updated_at"),
-            _id=str(data.get("_id")) if data.get("_id") else None
-        )
+        """Create User object from MongoDB document, decoding fields on first access"""
+        return cls.wrap(data)
     
     @staticmethod
     def hash_password(password: str) -> str:
@@ -113,17 +107,3 @@ class User:
         collection.create_index("favorite_recipes")
         collection.create_index("dietary_preferences")
         collection.create_index("favorite_cuisines")
-        
-    def to_api_dict(self) -> Dict[str, Any]:
-        """Convert User object to dictionary for API responses with string IDs"""
-        return {
-            "_id": str(self._id),
-            "username": self.username,
-            "email": self.email,
-            "dietary_preferences": self.dietary_preferences,
-            "favorite_cuisines": self.favorite_cuisines,
-            "favorite_recipes": [str(recipe_id) for recipe_id in self.favorite_recipes] if self.favorite_recipes else [],
-            "cooking_skill_level": self.cooking_skill_level,
-            "created_at": self.created_at.isoformat() if self.created_at else None,
-            "updated_at": self.updated_at.isoformat() if self.updated_at else None
-        }
\ No newline at end of file
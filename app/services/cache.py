@@ -0,0 +1,130 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+import bson
+from app.services.identity_map import IdentityMappedCache
+from app.config import Config
+
+try:
+    import redis
+except ImportError:  # redis is only needed for the shared backend
+    redis = None
+
+
+class LRUCache:
+    """Bounded in-process LRU cache with a per-entry TTL
+
+    Documents are stored BSON-encoded, so every hit decodes a private copy
+    and callers can never mutate a cached value. Invalidation only reaches
+    this process; with several workers the TTL bounds how stale a read can
+    be, use the Redis backend when that matters.
+    """
+
+    def __init__(self, namespace: str, ttl: Optional[int] = None, max_entries: Optional[int] = None):
+        self.namespace = namespace
+        self.ttl = ttl or Config.CACHE_DEFAULT_TIMEOUT
+        self.max_entries = max_entries or Config.CACHE_MAX_ENTRIES
+        self._entries: "OrderedDict[str, Tuple[float, bytes]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] < time.monotonic():
+                del self._entries[key]
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+        return bson.decode(entry[1])
+
+    def set(self, key: str, document: Dict[str, Any]) -> None:
+        data = bson.encode(document)
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, data)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "backend": "SimpleCache",
+                "namespace": self.namespace,
+                "size": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions
+            }
+
+
+class RedisCache:
+    """Cache shared by all workers, stored in Redis with a TTL per key
+
+    Redis applies its own eviction policy, so only hits and misses
+    (counted per process) are reported.
+    """
+
+    def __init__(self, namespace: str, ttl: Optional[int] = None, url: Optional[str] = None):
+        if redis is None:
+            raise RuntimeError("CACHE_TYPE 'RedisCache' requires the redis package")
+        self.namespace = namespace
+        self.ttl = ttl or Config.CACHE_DEFAULT_TIMEOUT
+        self.client = redis.Redis.from_url(url or Config.CACHE_REDIS_URL)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        data = self.client.get(self._key(key))
+        with self._lock:
+            if data is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return bson.decode(data) if data is not None else None
+
+    def set(self, key: str, document: Dict[str, Any]) -> None:
+        self.client.setex(self._key(key), self.ttl, bson.encode(document))
+
+    def delete(self, key: str) -> None:
+        self.client.delete(self._key(key))
+
+    def clear(self) -> None:
+        keys = list(self.client.scan_iter(match=self._key('*')))
+        if keys:
+            self.client.delete(*keys)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "backend": "RedisCache",
+                "namespace": self.namespace,
+                "hits": self.hits,
+                "misses": self.misses
+            }
+
+    def _key(self, key: str) -> str:
+        return f"{self.namespace}:{key}"
+
+
+def make_cache(namespace: str):
+    """Create the document cache backend selected by CACHE_TYPE, behind the request identity map"""
+    if Config.CACHE_TYPE == 'RedisCache':
+        return IdentityMappedCache(RedisCache(namespace))
+    return IdentityMappedCache(LRUCache(namespace))
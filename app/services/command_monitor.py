@@ -0,0 +1,169 @@
+import threading
+from typing import Any, Dict, Optional, Tuple
+import bson
+from flask import Flask, g, has_request_context, jsonify, request
+from pymongo import monitoring
+
+# Keys holding the part of a command that decides which documents it touches
+FILTER_KEYS = ("filter", "query", "q", "pipeline", "updates", "deletes")
+
+
+def query_shape(value: Any) -> Any:
+    """Structure of a filter or pipeline with every literal replaced by '?'"""
+    if isinstance(value, dict):
+        return {key: query_shape(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        shapes = []
+        for item in value:
+            shape = query_shape(item)
+            if shape not in shapes:
+                shapes.append(shape)
+        return shapes
+    return "?"
+
+
+def command_shape(command_name: str, command: Dict[str, Any]) -> Dict[str, Any]:
+    shape = {"command": command_name, "collection": command.get(command_name)}
+    for key in FILTER_KEYS:
+        if key in command:
+            shape[key] = query_shape(command[key])
+    return shape
+
+
+class CommandStats:
+    """Counters for the MongoDB commands of one request or endpoint"""
+
+    __slots__ = ("commands", "failed", "duration_ms", "documents", "bytes", "_lock")
+
+    def __init__(self):
+        self.commands = 0
+        self.failed = 0
+        self.duration_ms = 0.0
+        self.documents = 0
+        self.bytes = 0
+        self._lock = threading.Lock()
+
+    def add(self, duration_ms: float, documents: int, size: int, failed: bool = False) -> None:
+        # Commands of one request can finish on several pool threads
+        with self._lock:
+            self.commands += 1
+            self.failed += failed
+            self.duration_ms += duration_ms
+            self.documents += documents
+            self.bytes += size
+
+    def as_dict(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"commands": self.commands, "failed": self.failed, "duration_ms": round(self.duration_ms, 3),
+                    "documents": self.documents, "bytes": self.bytes}
+
+
+class EndpointStats:
+    """Per-endpoint totals over every request this process has served"""
+
+    def __init__(self):
+        self._endpoints: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+
+    def add(self, endpoint: str, stats: Dict[str, Any]) -> None:
+        with self._lock:
+            totals = self._endpoints.setdefault(endpoint, {
+                "requests": 0, "commands": 0, "failed": 0, "duration_ms": 0.0, "documents": 0, "bytes": 0,
+                "max_commands": 0
+            })
+            totals["requests"] += 1
+            for key in ("commands", "failed", "duration_ms", "documents", "bytes"):
+                totals[key] += stats[key]
+            totals["max_commands"] = max(totals["max_commands"], stats["commands"])
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            endpoints = {endpoint: dict(totals) for endpoint, totals in self._endpoints.items()}
+        for totals in endpoints.values():
+            totals["commands_per_request"] = round(totals["commands"] / totals["requests"], 2)
+            totals["ms_per_request"] = round(totals["duration_ms"] / totals["requests"], 3)
+            totals["duration_ms"] = round(totals["duration_ms"], 3)
+        return endpoints
+
+
+def current_command_stats() -> Optional[CommandStats]:
+    """Command counters of the current request, or None outside of requests"""
+    if not has_request_context():
+        return None
+    return g.setdefault('mongo_commands', CommandStats())
+
+
+class CommandMonitor(monitoring.CommandListener):
+    """Attributes every MongoDB command to the Flask request that issued it
+
+    Events fire on the thread running the command, which is the request
+    thread or a run_concurrently worker carrying a copy of its context.
+    Commands issued outside a request (CLI, background loaders) are only
+    checked against the slow query threshold.
+    """
+
+    def __init__(self, app: Flask):
+        self.app = app
+        self.slow_ms = app.config.get('SLOW_QUERY_MS', 100)
+        self.count_bytes = app.config.get('MONGO_COMMAND_BYTES', False)
+        self.endpoints = EndpointStats()
+        # (connection, request_id) -> (request counters, command) for commands in flight
+        self._pending: Dict[Tuple[Any, int], Tuple[Optional[CommandStats], Dict[str, Any]]] = {}
+
+    def started(self, event: monitoring.CommandStartedEvent) -> None:
+        self._pending[(event.connection_id, event.request_id)] = (current_command_stats(), event.command)
+
+    def succeeded(self, event: monitoring.CommandSucceededEvent) -> None:
+        self._finish(event, event.reply, False)
+
+    def failed(self, event: monitoring.CommandFailedEvent) -> None:
+        self._finish(event, None, True)
+
+    def _finish(self, event: Any, reply: Optional[Dict[str, Any]], failed: bool) -> None:
+        stats, command = self._pending.pop((event.connection_id, event.request_id), (None, None))
+        duration_ms = event.duration_micros / 1000
+        if stats is not None:
+            documents = self._documents(reply) if reply else 0
+            # Re-encoding replies costs about as much as decoding them, so it is opt-in
+            size = len(bson.encode(reply)) if reply and self.count_bytes else 0
+            stats.add(duration_ms, documents, size, failed)
+        if duration_ms >= self.slow_ms and command is not None:
+            self.app.logger.warning("slow MongoDB command (%.1f ms%s): %s", duration_ms,
+                                    ", failed" if failed else "", command_shape(event.command_name, command))
+
+    @staticmethod
+    def _documents(reply: Dict[str, Any]) -> int:
+        cursor = reply.get("cursor")
+        if isinstance(cursor, dict):
+            return len(cursor.get("firstBatch") or cursor.get("nextBatch") or [])
+        if "value" in reply:
+            # findAndModify
+            return 1 if reply["value"] is not None else 0
+        return reply.get("n", 0) if isinstance(reply.get("n"), int) else 0
+
+
+def init_app(app: Flask, monitor: CommandMonitor) -> None:
+    """Per-request command summaries and per-endpoint totals
+
+    Debug mode adds the request's summary as X-Mongo-Commands and
+    Server-Timing headers and serves the endpoint totals at /_debug/mongo.
+    """
+
+    @app.after_request
+    def report_commands(response):
+        stats = g.get('mongo_commands')
+        summary = stats.as_dict() if stats is not None else CommandStats().as_dict()
+        monitor.endpoints.add(request.endpoint or "<unmatched>", summary)
+        if app.debug:
+            response.headers['X-Mongo-Commands'] = (
+                f"count={summary['commands']}, time={summary['duration_ms']:.1f}ms, "
+                f"docs={summary['documents']}, bytes={summary['bytes']}"
+            )
+            response.headers.add('Server-Timing', f"mongo;dur={summary['duration_ms']:.1f};"
+                                                  f"desc=\"{summary['commands']} commands\"")
+        return response
+
+    if app.debug:
+        @app.route('/_debug/mongo')
+        def mongo_endpoint_stats():
+            return jsonify(monitor.endpoints.snapshot())
@@ -0,0 +1,270 @@
+from typing import Dict, Iterable, List, Optional, Tuple, Any
+from bson import ObjectId
+from datetime import datetime
+from pymongo import DeleteMany, ReplaceOne, ReturnDocument
+from pymongo.collection import Collection
+from pymongo.errors import BulkWriteError, DuplicateKeyError, PyMongoError
+from bson import errors as bson_errors
+from app import mongo
+from app.models.comment import CommentBucket
+from app.services.user_service import UserService
+from app.config import Config
+
+class CommentService:
+    """Service class for comments stored in per-recipe buckets
+
+    Comment number n of a recipe (0-based, in posting order) lives in the
+    bucket with seq n // COMMENTS_BUCKET_SIZE and stores n as its position;
+    each bucket keeps its comments sorted by position, whatever order
+    concurrent writers push them in. The recipe document keeps the running
+    comment_count and the newest RECENT_COMMENTS_LIMIT comments so the first
+    page of a detail view needs no extra reads.
+    """
+
+    @property
+    def collection(self) -> Collection:
+        """Get MongoDB collection for comment buckets"""
+        return mongo.db[Config.COMMENTS_COLLECTION]
+
+    @property
+    def recipes(self) -> Collection:
+        return mongo.db[Config.RECIPES_COLLECTION]
+
+    def add_comment(self, recipe_id: str, comment_data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        comment = dict(comment_data)
+        comment.setdefault('_id', ObjectId())
+        comment.setdefault('date', datetime.utcnow())
+        if isinstance(comment.get('user_id'), str):
+            try:
+                comment['user_id'] = ObjectId(comment['user_id'])
+            except bson_errors.InvalidId:
+                pass
+        recipe_id_obj = ObjectId(recipe_id) if isinstance(recipe_id, str) else recipe_id
+        recipe = self._reserve_position(recipe_id_obj, comment)
+        if not recipe:
+            # Comments still embedded in the recipe must move to buckets first,
+            # or the new comment would take position 0 and hide them
+            self.migrate_recipe(recipe_id_obj)
+            recipe = self._reserve_position(recipe_id_obj, comment)
+        if not recipe:
+            return None
+        position = recipe["comment_count"] - 1
+        try:
+            self._push_to_bucket(recipe_id_obj, position // Config.COMMENTS_BUCKET_SIZE,
+                                 [dict(comment, position=position)])
+        except PyMongoError:
+            # Give back the reserved position so the count matches the stored comments
+            self.recipes.update_one(
+                {"_id": recipe_id_obj},
+                {"$inc": {"comment_count": -1}, "$pull": {"recent_comments": {"_id": comment["_id"]}}}
+            )
+            raise
+        if isinstance(comment.get('user_id'), ObjectId):
+            UserService().record_comment(comment['user_id'], comment['date'])
+        return comment
+
+    def _reserve_position(self, recipe_id: ObjectId, comment: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Count the comment and add it to the recipe's preview atomically,
+        unless the recipe is missing or still holds embedded comments"""
+        return self.recipes.find_one_and_update(
+            {"_id": recipe_id, "comments": {"$exists": False}},
+            {
+                "$inc": {"comment_count": 1},
+                "$push": {"recent_comments": {"$each": [comment], "$slice": -Config.RECENT_COMMENTS_LIMIT}},
+                "$set": {"updated_at": datetime.utcnow()}
+            },
+            projection={"comment_count": 1},
+            return_document=ReturnDocument.AFTER
+        )
+
+    def get_comments(self, recipe_id: str, page: int = 1, page_size: Optional[int] = None,
+                     recipe: Optional[Any] = None) -> Dict[str, Any]:
+        """Page through a recipe's comments, newest first"""
+        page_size = page_size or Config.COMMENTS_PAGE_SIZE
+        recipe_id_obj = ObjectId(recipe_id) if isinstance(recipe_id, str) else recipe_id
+        if recipe is not None:
+            total = recipe.comment_count
+            recent = recipe.recent_comments
+        else:
+            doc = self.recipes.find_one({"_id": recipe_id_obj}, {"comment_count": 1, "recent_comments": 1}) or {}
+            total = doc.get("comment_count", 0)
+            recent = doc.get("recent_comments", [])
+        comments, oldest, newest = self.page_window(total, recent, page, page_size)
+        if comments is None:
+            buckets = self.collection.find(self.bucket_query(recipe_id_obj, oldest, newest)).sort("seq", -1)
+            comments = self.comments_from_buckets(buckets, oldest, newest)
+        return self.comments_page(comments, total, page, page_size, oldest)
+
+    @staticmethod
+    def page_window(total: int, recent: List[Dict[str, Any]], page: int,
+                    page_size: int) -> Tuple[Optional[List[Dict[str, Any]]], int, int]:
+        """Positions of a page counted from the oldest comment, plus the page
+        itself when the recent_comments preview already covers it"""
+        newest = total - 1 - (page - 1) * page_size
+        oldest = max(0, total - page * page_size)
+        if newest < 0:
+            return [], oldest, newest
+        if (page == 1 and page_size <= len(recent)) or len(recent) >= total:
+            return list(reversed(recent))[(page - 1) * page_size:page * page_size], oldest, newest
+        return None, oldest, newest
+
+    @staticmethod
+    def bucket_query(recipe_id: ObjectId, oldest: int, newest: int) -> Dict[str, Any]:
+        bucket_size = Config.COMMENTS_BUCKET_SIZE
+        return {
+            "recipe_id": recipe_id,
+            "seq": {"$gte": oldest // bucket_size, "$lte": newest // bucket_size}
+        }
+
+    @staticmethod
+    def comments_from_buckets(buckets: Iterable[Dict[str, Any]], oldest: int, newest: int) -> List[Dict[str, Any]]:
+        """Comments at positions oldest..newest, newest first, from buckets sorted by seq descending"""
+        bucket_size = Config.COMMENTS_BUCKET_SIZE
+        comments = []
+        for bucket in buckets:
+            for offset in range(len(bucket.get("comments", [])) - 1, -1, -1):
+                comment = bucket["comments"][offset]
+                # Buckets written before positions were stored are in posting order
+                position = comment.get("position", bucket["seq"] * bucket_size + offset)
+                if oldest <= position <= newest:
+                    comments.append(comment)
+        return comments
+
+    @staticmethod
+    def comments_page(comments: List[Dict[str, Any]], total: int, page: int,
+                      page_size: int, oldest: int) -> Dict[str, Any]:
+        return {
+            "comments": comments,
+            "pagination": {
+                "page": page,
+                "page_size": page_size,
+                "total_items": total,
+                "total_pages": (total + page_size - 1) // page_size if total > 0 else 1,
+                "has_next": oldest > 0
+            }
+        }
+
+    def delete_recipe_comments(self, recipe_id: str) -> int:
+        recipe_id_obj = ObjectId(recipe_id) if isinstance(recipe_id, str) else recipe_id
+        pipeline = [
+            {"$match": {"recipe_id": recipe_id_obj}},
+            {"$unwind": "$comments"},
+            {"$group": {"_id": "$comments.user_id", "count": {"$sum": 1}}}
+        ]
+        deltas = {}
+        for group in self.collection.aggregate(pipeline):
+            if group["_id"] is not None:
+                deltas[group["_id"]] = deltas.get(group["_id"], 0) - group["count"]
+        UserService().adjust_comment_counts(deltas)
+        return self.collection.delete_many({"recipe_id": recipe_id_obj}).deleted_count
+
+    def migrate_embedded_comments(self, batch_size: Optional[int] = None) -> Dict[str, int]:
+        """Move comments embedded in recipe documents into buckets, in batches"""
+        batch_size = batch_size or Config.MIGRATION_BATCH_SIZE
+        migrated_recipes = 0
+        migrated_comments = 0
+        last_id = None
+        while True:
+            query = {"comments": {"$exists": True}}
+            if last_id is not None:
+                query["_id"] = {"$gt": last_id}
+            batch = list(self.recipes.find(query, {"comments": 1}).sort("_id", 1).limit(batch_size))
+            if not batch:
+                break
+            last_id = batch[-1]["_id"]
+            legacy = self._bucketed_comments([doc["_id"] for doc in batch])
+            for doc in batch:
+                moved = self._migrate_document(doc, legacy.get(doc["_id"], []))
+                if moved is None:
+                    # Changed since the batch was read; retry from a fresh copy
+                    moved = self.migrate_recipe(doc["_id"])
+                migrated_recipes += 1
+                migrated_comments += moved
+        return {"recipes": migrated_recipes, "comments": migrated_comments}
+
+    def migrate_recipe(self, recipe_id: ObjectId) -> int:
+        """Move one recipe's embedded comments into buckets
+
+        Returns the number of comments now bucketed, or 0 when the recipe is
+        missing or already migrated. Safe to run concurrently with other
+        migrations of the same recipe: every write is derived from the same
+        inputs, and the recipe only switches to buckets through a
+        compare-and-set on its original embedded array.
+        """
+        while True:
+            doc = self.recipes.find_one({"_id": recipe_id, "comments": {"$exists": True}}, {"comments": 1})
+            if not doc:
+                return 0
+            moved = self._migrate_document(doc, self._bucketed_comments([recipe_id]).get(recipe_id, []))
+            if moved is not None:
+                return moved
+
+    def _bucketed_comments(self, recipe_ids: List[ObjectId]) -> Dict[ObjectId, List[Dict[str, Any]]]:
+        """Comments already in buckets for recipes that still embed comments
+
+        They were posted through the bucket path before add_comment checked
+        for embedded comments, or written by an interrupted migration.
+        """
+        comments = {}
+        for bucket in self.collection.find({"recipe_id": {"$in": recipe_ids}}).sort("seq", 1):
+            comments.setdefault(bucket["recipe_id"], []).extend(bucket.get("comments", []))
+        return comments
+
+    def _migrate_document(self, doc: Dict[str, Any], bucketed: List[Dict[str, Any]]) -> Optional[int]:
+        """Bucket a recipe's embedded comments; None if the recipe changed meanwhile"""
+        embedded = doc.get("comments") or []
+        if any('_id' not in comment for comment in embedded):
+            # Persist ids first so a retry after a partial migration can tell
+            # already bucketed comments apart from new ones
+            with_ids = [comment if '_id' in comment else dict(comment, _id=ObjectId()) for comment in embedded]
+            result = self.recipes.update_one({"_id": doc["_id"], "comments": embedded},
+                                             {"$set": {"comments": with_ids}})
+            if not result.matched_count:
+                return None
+            embedded = with_ids
+        comments = {}
+        for comment in embedded + bucketed:
+            comments.setdefault(comment['_id'], comment)
+        comments = sorted(comments.values(), key=lambda comment: comment.get('date') or datetime.min)
+        positioned = [dict(comment, position=position) for position, comment in enumerate(comments)]
+        bucket_size = Config.COMMENTS_BUCKET_SIZE
+        # Buckets of a recipe that still embeds comments receive no new comments,
+        # so replacing them cannot drop anything
+        writes = []
+        for seq, start in enumerate(range(0, len(comments), bucket_size)):
+            bucket = CommentBucket(recipe_id=doc["_id"], seq=seq, comments=positioned[start:start + bucket_size])
+            replacement = bucket.to_dict()
+            del replacement["_id"]
+            writes.append(ReplaceOne({"recipe_id": doc["_id"], "seq": seq}, replacement, upsert=True))
+        writes.append(DeleteMany({"recipe_id": doc["_id"], "seq": {"$gte": len(writes)}}))
+        try:
+            self.collection.bulk_write(writes, ordered=True)
+        except BulkWriteError as exc:
+            # A concurrent migration of the same recipe created the bucket first
+            if any(error.get("code") != 11000 for error in exc.details.get("writeErrors", [])):
+                raise
+            return None
+        result = self.recipes.update_one(
+            {"_id": doc["_id"], "comments": embedded},
+            {
+                "$set": {
+                    "comment_count": len(comments),
+                    "recent_comments": comments[-Config.RECENT_COMMENTS_LIMIT:]
+                },
+                "$unset": {"comments": ""}
+            }
+        )
+        return len(comments) if result.matched_count else None
+
+    def _push_to_bucket(self, recipe_id: ObjectId, seq: int, comments: List[Dict[str, Any]]) -> None:
+        update = {
+            "$push": {"comments": {"$each": comments, "$sort": {"position": 1}}},
+            "$inc": {"count": len(comments)},
+            "$set": {"updated_at": datetime.utcnow()},
+            "$setOnInsert": {"created_at": datetime.utcnow()}
+        }
+        try:
+            self.collection.update_one({"recipe_id": recipe_id, "seq": seq}, update, upsert=True)
+        except DuplicateKeyError:
+            # Two writers raced to create the same bucket; it exists now
+            self.collection.update_one({"recipe_id": recipe_id, "seq": seq}, update)
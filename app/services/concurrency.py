@@ -0,0 +1,49 @@
+import contextvars
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, List, Optional
+from app.config import Config
+
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+_worker = threading.local()
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(max_workers=Config.QUERY_POOL_SIZE,
+                                               thread_name_prefix='query')
+    return _executor
+
+
+def _run_in_worker(context: contextvars.Context, call: Callable[[], Any]) -> Any:
+    _worker.active = True
+    try:
+        return context.run(call)
+    finally:
+        _worker.active = False
+
+
+def run_concurrently(*calls: Callable[[], Any]) -> List[Any]:
+    """Run independent service calls on the shared query pool and return their results in order
+
+    Each call runs in a copy of the caller's context, so the Flask app and
+    request contexts stay available. The first exception raised by a call
+    is re-raised once all calls have finished. Calls made from inside a
+    pool thread run inline, so nested fan-outs cannot exhaust the pool.
+    """
+    if len(calls) < 2 or getattr(_worker, 'active', False):
+        return [call() for call in calls]
+    executor = _get_executor()
+    futures = [
+        executor.submit(_run_in_worker, contextvars.copy_context(), call)
+        for call in calls
+    ]
+    errors = [future.exception() for future in futures]
+    for error in errors:
+        if error is not None:
+            raise error
+    return [future.result() for future in futures]
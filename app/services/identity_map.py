@@ -0,0 +1,108 @@
+import threading
+from typing import Any, Dict, Optional, Tuple
+from flask import g, has_request_context
+
+
+class IdentityMap:
+    """Documents loaded during one request, keyed by (namespace, _id)
+
+    Repeated lookups of the same document within a request are answered
+    from here instead of the document cache or MongoDB. Entries are shared
+    by every caller in the request and must be treated as read-only.
+    """
+
+    def __init__(self):
+        self._documents: Dict[Tuple[str, str], Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+        self.loads = 0
+        self.hits = 0
+
+    def get(self, namespace: str, key: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            document = self._documents.get((namespace, key))
+            if document is None:
+                self.loads += 1
+            else:
+                self.hits += 1
+            return document
+
+    def add(self, namespace: str, key: str, document: Dict[str, Any]) -> None:
+        with self._lock:
+            self._documents[(namespace, key)] = document
+
+    def discard(self, namespace: str, key: str) -> None:
+        with self._lock:
+            self._documents.pop((namespace, key), None)
+
+    def clear(self, namespace: str) -> None:
+        with self._lock:
+            for entry in [entry for entry in self._documents if entry[0] == namespace]:
+                del self._documents[entry]
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"loads": self.loads, "hits": self.hits}
+
+
+def current_identity_map() -> Optional[IdentityMap]:
+    """The identity map of the current request, or None outside of requests"""
+    if not has_request_context():
+        return None
+    return g.setdefault('identity_map', IdentityMap())
+
+
+class IdentityMappedCache:
+    """Document cache that answers repeated lookups within a request from the identity map
+
+    Writes and invalidations go to both layers, so a document changed
+    during the request is reloaded on its next lookup.
+    """
+
+    def __init__(self, backend: Any):
+        self.backend = backend
+        self.namespace = backend.namespace
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        identity_map = current_identity_map()
+        if identity_map is None:
+            return self.backend.get(key)
+        document = identity_map.get(self.namespace, key)
+        if document is None:
+            document = self.backend.get(key)
+            if document is not None:
+                identity_map.add(self.namespace, key, document)
+        return document
+
+    def set(self, key: str, document: Dict[str, Any]) -> None:
+        self.backend.set(key, document)
+        identity_map = current_identity_map()
+        if identity_map is not None:
+            identity_map.add(self.namespace, key, document)
+
+    def delete(self, key: str) -> None:
+        self.backend.delete(key)
+        identity_map = current_identity_map()
+        if identity_map is not None:
+            identity_map.discard(self.namespace, key)
+
+    def clear(self) -> None:
+        self.backend.clear()
+        identity_map = current_identity_map()
+        if identity_map is not None:
+            identity_map.clear(self.namespace)
+
+    def stats(self) -> Dict[str, Any]:
+        return self.backend.stats()
+
+
+def init_app(app) -> None:
+    """Report per-request identity map counters in debug mode"""
+
+    @app.after_request
+    def report_identity_map(response):
+        identity_map = g.get('identity_map')
+        if app.debug and identity_map is not None:
+            stats = identity_map.stats()
+            response.headers['X-Identity-Map'] = f"loads={stats['loads']}, hits={stats['hits']}"
+            app.logger.debug("identity map: %(loads)d loads, %(hits)d deduplicated", stats)
+        return response
@@ -0,0 +1,117 @@
+import hashlib
+import json
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple, Union
+from bson import ObjectId, errors as bson_errors
+from flask import current_app
+from app.models.recipe import Recipe
+from app.services.recipe_service import RecipeService
+from app.config import Config
+
+# Fields a partner record may carry; ratings, comments and timestamps are managed by the app
+RECORD_FIELDS = {
+    "_id", "name", "ingredients", "instructions", "cuisine", "difficulty", "preparation_time",
+    "cooking_time", "nutritional_info", "tags", "image_url"
+}
+DUPLICATE_KEY = 11000
+
+
+class IngestService:
+    """Bulk recipe import from NDJSON, one record per line
+
+    Lines are validated and converted one by one, then written in batches
+    of unordered inserts so one bad record never blocks the rest. ingest()
+    yields a result per batch_size input lines whose checkpoint is the last
+    line the batch covers: restarting with start_line set to it resumes the
+    import. A record without an _id gets one derived from its content and
+    the importing user, so replaying lines already written (after a crash
+    between the insert and the checkpoint) reports them as existing
+    instead of inserting them twice.
+    """
+
+    @property
+    def recipes(self) -> RecipeService:
+        return RecipeService()
+
+    def ingest(self,
+               lines: Iterable[Union[str, bytes]],
+               start_line: int = 0,
+               batch_size: Optional[int] = None,
+               user_id: Optional[str] = None) -> Iterator[Dict[str, Any]]:
+        batch_size = batch_size or Config.INGEST_BATCH_SIZE
+        docs: List[Dict[str, Any]] = []
+        doc_lines: List[int] = []
+        errors: List[Dict[str, Any]] = []
+        received = 0
+        line_number = start_line
+        for line_number, line in enumerate(lines, 1):
+            if line_number <= start_line or not line.strip():
+                continue
+            received += 1
+            doc, messages = self.parse_record(line, user_id)
+            if messages:
+                errors.append({"line": line_number, "errors": messages})
+            else:
+                docs.append(doc)
+                doc_lines.append(line_number)
+            # Count every line, so a run of rejected ones still flushes and checkpoints
+            if received >= batch_size:
+                yield self._write_batch(docs, doc_lines, errors, received, line_number)
+                docs, doc_lines, errors, received = [], [], [], 0
+        if received:
+            yield self._write_batch(docs, doc_lines, errors, received, line_number)
+
+    def _write_batch(self, docs: List[Dict[str, Any]], doc_lines: List[int],
+                     errors: List[Dict[str, Any]], received: int, checkpoint: int) -> Dict[str, Any]:
+        write_errors = self.recipes.create_recipes(docs)
+        existing = [index for index, error in write_errors.items() if error.get("code") == DUPLICATE_KEY]
+        errors = errors + [{"line": doc_lines[index], "errors": [error.get("errmsg", "write failed")]}
+                           for index, error in write_errors.items() if error.get("code") != DUPLICATE_KEY]
+        errors.sort(key=lambda error: error["line"])
+        return {
+            "received": received,
+            "inserted": len(docs) - len(write_errors),
+            "existing": len(existing),
+            "failed": len(errors),
+            "errors": errors,
+            "checkpoint": checkpoint
+        }
+
+    @staticmethod
+    def parse_record(line: Union[str, bytes],
+                     user_id: Optional[str] = None) -> Tuple[Optional[Dict[str, Any]], List[str]]:
+        """Recipe document for one NDJSON line, or the reasons it was rejected"""
+        try:
+            record = current_app.json.loads(line)
+        except ValueError as exc:
+            return None, [f"invalid JSON: {exc}"]
+        if not isinstance(record, dict):
+            return None, ["record must be a JSON object"]
+        messages = [f"unexpected field '{field}'" for field in sorted(set(record) - RECORD_FIELDS)]
+        messages += Recipe.validation_errors(record)
+        for field in ("preparation_time", "cooking_time"):
+            value = record.get(field)
+            if value is not None and (not isinstance(value, (int, float)) or isinstance(value, bool)):
+                messages.append(f"'{field}' must be a number")
+        tags = record.get("tags")
+        if tags is not None and not (isinstance(tags, list) and all(isinstance(tag, str) for tag in tags)):
+            messages.append("'tags' must be an array of strings")
+        if record.get("nutritional_info") is not None and not isinstance(record["nutritional_info"], dict):
+            messages.append("'nutritional_info' must be an object")
+        if messages:
+            return None, messages
+        fields = {"preparation_time": None, "cooking_time": None, "nutritional_info": {}, "tags": [], **record}
+        if user_id:
+            fields["user_id"] = user_id
+        if record.get("_id") is None:
+            fields["_id"] = IngestService.record_id(record, user_id)
+        try:
+            return Recipe(**fields).to_dict(), []
+        except (bson_errors.InvalidId, TypeError) as exc:
+            return None, [str(exc)]
+
+    @staticmethod
+    def record_id(record: Dict[str, Any], user_id: Optional[str] = None) -> ObjectId:
+        """Stable _id for a record that has none: the same record imported by
+        the same user always maps to the same id"""
+        canonical = json.dumps([user_id, record], sort_keys=True, separators=(",", ":"))
+        return ObjectId(hashlib.sha256(canonical.encode("utf-8")).digest()[:12])
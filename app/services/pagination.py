@@ -0,0 +1,159 @@
+import base64
+import binascii
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+from bson import ObjectId, json_util
+from bson.errors import InvalidId
+from pymongo.collection import Collection
+from app.config import Config
+
+# Stable sort order for paginated recipe listings, newest first.
+# _id breaks ties between recipes created in the same millisecond.
+RECENT_SORT = [("created_at", -1), ("_id", -1)]
+
+
+def encode_cursor(sort_value: Any, doc_id: ObjectId) -> str:
+    """Encode the last (sort key, _id) of a page as an opaque continuation token"""
+    payload = json_util.dumps({"v": sort_value, "i": doc_id})
+    return base64.urlsafe_b64encode(payload.encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def decode_cursor(token: str) -> Tuple[Any, ObjectId]:
+    """Decode a continuation token, raising ValueError if it is malformed"""
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        payload = json_util.loads(base64.urlsafe_b64decode(padded.encode('ascii')).decode('utf-8'))
+        return payload["v"], ObjectId(payload["i"])
+    except (binascii.Error, UnicodeError, ValueError, KeyError, TypeError, InvalidId):
+        raise ValueError("Invalid pagination cursor")
+
+
+def keyset_filter(field: str, sort_value: Any, doc_id: ObjectId) -> Dict[str, Any]:
+    """Filter for documents after (sort_value, doc_id) in descending (field, _id) order"""
+    if sort_value is None:
+        # Missing values sort last, so only the _id tie-breaker is left
+        return {field: None, "_id": {"$lt": doc_id}}
+    return {"$or": [
+        {field: {"$lt": sort_value}},
+        {field: sort_value, "_id": {"$lt": doc_id}},
+        {field: None}
+    ]}
+
+
+def build_pagination(page: int, page_size: int, total_items: int,
+                     docs: List[Dict[str, Any]], sort_field: Optional[str] = None,
+                     total_capped: bool = False) -> Dict[str, Any]:
+    """Pagination metadata for a page fetched with page_size + 1 documents"""
+    has_next = len(docs) > page_size
+    next_cursor = None
+    if has_next and sort_field:
+        last = docs[page_size - 1]
+        next_cursor = encode_cursor(last.get(sort_field), last["_id"])
+    return {
+        "page": page,
+        "page_size": page_size,
+        "total_items": total_items,
+        "total_pages": (total_items + page_size - 1) // page_size if total_items > 0 else 1,
+        "total_capped": total_capped,
+        "has_next": has_next,
+        "next_cursor": next_cursor
+    }
+
+
+def apply_cursor(query: Dict[str, Any], cursor: Optional[str], sort_field: str) -> Dict[str, Any]:
+    """Restrict a query to the documents following a continuation token"""
+    if not cursor:
+        return query
+    sort_value, doc_id = decode_cursor(cursor)
+    condition = keyset_filter(sort_field, sort_value, doc_id)
+    return {"$and": [query, condition]} if query else condition
+
+
+class ResultCounter:
+    """Count strategies for paginated result totals
+
+    exact  -- count_documents on every call
+    cached -- exact counts cached per normalized filter for a TTL and
+              dropped on writes (per process, so other workers may lag
+              by up to the TTL)
+    capped -- stop counting after SEARCH_COUNT_CAP matches and report
+              the total as "more than N"
+
+    Unfiltered counts always use the collection metadata estimate.
+    """
+
+    EXACT = 'exact'
+    CACHED = 'cached'
+    CAPPED = 'capped'
+
+    def __init__(self, mode: Optional[str] = None, ttl: Optional[int] = None,
+                 cap: Optional[int] = None, max_entries: Optional[int] = None):
+        self.mode = mode
+        self.ttl = ttl
+        self.cap = cap
+        self.max_entries = max_entries
+        self._cache: "OrderedDict[str, Tuple[float, int]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def count(self, collection: Collection, query: Dict[str, Any],
+              mode: Optional[str] = None) -> Tuple[int, bool]:
+        """Return (total, capped) for a filter using the configured strategy"""
+        mode = mode or self.mode or Config.SEARCH_COUNT_MODE
+        if not query:
+            return collection.estimated_document_count(), False
+        if mode == self.CAPPED:
+            cap = self.cap or Config.SEARCH_COUNT_CAP
+            total = collection.count_documents(query, limit=cap + 1)
+            return (cap, True) if total > cap else (total, False)
+        if mode == self.CACHED:
+            key = self.cache_key(collection.name, query)
+            total = self._get(key)
+            if total is None:
+                total = collection.count_documents(query)
+                self._put(key, total)
+            return total, False
+        return collection.count_documents(query), False
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._cache.clear()
+
+    @classmethod
+    def cache_key(cls, collection_name: str, query: Dict[str, Any]) -> str:
+        return collection_name + ':' + json_util.dumps(cls._normalize(query), sort_keys=True)
+
+    @classmethod
+    def _normalize(cls, value: Any, operator: Optional[str] = None) -> Any:
+        # Set operators ignore element order, so {"$in": [a, b]} and
+        # {"$in": [b, a]} share one cache entry
+        if isinstance(value, dict):
+            return {key: cls._normalize(item, key) for key, item in value.items()}
+        if isinstance(value, list):
+            items = [cls._normalize(item) for item in value]
+            if operator in ('$in', '$nin', '$all'):
+                items.sort(key=json_util.dumps)
+            return items
+        return value
+
+    def _get(self, key: str) -> Optional[int]:
+        with self._lock:
+            entry = self._cache.get(key)
+            if entry is None:
+                return None
+            expires_at, total = entry
+            if expires_at < time.monotonic():
+                del self._cache[key]
+                return None
+            self._cache.move_to_end(key)
+            return total
+
+    def _put(self, key: str, total: int) -> None:
+        ttl = self.ttl or Config.SEARCH_COUNT_CACHE_TTL
+        max_entries = self.max_entries or Config.SEARCH_COUNT_CACHE_SIZE
+        with self._lock:
+            self._cache[key] = (time.monotonic() + ttl, total)
+            self._cache.move_to_end(key)
+            while len(self._cache) > max_entries:
+                self._cache.popitem(last=False)
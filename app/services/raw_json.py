@@ -0,0 +1,61 @@
+from datetime import datetime
+from typing import Any, Dict, Iterable, Tuple
+import bson
+from bson.codec_options import CodecOptions
+from bson.raw_bson import RawBSONDocument
+from flask import current_app
+from pymongo.collection import Collection
+
+# Raw documents keep the server's BSON bytes; nothing is decoded until accessed
+RAW_CODEC_OPTIONS = CodecOptions(document_class=RawBSONDocument)
+# $dateToString format matching datetime.isoformat() of stored timestamps, which
+# have millisecond precision (whole seconds keep their ".000000" here)
+DATE_FORMAT = "%Y-%m-%dT%H:%M:%S.%L000"
+ID_FIELDS = ("_id", "user_id")
+DATE_FIELDS = ("created_at", "updated_at")
+
+
+def raw_collection(collection: Collection) -> Collection:
+    """The same collection returning RawBSONDocument results"""
+    return collection.with_options(codec_options=RAW_CODEC_OPTIONS)
+
+
+def api_projection(model: Any) -> Dict[str, Any]:
+    """$project stage shaping a model's PROJECTION like its to_api_dict()
+
+    Ids and dates become strings and missing fields get the model's
+    defaults on the server, so the projected documents hold JSON types
+    only and convert to API JSON without decoding any field in Python.
+    """
+    stage = {"_id": {"$toString": "$_id"}}
+    for name in model.PROJECTION:
+        if name in ID_FIELDS:
+            stage[name] = {"$toString": f"${name}"}
+        elif name in DATE_FIELDS:
+            stage[name] = {"$dateToString": {"date": f"${name}", "format": DATE_FORMAT}}
+        elif '.' in name:
+            stage[name] = 1
+        else:
+            field = model._fields[name]
+            stage[name] = {"$ifNull": [f"${name}", field.default() if field.default else None]}
+    return stage
+
+
+def parse_date(value: str) -> datetime:
+    """Inverse of DATE_FORMAT, for the few values needed back in Python"""
+    return datetime.strptime(value, "%Y-%m-%dT%H:%M:%S.%f")
+
+
+def to_json(document: RawBSONDocument) -> bytes:
+    """JSON bytes for a raw document projected with api_projection"""
+    return current_app.json.dumps_bytes(bson.decode(document.raw))
+
+
+def json_array(documents: Iterable[RawBSONDocument]) -> bytes:
+    """JSON array of raw documents, decoded in one pass and encoded in one call"""
+    return current_app.json.dumps_bytes(bson.decode_all(b''.join(document.raw for document in documents)))
+
+
+def json_object(*members: Tuple[str, bytes]) -> bytes:
+    """Assemble a JSON object from already encoded member values"""
+    return b'{' + b','.join(b'"' + name.encode('utf-8') + b'":' + value for name, value in members) + b'}'
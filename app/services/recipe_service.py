@@ -1,176 +1,518 @@
-from typing import Dict, List, Optional, Union, Any
-from bson import ObjectId
+from typing import Dict, Iterator, List, Optional, Union, Any
+from bson import ObjectId, errors as bson_errors
 from datetime import datetime
+from flask import current_app
+from collections import Counter
+from pymongo import ReturnDocument
+from pymongo.errors import BulkWriteError
 from pymongo.collection import Collection
-from pymongo.results import InsertOneResult, UpdateResult, DeleteResult
+from pymongo.results import InsertOneResult, UpdateResult
 from app import mongo
-from app.models.recipe import Recipe
+from app.models.recipe import Recipe, RecipeSummary
+from app.services.stats_service import StatsService
+from app.services.comment_service import CommentService
+from app.services.similarity_index import SimilarityIndex
+from app.services.cache import make_cache
+from app.services import raw_json
+from app.services.pagination import RECENT_SORT, ResultCounter, apply_cursor, build_pagination
 from app.config import Config
 
 class RecipeService:
     """Service class for recipe-related operations"""
     
+    # Shared by every RecipeService in the process so writes can invalidate it
+    result_counter = ResultCounter()
+    similarity_index = SimilarityIndex()
+    cache = make_cache('recipe')
+    facet_cache = make_cache('facets')
+    # Filters that get their own facet counts in faceted_search
+    FACET_FIELDS = ("cuisine", "difficulty", "tags", "cooking_time")
+    # Fields that change whenever the recipe's detail page does
+    VALIDATOR_FIELDS = ("updated_at", "comment_count")
+    
     @property
     def collection(self) -> Collection:
         """Get MongoDB collection for recipes"""
         return mongo.db[Config.RECIPES_COLLECTION]
     
+    @property
+    def stats(self) -> StatsService:
+        return StatsService()
+    
+    @property
+    def comments(self) -> CommentService:
+        return CommentService()
+    
     def create_recipe(self, recipe_data: Dict[str, Any]) -> str:
         recipe = Recipe(**recipe_data)
-        result: InsertOneResult = self.collection.insert_one(recipe.to_dict())
+        recipe_doc = recipe.to_dict()
+        result: InsertOneResult = self.collection.insert_one(recipe_doc)
+        self.stats.apply_delta(StatsService.recipe_delta(recipe_doc))
+        self.result_counter.invalidate()
+        self.similarity_index.add(result.inserted_id, recipe_doc.get("tags"), recipe_doc.get("cuisine"))
         return str(result.inserted_id)
     
-    def get_recipe_by_id(self, recipe_id: str) -> Optional[Recipe]:
+    def create_recipes(self, recipe_docs: List[Dict[str, Any]]) -> Dict[int, Dict[str, Any]]:
+        """Insert a batch of recipe documents with one unordered insert_many
+        
+        Every document is attempted even if others fail. Returns the write
+        error (code and errmsg) for each failed position; stats, search
+        counts and the similarity index are updated once for the documents
+        inserted.
+        """
+        if not recipe_docs:
+            return {}
+        errors = {}
         try:
-            recipe_data = self.collection.find_one({"_id": ObjectId(recipe_id)})
+            self.collection.insert_many(recipe_docs, ordered=False)
+        except BulkWriteError as exc:
+            for error in exc.details.get("writeErrors", []):
+                errors[error["index"]] = error
+        inserted = [doc for index, doc in enumerate(recipe_docs) if index not in errors]
+        if inserted:
+            delta = Counter()
+            for doc in inserted:
+                delta.update(StatsService.recipe_delta(doc))
+            self.stats.apply_delta(delta)
+            self.result_counter.invalidate()
+            self.similarity_index.add_many((doc["_id"], doc.get("tags"), doc.get("cuisine")) for doc in inserted)
+        return errors
+    
+    def get_recipe_by_id(self, recipe_id: str,
+                         validators: Optional[Dict[str, Any]] = None) -> Optional[Recipe]:
+        """Recipe by id, from the cache when it is current
+        
+        The cache is per process and only invalidated by this worker's
+        writes. Passing the validators just read from the database makes a
+        cached copy that another worker's write has outdated be refetched.
+        """
+        try:
+            recipe_id_obj = ObjectId(recipe_id)
+            recipe_data = self.cache.get(str(recipe_id_obj))
+            if recipe_data is not None and validators is not None and any(
+                    recipe_data.get(key) != validators.get(key) for key in self.VALIDATOR_FIELDS):
+                recipe_data = None
+            if recipe_data is None:
+                recipe_data = self.collection.find_one({"_id": recipe_id_obj})
+                if recipe_data:
+                    self.cache.set(str(recipe_id_obj), recipe_data)
             return Recipe.from_dict(recipe_data) if recipe_data else None
         except Exception:
             return None
     
+    def get_recipe_validators(self, recipe_id: str) -> Optional[Dict[str, Any]]:
+        """Fields that change whenever the recipe's detail page does"""
+        return self.collection.find_one(
+            {"_id": ObjectId(recipe_id)},
+            {key: 1 for key in self.VALIDATOR_FIELDS}
+        )
+    
+    def get_recipes_by_ids(self, recipe_ids: List[str],
+                           projection: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        # One $in query for the whole batch. Results follow the caller's
+        # order; ids that are malformed or no longer exist are reported back.
+        object_ids = self._parse_ids(recipe_ids)
+        docs = []
+        if object_ids:
+            docs = self.collection.find({"_id": {"$in": list(set(object_ids.values()))}}, projection)
+        return self._ordered_recipes(recipe_ids, object_ids, docs, projection)
+    
+    @staticmethod
+    def _parse_ids(recipe_ids: List[str]) -> Dict[str, ObjectId]:
+        object_ids = {}
+        for recipe_id in recipe_ids:
+            try:
+                object_ids[recipe_id] = ObjectId(recipe_id)
+            except (bson_errors.InvalidId, TypeError):
+                continue
+        return object_ids
+    
+    @staticmethod
+    def _ordered_recipes(recipe_ids: List[str], object_ids: Dict[str, ObjectId],
+                         docs: List[Dict[str, Any]], projection: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+        docs = {doc["_id"]: doc for doc in docs}
+        model = RecipeSummary if projection else Recipe
+        recipes = []
+        missing_ids = []
+        for recipe_id in recipe_ids:
+            doc = docs.get(object_ids.get(recipe_id))
+            if doc:
+                recipes.append(model.from_dict(doc))
+            else:
+                missing_ids.append(recipe_id)
+        return {"recipes": recipes, "missing_ids": missing_ids}
+    
     def update_recipe(self, recipe_id: str, update_data: Dict[str, Any]) -> bool:
         update_data["updated_at"] = datetime.utcnow()
         
-        result: UpdateResult = self.collection.update_one(
+        old_data = self.collection.find_one_and_update(
             {"_id": ObjectId(recipe_id)},
-            {"$set": update_data}
+            {"$set": update_data},
+            projection=StatsService.PROJECTION,
+            return_document=ReturnDocument.BEFORE
         )
-        
-        return result.modified_count > 0
+        if not old_data:
+            return False
+        new_data = {**old_data, **update_data}
+        self.stats.apply_delta(StatsService.update_delta(old_data, new_data))
+        self.result_counter.invalidate()
+        self.similarity_index.add(old_data["_id"], new_data.get("tags"), new_data.get("cuisine"))
+        self.cache.delete(str(old_data["_id"]))
+        return True
     
     def delete_recipe(self, recipe_id: str) -> bool:
-        result: DeleteResult = self.collection.delete_one({"_id": ObjectId(recipe_id)})
-        return result.deleted_count > 0
+        old_data = self.collection.find_one_and_delete(
+            {"_id": ObjectId(recipe_id)},
+            projection=StatsService.PROJECTION
+        )
+        if not old_data:
+            return False
+        self.stats.apply_delta(StatsService.recipe_delta(old_data, -1))
+        self.comments.delete_recipe_comments(old_data["_id"])
+        self.result_counter.invalidate()
+        self.similarity_index.remove(old_data["_id"])
+        self.cache.delete(str(old_data["_id"]))
+        return True
     
     def search_recipes(self, 
                       query: Optional[str] = None, 
                       filters: Optional[Dict[str, Any]] = None,
                       page: int = 1, 
-                      page_size: int = 10) -> Dict[str, Any]:
+                      page_size: int = 10,
+                      cursor: Optional[str] = None,
+                      count_mode: Optional[str] = None) -> Dict[str, Any]:
+        search_query = {}
+        if query:
+            search_query["$text"] = {"$search": query}
+        search_query.update(self._filter_conditions(filters))
+        count, capped = self.result_counter.count(self.collection, search_query, count_mode)
+        return self._find_page(search_query, count, page, page_size, cursor, capped)
+    
+    def iter_recipes(self,
+                     query: Optional[str] = None,
+                     filters: Optional[Dict[str, Any]] = None) -> Iterator[Dict[str, Any]]:
+        """Lazily yield summary documents for every recipe matching a search, newest first"""
+        search_query = {}
+        if query:
+            search_query["$text"] = {"$search": query}
+        search_query.update(self._filter_conditions(filters))
+        return self.collection.find(
+            search_query,
+            RecipeSummary.PROJECTION,
+            batch_size=Config.EXPORT_BATCH_SIZE
+        ).sort(RECENT_SORT)
+    
+    def iter_recipes_json(self,
+                          query: Optional[str] = None,
+                          filters: Optional[Dict[str, Any]] = None) -> Iterator[bytes]:
+        """iter_recipes() as API JSON bytes, converted straight from raw BSON"""
+        search_query = {}
+        if query:
+            search_query["$text"] = {"$search": query}
+        search_query.update(self._filter_conditions(filters))
+        documents = raw_json.raw_collection(self.collection).aggregate([
+            {"$match": search_query},
+            {"$sort": dict(RECENT_SORT)},
+            {"$project": raw_json.api_projection(RecipeSummary)}
+        ], batchSize=Config.EXPORT_BATCH_SIZE)
+        return map(raw_json.to_json, documents)
+    
+    def faceted_search(self,
+                       query: Optional[str] = None,
+                       filters: Optional[Dict[str, Any]] = None,
+                       page: int = 1,
+                       page_size: int = 10,
+                       cursor: Optional[str] = None) -> Dict[str, Any]:
+        """search_recipes() plus the facet counts for the same search"""
+        result = self.search_recipes(query, filters, page, page_size, cursor)
+        result["facets"] = self.get_facets(query, filters)
+        return result
+    
+    def faceted_search_json(self,
+                            query: Optional[str] = None,
+                            filters: Optional[Dict[str, Any]] = None,
+                            page: int = 1,
+                            page_size: int = 10,
+                            cursor: Optional[str] = None) -> bytes:
+        """faceted_search() as the listing's API JSON body
+        
+        The result page is projected to JSON types on the server and
+        converted from raw BSON without building RecipeSummary models.
+        """
         search_query = {}
         if query:
             search_query["$text"] = {"$search": query}
-        if filters:
-            for key, value in filters.items():
-                if key == 'tags' and isinstance(value, list):
-                    search_query["tags"] = {"$in": value}
-                elif key == 'difficulty' and isinstance(value, list):
-                    search_query["difficulty"] = {"$in": value}
-                elif key == 'preparation_time_max' and isinstance(value, int):
-                    search_query["preparation_time"] = {"$lte": value}
-                elif key == 'cooking_time' and isinstance(value, dict) and "$lte" in value:
-                    search_query["cooking_time"] = value
-                elif key == 'cooking_time_max' and isinstance(value, int):
-                    search_query["cooking_time"] = {"$lte": value}
-                else:
-                    search_query[key] = value
-        skip = (page - 1) * page_size
-        count = self.collection.count_documents(search_query)
-        cursor = self.collection.find(search_query).skip(skip).limit(page_size)
-        recipes = [Recipe.from_dict(doc) for doc in cursor]
-        total_pages = (count + page_size - 1) // page_size
+        search_query.update(self._filter_conditions(filters))
+        count, capped = self.result_counter.count(self.collection, search_query)
+        # Leading $match and $sort run as an index seek, like _find_page
+        pipeline = [
+            {"$match": apply_cursor(search_query, cursor, "created_at")},
+            {"$sort": dict(RECENT_SORT)}
+        ]
+        if not cursor:
+            pipeline.append({"$skip": (page - 1) * page_size})
+        pipeline += [{"$limit": page_size + 1}, {"$project": raw_json.api_projection(RecipeSummary)}]
+        docs = list(raw_json.raw_collection(self.collection).aggregate(pipeline))
+        # build_pagination only reads the cursor keys of the last document on the page
+        keys = [{} for _ in docs]
+        if len(docs) > page_size:
+            last = docs[page_size - 1]
+            created_at = last.get("created_at")
+            keys[page_size - 1] = {"_id": ObjectId(last["_id"]),
+                                   "created_at": raw_json.parse_date(created_at) if created_at else None}
+        pagination = build_pagination(page, page_size, count, keys, "created_at", capped)
+        dumps = current_app.json.dumps_bytes
+        return raw_json.json_object(
+            ("recipes", raw_json.json_array(docs[:page_size])),
+            ("pagination", dumps(pagination)),
+            ("facets", dumps(self.get_facets(query, filters)))
+        )
+    
+    def get_facets(self, query: Optional[str] = None,
+                   filters: Optional[Dict[str, Any]] = None) -> Dict[str, List[Dict[str, Any]]]:
+        """Facet counts for a search, cached per filter set and stats version
+        
+        Each facet is counted with every active filter except its own, so
+        selecting a cuisine still shows how many recipes the other cuisines
+        have. The counts need a pass over every matching recipe, so they are
+        cached; any write that changes a counted field bumps the stats
+        snapshot version and so retires the cached entries.
+        """
+        conditions = self._filter_conditions(filters)
+        search_query = dict(conditions)
+        if query:
+            search_query["$text"] = {"$search": query}
+        # Read the version first: a write landing during the aggregation bumps it past this key
+        version = self.stats.get_version()
+        key = f"{version}:{ResultCounter.cache_key(self.collection.name, search_query)}"
+        cached = self.facet_cache.get(key)
+        if cached is not None:
+            return cached["facets"]
+        result = next(self.collection.aggregate(self._facet_pipeline(query, conditions)), {})
+        facets = self._facet_counts(result)
+        self.facet_cache.set(key, {"facets": facets})
+        return facets
+    
+    @classmethod
+    def _facet_pipeline(cls, query: Optional[str], conditions: Dict[str, Any]) -> List[Dict[str, Any]]:
+        base_query = {key: value for key, value in conditions.items() if key not in cls.FACET_FIELDS}
+        if query:
+            base_query["$text"] = {"$search": query}
+        facet_conditions = {key: value for key, value in conditions.items() if key in cls.FACET_FIELDS}
+        
+        def excluding(field: str) -> List[Dict[str, Any]]:
+            match = {key: value for key, value in facet_conditions.items() if key != field}
+            return [{"$match": match}] if match else []
+        
+        time_limits = Config.FACET_COOKING_TIME_LIMITS
+        return [
+            {"$match": base_query},
+            {"$project": {field: 1 for field in cls.FACET_FIELDS}},
+            {"$facet": {
+                "cuisines": excluding("cuisine") + [
+                    {"$group": {"_id": "$cuisine", "count": {"$sum": 1}}},
+                    {"$sort": {"count": -1, "_id": 1}}
+                ],
+                "difficulties": excluding("difficulty") + [
+                    {"$group": {"_id": "$difficulty", "count": {"$sum": 1}}},
+                    {"$sort": {"_id": 1}}
+                ],
+                "tags": excluding("tags") + [
+                    {"$unwind": "$tags"},
+                    {"$group": {"_id": "$tags", "count": {"$sum": 1}}},
+                    {"$sort": {"count": -1, "_id": 1}},
+                    {"$limit": Config.FACET_TAG_LIMIT}
+                ],
+                "cooking_time": excluding("cooking_time") + [
+                    {"$bucket": {
+                        "groupBy": "$cooking_time",
+                        "boundaries": [0] + [limit + 1 for limit in time_limits],
+                        "default": "longer",
+                        "output": {"count": {"$sum": 1}}
+                    }}
+                ]
+            }}
+        ]
+    
+    @staticmethod
+    def _facet_counts(result: Dict[str, Any]) -> Dict[str, List[Dict[str, Any]]]:
+        # Buckets hold ranges; the filter offers "N minutes or less", so accumulate
+        time_limits = Config.FACET_COOKING_TIME_LIMITS
+        bucket_counts = {bucket["_id"]: bucket["count"] for bucket in result.get("cooking_time", [])}
+        cooking_time = []
+        running = 0
+        for lower, limit in zip([0] + [limit + 1 for limit in time_limits], time_limits):
+            running += bucket_counts.get(lower, 0)
+            cooking_time.append({"_id": limit, "count": running})
         return {
-            "recipes": recipes,
-            "pagination": {
-                "page": page,
-                "page_size": page_size,
-                "total_items": count,
-                "total_pages": total_pages
-            }
+            "cuisines": [group for group in result.get("cuisines", []) if group["_id"] is not None],
+            "difficulties": [group for group in result.get("difficulties", []) if group["_id"] is not None],
+            "tags": result.get("tags", []),
+            "cooking_time": cooking_time
         }
     
-    def get_recipes_by_user(self, user_id: str, page: int = 1, page_size: int = 10) -> Dict[str, Any]:
-        return self.search_recipes(filters={"user_id": ObjectId(user_id)}, page=page, page_size=page_size)
+    @staticmethod
+    def _filter_conditions(filters: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+        conditions = {}
+        for key, value in (filters or {}).items():
+            if key == 'tags' and isinstance(value, list):
+                conditions["tags"] = {"$in": value}
+            elif key == 'difficulty' and isinstance(value, list):
+                conditions["difficulty"] = {"$in": value}
+            elif key == 'preparation_time_max' and isinstance(value, int):
+                conditions["preparation_time"] = {"$lte": value}
+            elif key == 'cooking_time' and isinstance(value, dict) and "$lte" in value:
+                conditions["cooking_time"] = value
+            elif key == 'cooking_time_max' and isinstance(value, int):
+                conditions["cooking_time"] = {"$lte": value}
+            else:
+                conditions[key] = value
+        return conditions
+    
+    def get_recipes_by_user(self, user_id: str, page: int = 1, page_size: int = 10,
+                            cursor: Optional[str] = None) -> Dict[str, Any]:
+        return self.search_recipes(filters={"user_id": ObjectId(user_id)}, page=page,
+                                   page_size=page_size, cursor=cursor)
 
-    def get_popular_recipes(self, limit: int = 10) -> List[Recipe]:
+    def get_popular_recipes(self, limit: int = 10) -> List[RecipeSummary]:
+        cursor = self.collection.find(
+            {"ratings_count": {"$gt": 0}},
+            RecipeSummary.PROJECTION
+        ).sort([
+            ("weighted_rating", -1),
+            ("ratings_count", -1)
+        ]).limit(limit)
+        return [RecipeSummary.from_dict(doc) for doc in cursor]
+    
+    def get_popular_recipes_json(self, limit: int = 10) -> bytes:
+        """get_popular_recipes() as a JSON array converted straight from raw BSON"""
+        documents = raw_json.raw_collection(self.collection).aggregate([
+            {"$match": {"ratings_count": {"$gt": 0}}},
+            {"$sort": {"weighted_rating": -1, "ratings_count": -1}},
+            {"$limit": limit},
+            {"$project": raw_json.api_projection(RecipeSummary)}
+        ])
+        return raw_json.json_array(documents)
+    
+    def rate_recipe(self, recipe_id: str, user_id: str, rating: float) -> Optional[Dict[str, Any]]:
+        user_id_obj = ObjectId(user_id) if isinstance(user_id, str) else user_id
+        now = datetime.utcnow()
+        new_rating = {"user_id": user_id_obj, "rating": rating, "date": now}
+        # One rating per user: drop the user's previous rating, append the new one
+        # and recompute the aggregates in the same atomic update
         pipeline = [
-            {"$match": {"user_ratings": {"$exists": True, "$ne": []}}},
-            {"$addFields": {
+            {"$set": {
+                "user_ratings": {
+                    "$concatArrays": [
+                        {"$filter": {
+                            "input": {"$ifNull": ["$user_ratings", []]},
+                            "as": "r",
+                            "cond": {"$ne": ["$$r.user_id", user_id_obj]}
+                        }},
+                        [{"$literal": new_rating}]
+                    ]
+                },
+                "updated_at": now
+            }}
+        ] + self._rating_aggregate_stages()
+        result = self.collection.find_one_and_update(
+            {"_id": ObjectId(recipe_id)},
+            pipeline,
+            projection={"_id": 0, "average_rating": 1, "ratings_count": 1, "weighted_rating": 1},
+            return_document=ReturnDocument.AFTER
+        )
+        self.cache.delete(str(recipe_id))
+        return result
+    
+    def rebuild_rating_aggregates(self) -> int:
+        result: UpdateResult = self.collection.update_many({}, self._rating_aggregate_stages())
+        self.cache.clear()
+        return result.modified_count
+    
+    @staticmethod
+    def _rating_aggregate_stages() -> List[Dict[str, Any]]:
+        prior_mean = Config.RATING_PRIOR_MEAN
+        prior_weight = Config.RATING_PRIOR_WEIGHT
+        return [
+            {"$set": {
                 "average_rating": {"$avg": "$user_ratings.rating"},
-                "ratings_count": {"$size": "$user_ratings"}
+                "ratings_count": {"$size": {"$ifNull": ["$user_ratings", []]}}
             }},
-            {"$sort": {"average_rating": -1, "ratings_count": -1}},
-            {"$limit": limit}
+            {"$set": {
+                "weighted_rating": {
+                    "$divide": [
+                        {"$add": [prior_mean * prior_weight, {"$sum": "$user_ratings.rating"}]},
+                        {"$add": [prior_weight, "$ratings_count"]}
+                    ]
+                }
+            }}
         ]
-        result = list(self.collection.aggregate(pipeline))
-        return [Recipe.from_dict(doc) for doc in result]
     
-    def get_user_recipes(self, user_id: str, page: int = 1, page_size: int = 10) -> Dict[str, Any]:
+    def get_user_recipes(self, user_id: str, page: int = 1, page_size: int = 10,
+                         cursor: Optional[str] = None) -> Dict[str, Any]:
         user_id_obj = ObjectId(user_id) if isinstance(user_id, str) else user_id
         query = {"user_id": user_id_obj}
-        skip = (page - 1) * page_size
         count = self.collection.count_documents(query)
-        cursor = self.collection.find(query).skip(skip).limit(page_size).sort("created_at", -1)
-        recipes = [Recipe.from_dict(doc) for doc in cursor]
-        total_pages = (count + page_size - 1) // page_size if count > 0 else 1
+        return self._find_page(query, count, page, page_size, cursor)
+    
+    def _find_page(self, query: Dict[str, Any], count: int, page: int, page_size: int,
+                   cursor: Optional[str] = None, capped: bool = False) -> Dict[str, Any]:
+        # A continuation token seeks past the previous page through the
+        # (created_at, _id) index instead of skipping over it
+        docs = self.collection.find(
+            apply_cursor(query, cursor, "created_at"),
+            RecipeSummary.PROJECTION
+        ).sort(RECENT_SORT)
+        if not cursor:
+            docs = docs.skip((page - 1) * page_size)
+        docs = list(docs.limit(page_size + 1))
         return {
-            "recipes": recipes,
-            "pagination": {
-                "page": page,
-                "page_size": page_size,
-                "total_items": count,
-                "total_pages": total_pages
-            }
+            "recipes": [RecipeSummary.from_dict(doc) for doc in docs[:page_size]],
+            "pagination": build_pagination(page, page_size, count, docs, "created_at", capped)
         }
     
     def count_user_comments(self, user_id: str) -> int:
-        pipeline = [
-            {"$match": {"comments.user_id": user_id}},
-            {"$unwind": "$comments"},
-            {"$match": {"comments.user_id": user_id}},
-            {"$count": "total_comments"}
-        ]
-        result = list(self.collection.aggregate(pipeline))
-        return result[0].get("total_comments", 0) if result else 0
+        user = mongo.db[Config.USERS_COLLECTION].find_one(
+            {"_id": ObjectId(user_id) if isinstance(user_id, str) else user_id},
+            {"comment_count": 1}
+        )
+        return user.get("comment_count", 0) if user else 0
     
     def get_recipe_stats(self) -> Dict[str, Any]:
-        cuisine_pipeline = [
-            {"$group": {"_id": "$cuisine", "count": {"$sum": 1}}},
-            {"$sort": {"count": -1}}
-        ]
-        cuisine_stats = list(self.collection.aggregate(cuisine_pipeline))
-        difficulty_pipeline = [
-            {"$group": {"_id": "$difficulty", "count": {"$sum": 1}}},
-            {"$sort": {"_id": 1}}
-        ]
-        difficulty_stats = list(self.collection.aggregate(difficulty_pipeline))
-        time_pipeline = [
-            {"$group": {
-                "_id": None,
-                "avg_prep_time": {"$avg": "$preparation_time"},
-                "avg_cook_time": {"$avg": "$cooking_time"}
-            }}
-        ]
-        time_stats = list(self.collection.aggregate(time_pipeline))
-        tag_pipeline = [
-            {"$unwind": "$tags"},
-            {"$group": {"_id": "$tags", "count": {"$sum": 1}}},
-            {"$sort": {"count": -1}},
-            {"$limit": 10}
-        ]
-        tag_stats = list(self.collection.aggregate(tag_pipeline))
-        return {
-            "total_recipes": self.collection.count_documents({}),
-            "cuisines": cuisine_stats,
-            "difficulties": difficulty_stats,
-            "time_stats": time_stats[0] if time_stats else {},
-            "popular_tags": tag_stats
-        }
+        return self.stats.get_stats()
+    
+    def rebuild_recipe_stats(self) -> Dict[str, Any]:
+        return self.stats.rebuild()
         
     def add_comment(self, recipe_id: str, comment_data: Dict[str, Any]) -> bool:
-        if 'date' not in comment_data:
-            comment_data['date'] = datetime.utcnow()
-        result = self.collection.update_one(
-            {"_id": ObjectId(recipe_id)},
-            {"$push": {"comments": comment_data}}
-        )
-        return result.modified_count > 0
+        comment = self.comments.add_comment(recipe_id, comment_data)
+        self.cache.delete(str(recipe_id))
+        return comment is not None
+    
+    def get_comments(self, recipe_id: str, page: int = 1, page_size: Optional[int] = None,
+                     recipe: Optional[Recipe] = None) -> Dict[str, Any]:
+        return self.comments.get_comments(recipe_id, page, page_size, recipe)
     
-    def get_similar_recipes(self, recipe_id: str, limit: int = 3) -> List[Recipe]:
-        source_recipe = self.get_recipe_by_id(recipe_id)
+    def get_similar_recipes(self, recipe: Union[str, Recipe], limit: int = 3) -> List[RecipeSummary]:
+        # Callers that already loaded the recipe pass it in to skip a fetch
+        source_recipe = self.get_recipe_by_id(recipe) if isinstance(recipe, str) else recipe
         if not source_recipe:
             return []
+        recipe_id = ObjectId(source_recipe._id)
+        if Config.SIMILARITY_INDEX_ENABLED:
+            self.similarity_index.warm(self.collection)
+            similar_ids = self.similarity_index.similar(recipe_id, source_recipe.tags, source_recipe.cuisine, limit)
+            if similar_ids is not None:
+                return self.get_recipes_by_ids(similar_ids, RecipeSummary.PROJECTION)["recipes"]
+        # Index still loading: score the candidates in the database
+        pipeline = self._similar_pipeline(source_recipe, limit)
+        result = list(self.collection.aggregate(pipeline))
+        return [RecipeSummary.from_dict(doc) for doc in result]
+    
+    @staticmethod
+    def _similar_pipeline(source_recipe: Recipe, limit: int) -> List[Dict[str, Any]]:
         query = {
-            "_id": {"$ne": ObjectId(recipe_id)}, 
+            "_id": {"$ne": ObjectId(source_recipe._id)}, 
             "$or": [
                 {"tags": {"$in": source_recipe.tags}},
                 {"cuisine": source_recipe.cuisine}
@@ -180,6 +522,7 @@ class RecipeService:
         # The more tags in common, the better
         pipeline = [
             {"$match": query},
+            {"$project": RecipeSummary.PROJECTION},
             {"$addFields": {
                 "commonTags": {
                     "$size": {
@@ -193,8 +536,7 @@ class RecipeService:
             {"$addFields": {
                 "relevanceScore": {"$add": ["$commonTags", "$sameCuisine"]}
             }},
-            {"$sort": {"relevanceScore": -1}},
+            {"$sort": {"relevanceScore": -1, "_id": -1}},
             {"$limit": limit}
         ]
-        result = list(self.collection.aggregate(pipeline))
-        return [Recipe.from_dict(doc) for doc in result]
\ No newline at end of file
+        return pipeline
\ No newline at end of file
@@ -0,0 +1,145 @@
+from typing import Dict, List, Optional, Any
+from bson import ObjectId
+from datetime import datetime, timedelta
+from pymongo.collection import Collection
+from app import mongo
+from app.models.recipe import RecipeSummary
+from app.services.recipe_service import RecipeService
+from app.services.stats_service import StatsService
+from app.services.pagination import build_pagination
+from app.config import Config
+
+class RecommendationService:
+    """Service class for precomputed per-user recommendation lists
+
+    Each user_recommendations document holds the ranked recipe ids and
+    scores for one user together with the corpus version of the stats
+    snapshot the list was computed against. Lists are regenerated when the
+    user's profile changes and by `flask refresh-recommendations` once
+    recipes are added, removed or re-tagged.
+    """
+
+    PROFILE_FIELDS = {"dietary_preferences": 1, "favorite_cuisines": 1, "cooking_skill_level": 1}
+
+    @property
+    def collection(self) -> Collection:
+        """Get MongoDB collection for recommendation lists"""
+        return mongo.db[Config.RECOMMENDATIONS_COLLECTION]
+
+    @property
+    def users(self) -> Collection:
+        return mongo.db[Config.USERS_COLLECTION]
+
+    @classmethod
+    def profile_of(cls, user: Any) -> Dict[str, Any]:
+        """Profile fields of an already loaded User"""
+        return {field: getattr(user, field) for field in cls.PROFILE_FIELDS}
+
+    @staticmethod
+    def difficulty_levels(skill_level: str) -> List[str]:
+        """Get appropriate difficulty levels based on skill level"""
+        skill_to_difficulty = {
+            "Beginner": ["Easy"],
+            "Intermediate": ["Easy", "Medium"],
+            "Advanced": ["Easy", "Medium", "Hard"]
+        }
+        return skill_to_difficulty.get(skill_level, ["Easy"])
+
+    @classmethod
+    def build_pipeline(cls, profile: Dict[str, Any], limit: int) -> List[Dict[str, Any]]:
+        """Scoring aggregation returning the top recipe ids and scores for a profile"""
+        dietary_preferences = profile.get('dietary_preferences') or []
+        favorite_cuisines = profile.get('favorite_cuisines') or []
+        difficulties = cls.difficulty_levels(profile.get('cooking_skill_level', 'Beginner'))
+        pipeline = [
+            {"$match": {
+                "$or": [
+                    {"tags": {"$in": dietary_preferences}},
+                    {"cuisine": {"$in": favorite_cuisines}},
+                    {"difficulty": {"$in": difficulties}}
+                ]
+            }},
+            {"$project": {
+                "score": {
+                    "$add": [
+                        {"$size": {"$setIntersection": [{"$ifNull": ["$tags", []]}, dietary_preferences]}},
+                        {"$cond": [{"$in": ["$cuisine", favorite_cuisines]}, 1, 0]},
+                        {"$cond": [{"$in": ["$difficulty", difficulties]}, 1, 0]}
+                    ]
+                }
+            }},
+            {"$sort": {"score": -1, "_id": -1}},
+            {"$limit": limit}
+        ]
+        if not dietary_preferences and not favorite_cuisines:
+            pipeline.pop(0)
+        return pipeline
+
+    def refresh(self, user_id: str, corpus_version: Optional[int] = None,
+                profile: Optional[Dict[str, Any]] = None) -> Optional[Dict[str, Any]]:
+        """Recompute and store the recommendation list for a user
+
+        Pass the user's profile fields when they are already loaded to skip
+        re-reading the user document.
+        """
+        user_id_obj = ObjectId(user_id) if isinstance(user_id, str) else user_id
+        if profile is None:
+            profile = self.users.find_one({"_id": user_id_obj}, self.PROFILE_FIELDS)
+        if not profile:
+            self.collection.delete_one({"_id": user_id_obj})
+            return None
+        if corpus_version is None:
+            corpus_version = StatsService().get_corpus_version()
+        pipeline = self.build_pipeline(profile, Config.RECOMMENDATIONS_LIMIT)
+        items = [
+            {"recipe_id": doc["_id"], "score": doc["score"]}
+            for doc in mongo.db[Config.RECIPES_COLLECTION].aggregate(pipeline)
+        ]
+        recommendations = {
+            "_id": user_id_obj,
+            "items": items,
+            "corpus_version": corpus_version,
+            "generated_at": datetime.utcnow()
+        }
+        self.collection.replace_one({"_id": user_id_obj}, recommendations, upsert=True)
+        return recommendations
+
+    def get_recommendations(self, user_id: str, page: int = 1, page_size: int = 12,
+                            profile: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """Page through a user's stored list with a single multi-get for the recipes"""
+        user_id_obj = ObjectId(user_id) if isinstance(user_id, str) else user_id
+        recommendations = self.collection.find_one({"_id": user_id_obj})
+        max_age = timedelta(seconds=Config.RECOMMENDATIONS_MAX_AGE)
+        if not recommendations or recommendations["generated_at"] < datetime.utcnow() - max_age:
+            # Lists are normally kept fresh by refresh-recommendations,
+            # only missing or abandoned ones are built inline
+            recommendations = self.refresh(user_id_obj, profile=profile) or {"items": []}
+        items = recommendations["items"]
+        page_items = items[(page - 1) * page_size:page * page_size + 1]
+        result = RecipeService().get_recipes_by_ids(
+            [item["recipe_id"] for item in page_items[:page_size]],
+            RecipeSummary.PROJECTION
+        )
+        return {
+            "recipes": result["recipes"],
+            "pagination": build_pagination(page, page_size, len(items), page_items)
+        }
+
+    def refresh_stale(self, batch_size: Optional[int] = None) -> int:
+        """Regenerate every stored list computed against an older corpus version"""
+        batch_size = batch_size or Config.MIGRATION_BATCH_SIZE
+        corpus_version = StatsService().get_corpus_version()
+        refreshed = 0
+        last_id = None
+        while True:
+            query = {"corpus_version": {"$ne": corpus_version}}
+            if last_id is not None:
+                query["_id"] = {"$gt": last_id}
+            batch = list(self.collection.find(query, {"_id": 1}).sort("_id", 1).limit(batch_size))
+            if not batch:
+                break
+            last_id = batch[-1]["_id"]
+            for doc in batch:
+                if self.refresh(doc["_id"], corpus_version):
+                    refreshed += 1
+        return refreshed
\ No newline at end of file
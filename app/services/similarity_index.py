@@ -0,0 +1,197 @@
+import heapq
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timedelta
+from itertools import islice
+from typing import Any, Dict, FrozenSet, Iterable, List, Optional, Set, Tuple
+from bson import ObjectId
+from pymongo.collection import Collection
+from app.config import Config
+
+
+class SimilarityIndex:
+    """Per-worker inverted index of recipe tags and cuisines
+
+    Tags are interned to integers; each tag and cuisine keeps a posting set
+    of recipe ids. Similarity is the number of shared tags plus one for the
+    same cuisine, matching the Mongo pipeline it replaces.
+
+    The index loads in a background thread. Until the first load finishes
+    similar() returns None and callers fall back to the database. Writes
+    made in this process are applied immediately. Every SIMILARITY_INDEX_TTL
+    seconds the recipes updated since the last sync are re-read, picking up
+    other workers' writes; their deletes only disappear on the full reload
+    every SIMILARITY_INDEX_REBUILD_INTERVAL seconds.
+
+    Posting lists longer than SIMILARITY_POSTINGS_CAP (popular tags and
+    cuisines) are never walked in full: they only add to the scores of
+    candidates found through the shorter lists, and are sampled up to the
+    cap when those yield too few candidates.
+    """
+
+    def __init__(self, ttl: Optional[int] = None, postings_cap: Optional[int] = None,
+                 rebuild_interval: Optional[int] = None):
+        self.ttl = ttl
+        self.postings_cap = postings_cap
+        self.rebuild_interval = rebuild_interval
+        self._lock = threading.Lock()
+        self._tag_ids: Dict[str, int] = {}
+        self._recipes: Dict[ObjectId, Tuple[FrozenSet[int], Optional[str]]] = {}
+        self._tag_postings: Dict[int, Set[ObjectId]] = {}
+        self._cuisine_postings: Dict[str, Set[ObjectId]] = {}
+        self._loaded_at: Optional[float] = None
+        self._rebuilt_at: Optional[float] = None
+        # Newest updated_at read from the database, where the next refresh starts
+        self._synced_to: Optional[datetime] = None
+        self._loading = False
+        # Writes seen while a load is running, replayed on top of it
+        self._pending: List[Tuple[ObjectId, Optional[Iterable[str]], Optional[str]]] = []
+
+    @property
+    def ready(self) -> bool:
+        return self._loaded_at is not None
+
+    def warm(self, collection: Collection, background: bool = True) -> None:
+        """Start a load if the index is cold, or a refresh once it is older than the TTL"""
+        ttl = self.ttl or Config.SIMILARITY_INDEX_TTL
+        rebuild_interval = self.rebuild_interval or Config.SIMILARITY_INDEX_REBUILD_INTERVAL
+        now = time.monotonic()
+        with self._lock:
+            if self._loading:
+                return
+            if self._loaded_at is not None and now - self._loaded_at < ttl:
+                return
+            full = self._rebuilt_at is None or self._synced_to is None or now - self._rebuilt_at >= rebuild_interval
+            self._loading = True
+            self._pending = []
+        target = self._load if full else self._refresh
+        if background:
+            threading.Thread(target=target, args=(collection,), daemon=True,
+                             name='similarity-index-loader').start()
+        else:
+            target(collection)
+
+    def add(self, recipe_id: ObjectId, tags: Optional[Iterable[str]], cuisine: Optional[str]) -> None:
+        """Insert or replace a recipe's entry"""
+        with self._lock:
+            if self._loading:
+                self._pending.append((recipe_id, tags, cuisine))
+            if self._loaded_at is not None:
+                self._apply(recipe_id, tags, cuisine)
+
+    def add_many(self, entries: Iterable[Tuple[ObjectId, Optional[Iterable[str]], Optional[str]]]) -> None:
+        """add() for a batch of (recipe_id, tags, cuisine) entries under one lock"""
+        with self._lock:
+            for entry in entries:
+                if self._loading:
+                    self._pending.append(entry)
+                if self._loaded_at is not None:
+                    self._apply(*entry)
+
+    def remove(self, recipe_id: ObjectId) -> None:
+        self.add(recipe_id, None, None)
+
+    def similar(self, recipe_id: ObjectId, tags: Iterable[str], cuisine: Optional[str],
+                limit: int) -> Optional[List[ObjectId]]:
+        """Ids of the top `limit` recipes by shared tags plus cuisine match, or None while cold"""
+        cap = self.postings_cap or Config.SIMILARITY_POSTINGS_CAP
+        with self._lock:
+            if self._loaded_at is None:
+                return None
+            postings = [self._tag_postings.get(self._tag_ids.get(tag), ()) for tag in set(tags or [])]
+            if cuisine:
+                postings.append(self._cuisine_postings.get(cuisine, ()))
+            # Copy the short lists so they can be walked after releasing the lock;
+            # the long ones are only probed for membership
+            short = [tuple(ids) for ids in postings if 0 < len(ids) <= cap]
+            long = [ids for ids in postings if len(ids) > cap]
+            samples = []
+            if long and sum(len(ids) for ids in short) <= limit:
+                samples = [tuple(islice(ids, cap)) for ids in long]
+        scores = Counter()
+        for ids in short:
+            scores.update(ids)
+        for ids in samples:
+            scores.update(dict.fromkeys(ids, 0))
+        scores.pop(recipe_id, None)
+        if long:
+            for doc_id in scores:
+                scores[doc_id] += sum(doc_id in ids for ids in long)
+        # Newer recipes (larger ObjectIds) win ties
+        top = heapq.nlargest(limit, scores.items(), key=lambda item: (item[1], item[0]))
+        return [doc_id for doc_id, _ in top]
+
+    def _load(self, collection: Collection) -> None:
+        index = SimilarityIndex(self.ttl)
+        try:
+            for doc in collection.find({}, {"tags": 1, "cuisine": 1, "updated_at": 1}):
+                index._apply(doc["_id"], doc.get("tags"), doc.get("cuisine"))
+                index._advance(doc)
+        except Exception:
+            with self._lock:
+                self._loading = False
+            raise
+        with self._lock:
+            for recipe_id, tags, cuisine in self._pending:
+                index._apply(recipe_id, tags, cuisine)
+            self._tag_ids = index._tag_ids
+            self._recipes = index._recipes
+            self._tag_postings = index._tag_postings
+            self._cuisine_postings = index._cuisine_postings
+            self._synced_to = index._synced_to
+            self._loaded_at = self._rebuilt_at = time.monotonic()
+            self._loading = False
+            self._pending = []
+
+    def _refresh(self, collection: Collection) -> None:
+        # Re-read a window of one TTL before the last sync so writes that
+        # committed late, or were stamped by a worker with a lagging clock,
+        # are not skipped
+        since = self._synced_to - timedelta(seconds=self.ttl or Config.SIMILARITY_INDEX_TTL)
+        try:
+            docs = list(collection.find({"updated_at": {"$gte": since}}, {"tags": 1, "cuisine": 1, "updated_at": 1}))
+        except Exception:
+            with self._lock:
+                self._loading = False
+            raise
+        with self._lock:
+            for doc in docs:
+                self._apply(doc["_id"], doc.get("tags"), doc.get("cuisine"))
+                self._advance(doc)
+            # Local writes made during the query may be newer than what it read
+            for recipe_id, tags, cuisine in self._pending:
+                self._apply(recipe_id, tags, cuisine)
+            self._loaded_at = time.monotonic()
+            self._loading = False
+            self._pending = []
+
+    def _advance(self, doc: Dict[str, Any]) -> None:
+        updated_at = doc.get("updated_at")
+        if isinstance(updated_at, datetime) and (self._synced_to is None or updated_at > self._synced_to):
+            self._synced_to = updated_at
+
+    def _apply(self, recipe_id: ObjectId, tags: Optional[Iterable[str]], cuisine: Optional[str]) -> None:
+        # Caller holds the lock (or owns a private index being loaded)
+        previous = self._recipes.pop(recipe_id, None)
+        if previous:
+            old_tags, old_cuisine = previous
+            for tag_id in old_tags:
+                self._tag_postings[tag_id].discard(recipe_id)
+            if old_cuisine:
+                self._cuisine_postings[old_cuisine].discard(recipe_id)
+        if tags is None and cuisine is None:
+            return
+        tag_ids = frozenset(self._intern(tag) for tag in (tags or []) if isinstance(tag, str))
+        cuisine = cuisine if isinstance(cuisine, str) and cuisine else None
+        self._recipes[recipe_id] = (tag_ids, cuisine)
+        for tag_id in tag_ids:
+            self._tag_postings.setdefault(tag_id, set()).add(recipe_id)
+        if cuisine:
+            self._cuisine_postings.setdefault(cuisine, set()).add(recipe_id)
+
+    def _intern(self, tag: str) -> int:
+        tag_id = self._tag_ids.get(tag)
+        if tag_id is None:
+            tag_id = self._tag_ids[tag] = len(self._tag_ids)
+        return tag_id
@@ -0,0 +1,216 @@
+import threading
+import time
+from typing import Dict, List, Optional, Any
+from collections import Counter
+from datetime import datetime
+from pymongo.collection import Collection
+from app import mongo
+from app.config import Config
+
+class StatsService:
+    """Service class for the materialized recipe statistics snapshot"""
+
+    SNAPSHOT_ID = "recipes"
+    # Recipe fields the counters are derived from
+    PROJECTION = {"cuisine": 1, "difficulty": 1, "tags": 1, "preparation_time": 1, "cooking_time": 1}
+    # Counters whose change means recommendation scores may change: recipes
+    # added or removed, or a recipe's cuisine, difficulty or tags edited
+    CORPUS_COUNTERS = ("total_recipes", "cuisines.", "difficulties.", "tags.")
+    # Per-process copy of the cuisine and tag vocabularies: (expires_at, vocabularies)
+    _vocabularies = None
+    _vocabularies_lock = threading.Lock()
+
+    @property
+    def collection(self) -> Collection:
+        """Get MongoDB collection for statistics snapshots"""
+        return mongo.db[Config.STATS_COLLECTION]
+
+    @property
+    def recipes(self) -> Collection:
+        return mongo.db[Config.RECIPES_COLLECTION]
+
+    @staticmethod
+    def encode_key(value: str) -> str:
+        """Escape a value so it can be used as a document field name"""
+        return value.replace("%", "%25").replace(".", "%2E").replace("$", "%24")
+
+    @staticmethod
+    def decode_key(key: str) -> str:
+        return key.replace("%24", "$").replace("%2E", ".").replace("%25", "%")
+
+    @classmethod
+    def recipe_delta(cls, recipe: Dict[str, Any], sign: int = 1) -> Counter:
+        """Counter increments contributed by a single recipe document"""
+        delta = Counter({"total_recipes": sign})
+        for field, counter in (("cuisine", "cuisines"), ("difficulty", "difficulties")):
+            value = recipe.get(field)
+            if isinstance(value, str) and value:
+                delta[f"{counter}.{cls.encode_key(value)}"] += sign
+        for tag in recipe.get("tags") or []:
+            if isinstance(tag, str) and tag:
+                delta[f"tags.{cls.encode_key(tag)}"] += sign
+        for field, prefix in (("preparation_time", "prep_time"), ("cooking_time", "cook_time")):
+            value = recipe.get(field)
+            if isinstance(value, (int, float)) and not isinstance(value, bool):
+                delta[f"{prefix}_sum"] += sign * value
+                delta[f"{prefix}_count"] += sign
+        return delta
+
+    @classmethod
+    def update_delta(cls, old: Dict[str, Any], new: Dict[str, Any]) -> Counter:
+        """Counter increments for replacing the old recipe values with the new ones"""
+        delta = cls.recipe_delta(new)
+        delta.update(cls.recipe_delta(old, -1))
+        return delta
+
+    def apply_delta(self, delta: Counter) -> bool:
+        increments = {key: value for key, value in delta.items() if value}
+        if not increments:
+            return False
+        increments["version"] = 1
+        if any(key.startswith(self.CORPUS_COUNTERS) for key in increments):
+            increments["corpus_version"] = 1
+        # Never upsert: a partial snapshot would silently under-count,
+        # get_stats rebuilds the snapshot when it is missing
+        result = self.collection.update_one(
+            {"_id": self.SNAPSHOT_ID},
+            {"$inc": increments, "$set": {"updated_at": datetime.utcnow()}}
+        )
+        self.invalidate_vocabularies()
+        return result.modified_count > 0
+
+    def get_snapshot(self) -> Dict[str, Any]:
+        snapshot = self.collection.find_one({"_id": self.SNAPSHOT_ID})
+        return snapshot if snapshot else self.rebuild()
+
+    def get_version(self) -> int:
+        """Version of the snapshot, bumped on every recipe write"""
+        snapshot = self.collection.find_one({"_id": self.SNAPSHOT_ID}, {"version": 1})
+        return (snapshot or self.rebuild()).get("version", 0)
+
+    def get_corpus_version(self) -> int:
+        """Version of the recipe corpus recommendations are scored against,
+        bumped only by writes that can change a recommendation score"""
+        snapshot = self.collection.find_one({"_id": self.SNAPSHOT_ID}, {"corpus_version": 1})
+        return (snapshot or self.rebuild()).get("corpus_version", 0)
+
+    def get_vocabularies(self) -> Dict[str, Any]:
+        """Distinct cuisines and tags with recipe counts, served from memory
+
+        The copy is reloaded from the snapshot after VOCABULARY_TTL seconds,
+        or immediately after a recipe write in this process.
+        """
+        with self._vocabularies_lock:
+            cached = StatsService._vocabularies
+        if cached and cached[0] > time.monotonic():
+            return cached[1]
+        snapshot = self.collection.find_one(
+            {"_id": self.SNAPSHOT_ID},
+            {"version": 1, "cuisines": 1, "tags": 1}
+        ) or self.rebuild()
+        vocabularies = {
+            "version": snapshot.get("version", 0),
+            "cuisines": sorted(self._counter_list(snapshot.get("cuisines")), key=lambda item: item["_id"]),
+            "tags": sorted(self._counter_list(snapshot.get("tags")), key=lambda item: item["_id"])
+        }
+        with self._vocabularies_lock:
+            StatsService._vocabularies = (time.monotonic() + Config.VOCABULARY_TTL, vocabularies)
+        return vocabularies
+
+    @classmethod
+    def invalidate_vocabularies(cls) -> None:
+        with cls._vocabularies_lock:
+            cls._vocabularies = None
+
+    def get_stats(self) -> Dict[str, Any]:
+        snapshot = self.get_snapshot()
+        cuisines = self._counter_list(snapshot.get("cuisines"))
+        cuisines.sort(key=lambda item: (-item["count"], item["_id"]))
+        difficulties = self._counter_list(snapshot.get("difficulties"))
+        difficulties.sort(key=lambda item: item["_id"])
+        tags = self._counter_list(snapshot.get("tags"))
+        tags.sort(key=lambda item: (-item["count"], item["_id"]))
+        time_stats = {}
+        if snapshot.get("total_recipes"):
+            time_stats = {
+                "_id": None,
+                "avg_prep_time": self._average(snapshot, "prep_time"),
+                "avg_cook_time": self._average(snapshot, "cook_time")
+            }
+        return {
+            "total_recipes": snapshot.get("total_recipes", 0),
+            "cuisines": cuisines,
+            "difficulties": difficulties,
+            "time_stats": time_stats,
+            "popular_tags": tags[:10]
+        }
+
+    def rebuild(self) -> Dict[str, Any]:
+        """Recompute the snapshot from the recipes collection, repairing any drift"""
+        pipeline = [
+            {"$facet": {
+                "totals": [
+                    {"$group": {
+                        "_id": None,
+                        "total_recipes": {"$sum": 1},
+                        "prep_time_sum": {"$sum": "$preparation_time"},
+                        "prep_time_count": {"$sum": {"$cond": [{"$isNumber": "$preparation_time"}, 1, 0]}},
+                        "cook_time_sum": {"$sum": "$cooking_time"},
+                        "cook_time_count": {"$sum": {"$cond": [{"$isNumber": "$cooking_time"}, 1, 0]}}
+                    }}
+                ],
+                "cuisines": [
+                    {"$group": {"_id": "$cuisine", "count": {"$sum": 1}}}
+                ],
+                "difficulties": [
+                    {"$group": {"_id": "$difficulty", "count": {"$sum": 1}}}
+                ],
+                "tags": [
+                    {"$unwind": "$tags"},
+                    {"$group": {"_id": "$tags", "count": {"$sum": 1}}}
+                ]
+            }}
+        ]
+        result = next(self.recipes.aggregate(pipeline), {})
+        totals = result.get("totals") or [{}]
+        totals = totals[0]
+        previous = self.collection.find_one({"_id": self.SNAPSHOT_ID}, {"version": 1, "corpus_version": 1}) or {}
+        now = datetime.utcnow()
+        snapshot = {
+            "_id": self.SNAPSHOT_ID,
+            "version": previous.get("version", 0) + 1,
+            # Rebuilding recounts the same recipes, so recommendations stay valid
+            "corpus_version": previous.get("corpus_version", 0),
+            "total_recipes": totals.get("total_recipes", 0),
+            "cuisines": self._counter_doc(result.get("cuisines", [])),
+            "difficulties": self._counter_doc(result.get("difficulties", [])),
+            "tags": self._counter_doc(result.get("tags", [])),
+            "prep_time_sum": totals.get("prep_time_sum", 0),
+            "prep_time_count": totals.get("prep_time_count", 0),
+            "cook_time_sum": totals.get("cook_time_sum", 0),
+            "cook_time_count": totals.get("cook_time_count", 0),
+            "rebuilt_at": now,
+            "updated_at": now
+        }
+        self.collection.replace_one({"_id": self.SNAPSHOT_ID}, snapshot, upsert=True)
+        self.invalidate_vocabularies()
+        return snapshot
+
+    def _counter_doc(self, groups: List[Dict[str, Any]]) -> Dict[str, int]:
+        return {
+            self.encode_key(group["_id"]): group["count"]
+            for group in groups
+            if isinstance(group.get("_id"), str) and group["_id"]
+        }
+
+    def _counter_list(self, counters: Optional[Dict[str, int]]) -> List[Dict[str, Any]]:
+        return [
+            {"_id": self.decode_key(key), "count": count}
+            for key, count in (counters or {}).items()
+            if count > 0
+        ]
+
+    @staticmethod
+    def _average(snapshot: Dict[str, Any], prefix: str) -> Optional[float]:
+        count = snapshot.get(f"{prefix}_count", 0)
+        return snapshot.get(f"{prefix}_sum", 0) / count if count else None
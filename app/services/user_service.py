@@ -1,17 +1,29 @@
 from typing import Dict, List, Optional, Union, Any
-from bson import ObjectId
+from bson import ObjectId, errors as bson_errors
 from datetime import datetime
+from pymongo import UpdateOne
 from pymongo.collection import Collection
 from pymongo.errors import DuplicateKeyError
 from app import mongo
 from app.models.user import User
+from app.services.cache import make_cache
 from app.config import Config
 
 class UserService:
+    # Fields the recommendation scoring depends on
+    RECOMMENDATION_FIELDS = ('dietary_preferences', 'favorite_cuisines', 'cooking_skill_level')
+    # Shared by every UserService in the process so writes can invalidate it
+    cache = make_cache('user')
+    
     @property
     def collection(self) -> Collection:
         return mongo.db[Config.USERS_COLLECTION]
     
+    @property
+    def recommendations(self):
+        from app.services.recommendation_service import RecommendationService
+        return RecommendationService()
+    
     def create_user(self, user_data: Dict[str, Any]) -> Dict[str, Any]:
         if 'password' in user_data:
             user_data['password_hash'] = User.hash_password(user_data.pop('password'))
@@ -24,7 +36,12 @@ class UserService:
     
     def get_user_by_id(self, user_id: str) -> Optional[User]:
         try:
-            user_data = self.collection.find_one({"_id": ObjectId(user_id)})
+            user_id_obj = ObjectId(user_id)
+            user_data = self.cache.get(str(user_id_obj))
+            if user_data is None:
+                user_data = self.collection.find_one({"_id": user_id_obj})
+                if user_data:
+                    self.cache.set(str(user_id_obj), user_data)
             return User.from_dict(user_data) if user_data else None
         except Exception:
             return None
@@ -52,15 +69,19 @@ class UserService:
                 {"_id": ObjectId(user_id)},
                 {"$set": update_data}
             )
-            return result.modified_count > 0
         except DuplicateKeyError:
             return False
+        self.cache.delete(str(user_id))
+        if result.modified_count > 0 and any(field in update_data for field in self.RECOMMENDATION_FIELDS):
+            self.recommendations.refresh(user_id)
+        return result.modified_count > 0
     
     def add_favorite_recipe(self, user_id: str, recipe_id: str) -> bool:
         result = self.collection.update_one(
             {"_id": ObjectId(user_id)},
             {"$addToSet": {"favorite_recipes": ObjectId(recipe_id)}}
         )
+        self.cache.delete(str(user_id))
         return result.modified_count > 0
     
     def remove_favorite_recipe(self, user_id: str, recipe_id: str) -> bool:
@@ -68,8 +89,93 @@ class UserService:
             {"_id": ObjectId(user_id)},
             {"$pull": {"favorite_recipes": ObjectId(recipe_id)}}
         )
+        self.cache.delete(str(user_id))
+        return result.modified_count > 0
+    
+    def prune_favorite_recipes(self, user_id: str, recipe_ids: List[str]) -> bool:
+        stale_ids = []
+        for recipe_id in recipe_ids:
+            try:
+                stale_ids.append(ObjectId(recipe_id))
+            except (bson_errors.InvalidId, TypeError):
+                stale_ids.append(recipe_id)
+        if not stale_ids:
+            return False
+        result = self.collection.update_one(
+            {"_id": ObjectId(user_id)},
+            {"$pullAll": {"favorite_recipes": stale_ids}}
+        )
+        self.cache.delete(str(user_id))
         return result.modified_count > 0
     
+    def record_comment(self, user_id: Union[str, ObjectId], date: datetime) -> bool:
+        result = self.collection.update_one(
+            {"_id": ObjectId(user_id) if isinstance(user_id, str) else user_id},
+            {"$inc": {"comment_count": 1}, "$max": {"last_comment_at": date}}
+        )
+        self.cache.delete(str(user_id))
+        return result.modified_count > 0
+    
+    def adjust_comment_counts(self, deltas: Dict[Any, int]) -> int:
+        """Apply per-user comment count changes, e.g. after comments are deleted"""
+        updates = []
+        for user_id, delta in deltas.items():
+            try:
+                user_id = ObjectId(user_id) if isinstance(user_id, str) else user_id
+            except bson_errors.InvalidId:
+                continue
+            if delta:
+                updates.append(UpdateOne({"_id": user_id}, {"$inc": {"comment_count": delta}}))
+                self.cache.delete(str(user_id))
+        if not updates:
+            return 0
+        return self.collection.bulk_write(updates, ordered=False).modified_count
+    
+    def rebuild_comment_counts(self, batch_size: Optional[int] = None) -> int:
+        """Recompute comment_count and last_comment_at for every user from the comment buckets
+
+        Comments posted while the rebuild runs may be counted twice or not at
+        all, so run it while writes are quiet and after migrate-comments.
+        """
+        batch_size = batch_size or Config.MIGRATION_BATCH_SIZE
+        pipeline = [
+            {"$unwind": "$comments"},
+            {"$group": {
+                "_id": "$comments.user_id",
+                "count": {"$sum": 1},
+                "last": {"$max": "$comments.date"}
+            }}
+        ]
+        totals = {}
+        for group in mongo.db[Config.COMMENTS_COLLECTION].aggregate(pipeline, allowDiskUse=True):
+            # Older comments stored the author as a string id
+            try:
+                user_id = ObjectId(group["_id"]) if isinstance(group["_id"], str) else group["_id"]
+            except bson_errors.InvalidId:
+                continue
+            count, last = totals.get(user_id, (0, None))
+            if last is None or (group["last"] is not None and group["last"] > last):
+                last = group["last"]
+            totals[user_id] = (count + group["count"], last)
+        updated = 0
+        last_id = None
+        while True:
+            query = {"_id": {"$gt": last_id}} if last_id is not None else {}
+            batch = list(self.collection.find(query, {"_id": 1}).sort("_id", 1).limit(batch_size))
+            if not batch:
+                break
+            last_id = batch[-1]["_id"]
+            updates = []
+            for doc in batch:
+                count, last = totals.get(doc["_id"], (0, None))
+                updates.append(UpdateOne(
+                    {"_id": doc["_id"]},
+                    {"$set": {"comment_count": count, "last_comment_at": last}}
+                ))
+            updated += self.collection.bulk_write(updates, ordered=False).modified_count
+        self.cache.clear()
+        return updated
+    
     def get_favorite_recipes(self, user_id: str) -> List[str]:
         user = self.get_user_by_id(user_id)
         return user.favorite_recipes if user else []
@@ -88,6 +194,9 @@ class UserService:
                 {"_id": ObjectId(user_id)},
                 {"$set": update_data}
             )
+            self.cache.delete(str(user_id))
+            if result.modified_count > 0:
+                self.recommendations.refresh(user_id)
             return result.modified_count > 0
         return False
     
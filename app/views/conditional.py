@@ -0,0 +1,55 @@
+import hashlib
+from datetime import datetime, timezone
+from typing import Any, Iterable, List, Optional, Tuple
+from flask import Response, make_response, request, session
+
+
+def make_etag(*parts: Any) -> str:
+    """Weak validator for a page built from the given parts
+
+    The signed-in user is always mixed in, since every page renders
+    session-dependent navigation.
+    """
+    payload = repr((session.get('user_id'),) + parts).encode('utf-8')
+    return hashlib.sha1(payload).hexdigest()
+
+
+def recipe_versions(recipes: Iterable[Any]) -> List[Tuple[str, Optional[datetime]]]:
+    """ETag part identifying a list of recipes and their last modification"""
+    return [(recipe._id, recipe.updated_at) for recipe in recipes]
+
+
+def not_modified(etag: str, last_modified: Optional[datetime] = None) -> Optional[Response]:
+    """Return a 304 response if the client's cached copy is still current"""
+    if request.if_none_match:
+        # If-Modified-Since is ignored when If-None-Match is present
+        fresh = request.if_none_match.contains_weak(etag)
+    elif request.if_modified_since and last_modified:
+        fresh = _http_date(last_modified) <= request.if_modified_since
+    else:
+        fresh = False
+    if not fresh:
+        return None
+    return add_validators(Response(status=304), etag, last_modified)
+
+
+def add_validators(response: Any, etag: str, last_modified: Optional[datetime] = None) -> Response:
+    """Attach ETag / Last-Modified and revalidation headers to a view result"""
+    response = make_response(response)
+    response.set_etag(etag, weak=True)
+    if last_modified:
+        response.last_modified = _http_date(last_modified)
+    # Caches may store the page but must revalidate on every use;
+    # signed-in pages stay out of shared caches
+    response.cache_control.no_cache = True
+    if session.get('user_id'):
+        response.cache_control.private = True
+    response.vary.add('Cookie')
+    return response
+
+
+def _http_date(value: datetime) -> datetime:
+    # Stored timestamps are naive UTC; HTTP dates have second precision
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value.replace(microsecond=0)
@@ -1,5 +1,6 @@
 from flask import Blueprint, render_template, jsonify, request, current_app
 from app.services.recipe_service import RecipeService
+from app.views.conditional import make_etag, not_modified, add_validators, recipe_versions
 
 main_bp = Blueprint('main', __name__)
 recipe_service = RecipeService()
@@ -7,12 +8,32 @@ recipe_service = RecipeService()
 @main_bp.route('/')
 def index():
     """Homepage route"""
+    wants_json = request.headers.get('Accept') == 'application/json'
+    if wants_json and current_app.config.get('RAW_JSON_RESPONSES'):
+        return raw_index()
     popular_recipes = recipe_service.get_popular_recipes(limit=6)
-    if request.headers.get('Accept') == 'application/json':
-        return jsonify({
-            "popular_recipes": [recipe.to_dict() for recipe in popular_recipes]
-        })
-    return render_template('index.html', popular_recipes=popular_recipes)
+    etag = make_etag(wants_json, recipe_versions(popular_recipes))
+    response = not_modified(etag)
+    if not response:
+        if wants_json:
+            response = jsonify({
+                "popular_recipes": [recipe.to_api_dict() for recipe in popular_recipes]
+            })
+        else:
+            response = render_template('index.html', popular_recipes=popular_recipes)
+        response = add_validators(response, etag)
+    # HTML and JSON share the URL
+    response.vary.add('Accept')
+    return response
+
+def raw_index():
+    """JSON homepage converted straight from raw BSON, validated by its own body"""
+    body = b'{"popular_recipes":' + recipe_service.get_popular_recipes_json(limit=6) + b'}'
+    etag = make_etag(True, body)
+    response = not_modified(etag) or add_validators(
+        current_app.response_class(body, mimetype=current_app.json.mimetype), etag)
+    response.vary.add('Accept')
+    return response
 
 @main_bp.route('/stats')
 def stats():
@@ -1,61 +1,141 @@
-from flask import Blueprint, render_template, request, jsonify, abort, redirect, url_for, session
+from flask import Blueprint, render_template, request, jsonify, abort, redirect, url_for, session, current_app
 from bson import ObjectId, errors as bson_errors
 from datetime import datetime
 from app.services.recipe_service import RecipeService
+from app.services.user_service import UserService
+from app.services.ingest_service import IngestService
 from app.models.recipe import Recipe
+from app.config import Config
+from app.json_provider import stream_array, stream_lines
+from app.views.conditional import make_etag, not_modified, add_validators
 
 recipe_bp = Blueprint('recipe', __name__)
 recipe_service = RecipeService()
+user_service = UserService()
+ingest_service = IngestService()
 
 @recipe_bp.route('/')
 def list_recipes():
     """List recipes with search and filtering"""
     query = request.args.get('q', '')
-    page = int(request.args.get('page', 1))
+    page = max(request.args.get('page', 1, type=int), 1)
+    cursor = request.args.get('cursor')
     cuisine = request.args.get('cuisine')
     difficulty_values = request.args.getlist('difficulty')
     tags = request.args.getlist('tag')
     cooking_time_max = request.args.get('cooking_time_max')
-    filters = {}
-    if cuisine:
-        filters['cuisine'] = cuisine
-    if difficulty_values:
-        filters['difficulty'] = {"$in": difficulty_values}
-    if tags:
-        filters['tags'] = {"$in": tags}
-    if cooking_time_max and cooking_time_max.isdigit():
-        filters['cooking_time'] = {"$lte": int(cooking_time_max)}
-    result = recipe_service.search_recipes(
-        query=query,
-        filters=filters,
-        page=page,
-        page_size=12
-    )
+    filters = search_filters()
+    if request.headers.get('Accept') == 'application/json' and current_app.config.get('RAW_JSON_RESPONSES'):
+        try:
+            body = recipe_service.faceted_search_json(
+                query=query, filters=filters, page=page, page_size=12, cursor=cursor)
+        except ValueError:
+            abort(400)
+        return current_app.response_class(body, mimetype=current_app.json.mimetype)
+    try:
+        result = recipe_service.faceted_search(
+            query=query,
+            filters=filters,
+            page=page,
+            page_size=12,
+            cursor=cursor
+        )
+    except ValueError:
+        abort(400)
     template_filters = {
         'cuisine': cuisine,
         'difficulty': difficulty_values or [],
         'tags': tags or [],
         'cooking_time_max': int(cooking_time_max) if cooking_time_max and cooking_time_max.isdigit() else None
     }
+    facet_counts = {
+        name: {group['_id']: group['count'] for group in groups}
+        for name, groups in result['facets'].items()
+    }
+    if request.headers.get('Accept') == 'application/json':
+        return jsonify({
+            "recipes": [recipe.to_api_dict() for recipe in result['recipes']],
+            "pagination": result['pagination'],
+            "facets": result['facets']
+        })
     return render_template(
         'recipes/list.html',
         recipes=result['recipes'],
         pagination=result['pagination'],
         query=query,
-        filters=template_filters
+        filters=template_filters,
+        facet_counts=facet_counts
     )
 
+@recipe_bp.route('/export')
+def export_recipes():
+    """Stream every recipe matching the search and filters as a JSON array"""
+    query = request.args.get('q')
+    if current_app.config.get('RAW_JSON_RESPONSES'):
+        return stream_array(recipe_service.iter_recipes_json(query=query, filters=search_filters()))
+    return stream_array(recipe_service.iter_recipes(query=query, filters=search_filters()))
+
+@recipe_bp.route('/import', methods=['POST'])
+def import_recipes():
+    """Bulk import NDJSON recipes from the request body, attributed to the signed-in user
+    
+    Streams one NDJSON result per batch as it is written; the checkpoint of
+    the last line received is where a retry resumes.
+    """
+    if 'user_id' not in session:
+        abort(401)
+    start_line = request.args.get('start_line', 0, type=int)
+    batch_size = min(request.args.get('batch_size', Config.INGEST_BATCH_SIZE, type=int), Config.INGEST_BATCH_SIZE)
+    # Read the body line by line instead of buffering it
+    batches = ingest_service.ingest(request.stream, start_line=start_line, batch_size=max(batch_size, 1),
+                                    user_id=session['user_id'])
+    return stream_lines(batches)
+
+def search_filters():
+    """Search filters from the listing's query string"""
+    cuisine = request.args.get('cuisine')
+    difficulty_values = request.args.getlist('difficulty')
+    tags = request.args.getlist('tag')
+    cooking_time_max = request.args.get('cooking_time_max')
+    filters = {}
+    if cuisine:
+        filters['cuisine'] = cuisine
+    if difficulty_values:
+        filters['difficulty'] = {"$in": difficulty_values}
+    if tags:
+        filters['tags'] = {"$in": tags}
+    if cooking_time_max and cooking_time_max.isdigit():
+        filters['cooking_time'] = {"$lte": int(cooking_time_max)}
+    return filters
+
 @recipe_bp.route('/<recipe_id>')
 def get_recipe(recipe_id):
     """Get single recipe details"""
     try:
-        recipe = recipe_service.get_recipe_by_id(recipe_id)
+        validators = recipe_service.get_recipe_validators(recipe_id)
     except bson_errors.InvalidId:
         abort(404)
+    if not validators:
+        abort(404)
+    comments_page = max(request.args.get('comments_page', 1, type=int), 1)
+    # Answer revalidations from the projection alone, before the full fetch and render
+    etag = make_etag(recipe_id, validators.get('updated_at'), validators.get('comment_count', 0), comments_page)
+    last_modified = validators.get('updated_at')
+    response = not_modified(etag, last_modified)
+    if response:
+        return response
+    # Render from a copy matching the validators, never a stale cached one under the new ETag
+    recipe = recipe_service.get_recipe_by_id(recipe_id, validators=validators)
     if not recipe:
         abort(404)
-    similar_recipes = recipe_service.get_similar_recipes(recipe_id, limit=3)
-    return render_template('recipes/detail.html', recipe=recipe, similar_recipes=similar_recipes)
+    similar_recipes = recipe_service.get_similar_recipes(recipe, limit=3)
+    comments = recipe_service.get_comments(recipe_id, page=comments_page, recipe=recipe)
+    return add_validators(
+        render_template('recipes/detail.html', recipe=recipe, similar_recipes=similar_recipes,
+                        comments=comments['comments'], comments_pagination=comments['pagination']),
+        etag,
+        last_modified
+    )
 
 @recipe_bp.route('/create', methods=['GET', 'POST'])
 def create_recipe():
@@ -172,23 +252,23 @@ def api_delete_recipe(recipe_id):
 @recipe_bp.route('/cuisines')
 def list_cuisines():
     """Get list of available cuisines"""
-    pipeline = [
-        {"$group": {"_id": "$cuisine"}},
-        {"$sort": {"_id": 1}}
-    ]
-    cuisines = [doc["_id"] for doc in recipe_service.collection.aggregate(pipeline)]
-    return jsonify(cuisines)
+    return vocabulary_response('cuisines')
 
 @recipe_bp.route('/tags')
 def list_tags():
     """Get list of available tags"""
-    pipeline = [
-        {"$unwind": "$tags"},
-        {"$group": {"_id": "$tags"}},
-        {"$sort": {"_id": 1}}
-    ]
-    tags = [doc["_id"] for doc in recipe_service.collection.aggregate(pipeline)]
-    return jsonify(tags)
+    return vocabulary_response('tags')
+
+def vocabulary_response(name):
+    """Serve a vocabulary from memory, with ?counts=true adding recipe counts"""
+    vocabularies = recipe_service.stats.get_vocabularies()
+    values = vocabularies[name]
+    with_counts = request.args.get('counts', '').lower() in ('1', 'true')
+    response = jsonify(values if with_counts else [item["_id"] for item in values])
+    response.set_etag(f"{name}-{vocabularies['version']}-{int(with_counts)}")
+    response.cache_control.public = True
+    response.cache_control.max_age = Config.VOCABULARY_TTL
+    return response.make_conditional(request)
 
 @recipe_bp.route('/<recipe_id>/comments', methods=['POST'])
 def add_comment(recipe_id):
@@ -209,8 +289,6 @@ def add_comment(recipe_id):
         return redirect(url_for('recipe.get_recipe', recipe_id=recipe_id))
     user_id = session['user_id']
     username = "User"
-    from app.services.user_service import UserService
-    user_service = UserService()
     user = user_service.get_user_by_id(user_id)
     if user:
         username = user.username
@@ -220,14 +298,13 @@ def add_comment(recipe_id):
         "text": comment_text,
         "date": datetime.utcnow()
     }
-    from app import mongo
-    result = mongo.db.recipes.update_one(
-        {"_id": ObjectId(recipe_id)},
-        {"$push": {"comments": comment_data}}
-    )
+    try:
+        success = recipe_service.add_comment(recipe_id, comment_data)
+    except bson_errors.InvalidId:
+        success = False
     if request.headers.get('Accept') == 'application/json':
         return jsonify({
-            "status": "success" if result.modified_count > 0 else "error",
+            "status": "success" if success else "error",
             "comment": {
                 "user_id": user_id,
                 "username": username,
@@ -235,4 +312,44 @@ def add_comment(recipe_id):
                 "date": comment_data['date'].isoformat()
             }
         })
+    return redirect(url_for('recipe.get_recipe', recipe_id=recipe_id))
+
+@recipe_bp.route('/<recipe_id>/ratings', methods=['POST'])
+def rate_recipe(recipe_id):
+    """Add or update the current user's rating for a recipe"""
+    if 'user_id' not in session:
+        if request.headers.get('Accept') == 'application/json':
+            return jsonify({"status": "error", "message": "Authentication required"}), 401
+        return redirect(url_for('user.login'))
+    if request.headers.get('Content-Type') == 'application/json':
+        rating = request.json.get('rating')
+    else:
+        rating = request.form.get('rating')
+    try:
+        rating = float(rating)
+    except (TypeError, ValueError):
+        rating = None
+    if rating is None or not Config.RATING_MIN <= rating <= Config.RATING_MAX:
+        if request.headers.get('Accept') == 'application/json':
+            return jsonify({
+                "status": "error",
+                "message": f"Rating must be between {Config.RATING_MIN} and {Config.RATING_MAX}"
+            }), 400
+        return redirect(url_for('recipe.get_recipe', recipe_id=recipe_id))
+    try:
+        aggregates = recipe_service.rate_recipe(recipe_id, session['user_id'], rating)
+    except bson_errors.InvalidId:
+        aggregates = None
+    if not aggregates:
+        if request.headers.get('Accept') == 'application/json':
+            return jsonify({"status": "error", "message": "Recipe not found"}), 404
+        abort(404)
+    if request.headers.get('Accept') == 'application/json':
+        return jsonify({
+            "status": "success",
+            "rating": rating,
+            "average_rating": aggregates.get('average_rating'),
+            "ratings_count": aggregates.get('ratings_count'),
+            "weighted_rating": aggregates.get('weighted_rating')
+        })
     return redirect(url_for('recipe.get_recipe', recipe_id=recipe_id))
\ No newline at end of file
@@ -1,12 +1,18 @@
+from functools import partial
 from flask import Blueprint, render_template, request, jsonify, abort, redirect, url_for, session
 from app.services.user_service import UserService
 from app.services.recipe_service import RecipeService
+from app.services.recommendation_service import RecommendationService
 from app.models.user import User
-from app.models.recipe import Recipe
+from app.models.recipe import RecipeSummary
+from app.services.pagination import build_pagination
+from app.services.concurrency import run_concurrently
+from app.views.conditional import make_etag, not_modified, add_validators, recipe_versions
 
 user_bp = Blueprint('user', __name__)
 user_service = UserService()
 recipe_service = RecipeService()
+recommendation_service = RecommendationService()
 
 @user_bp.route('/register', methods=['GET', 'POST'])
 def register():
@@ -58,67 +64,31 @@ def user_profile():
     if not user:
         session.pop('user_id', None)
         return redirect(url_for('user.login'))
-    user_recipes = recipe_service.get_user_recipes(user._id, page=1, page_size=4)
-    comment_count = recipe_service.count_user_comments(user._id)
-    favorite_recipes = []
-    for recipe_id in user.favorite_recipes[:4]:
-        recipe = recipe_service.get_recipe_by_id(recipe_id)
-        if recipe:
-            favorite_recipes.append(recipe)
-    user_profile = user_service.get_recommendation_profile(user._id)
-    recommended_recipes = []
-    if user_profile:
-        pipeline = [
-            {"$match": {
-                "$or": [
-                    {"tags": {"$in": user_profile.get('dietary_preferences', [])}},
-                    {"cuisine": {"$in": user_profile.get('favorite_cuisines', [])}},
-                    {"difficulty": {"$in": get_difficulty_levels(user_profile.get('cooking_skill_level', 'Beginner'))}}
-                ]
-            }},
-            {"$addFields": {
-                "dietaryMatchCount": {
-                    "$size": {
-                        "$setIntersection": ["$tags", user_profile.get('dietary_preferences', [])]
-                    }
-                },
-                "isFavoriteCuisine": {
-                    "$cond": [
-                        {"$in": ["$cuisine", user_profile.get('favorite_cuisines', [])]},
-                        1,
-                        0
-                    ]
-                },
-                "isAppropriateSkillLevel": {
-                    "$cond": [
-                        {"$in": ["$difficulty", get_difficulty_levels(user_profile.get('cooking_skill_level', 'Beginner'))]},
-                        1,
-                        0
-                    ]
-                }
-            }},
-            {"$addFields": {
-                "recommendationScore": {
-                    "$add": [
-                        "$dietaryMatchCount",
-                        "$isFavoriteCuisine",
-                        "$isAppropriateSkillLevel"
-                    ]
-                }
-            }},
-            {"$sort": {"recommendationScore": -1}},
-            {"$limit": 2}
-        ]
-        if not user_profile.get('dietary_preferences') and not user_profile.get('favorite_cuisines'):
-            pipeline.pop(0)
-        recommended_docs = list(recipe_service.collection.aggregate(pipeline))
-        recommended_recipes = [Recipe.from_dict(doc) for doc in recommended_docs]
-    return render_template('users/profile.html', 
-                          user=user, 
-                          user_recipes=user_recipes, 
-                          comment_count=comment_count,
-                          recommended_recipes=recommended_recipes,
-                          favorite_recipes=favorite_recipes)
+    # The sections only depend on the loaded user, so fetch them side by side
+    user_recipes, favorites, recommended = run_concurrently(
+        partial(recipe_service.get_user_recipes, user._id, page=1, page_size=4),
+        partial(recipe_service.get_recipes_by_ids, user.favorite_recipes[:4], RecipeSummary.PROJECTION),
+        partial(recommendation_service.get_recommendations, user._id, page=1, page_size=2,
+                profile=RecommendationService.profile_of(user))
+    )
+    if favorites['missing_ids']:
+        user_service.prune_favorite_recipes(user._id, favorites['missing_ids'])
+    favorite_recipes = favorites['recipes']
+    recommended_recipes = recommended['recipes']
+    etag = make_etag(
+        user.updated_at, user.comment_count, user.favorite_recipes,
+        user_recipes['pagination']['total_items'], recipe_versions(user_recipes['recipes']),
+        recipe_versions(favorite_recipes), recipe_versions(recommended_recipes)
+    )
+    response = not_modified(etag)
+    if response:
+        return response
+    return add_validators(render_template('users/profile.html', 
+                                          user=user, 
+                                          user_recipes=user_recipes, 
+                                          comment_count=user.comment_count,
+                                          recommended_recipes=recommended_recipes,
+                                          favorite_recipes=favorite_recipes), etag)
 
 @user_bp.route('/profile/edit', methods=['GET', 'POST'])
 def edit_profile():
@@ -159,12 +129,28 @@ def favorites():
         session.pop('user_id', None)
         return redirect(url_for('user.login'))
     favorite_ids = user.favorite_recipes
-    favorite_recipes = []
-    for recipe_id in favorite_ids:
-        recipe = recipe_service.get_recipe_by_id(recipe_id)
-        if recipe:
-            favorite_recipes.append(recipe)
-    return render_template('users/favorites.html', recipes=favorite_recipes)
+    if request.headers.get('Accept') == 'application/json':
+        # Favorite toggles only need the ids, no recipe lookups required
+        etag = make_etag('json', favorite_ids)
+        response = not_modified(etag) or add_validators(jsonify([{"_id": recipe_id} for recipe_id in favorite_ids]), etag)
+        response.vary.add('Accept')
+        return response
+    page = max(request.args.get('page', 1, type=int), 1)
+    page_size = 12
+    page_ids = favorite_ids[(page - 1) * page_size:page * page_size + 1]
+    result = recipe_service.get_recipes_by_ids(page_ids[:page_size], RecipeSummary.PROJECTION)
+    if result['missing_ids']:
+        # Lazily drop favorites whose recipes have been deleted
+        user_service.prune_favorite_recipes(user_id, result['missing_ids'])
+    total_items = len(favorite_ids) - len(result['missing_ids'])
+    pagination = build_pagination(page, page_size, total_items, page_ids)
+    etag = make_etag(page, total_items, recipe_versions(result['recipes']))
+    response = not_modified(etag) or add_validators(
+        render_template('users/favorites.html', recipes=result['recipes'], pagination=pagination),
+        etag
+    )
+    response.vary.add('Accept')
+    return response
 
 @user_bp.route('/recipes/<recipe_id>/favorite', methods=['POST'])
 def add_favorite(recipe_id):
@@ -195,82 +181,20 @@ def recommendations():
         return redirect(url_for('user.login'))
     user_id = session['user_id']
     user = user_service.get_user_by_id(user_id)
-    user_profile = user_service.get_recommendation_profile(user_id)
-    if not user_profile:
+    if not user:
         return jsonify({"status": "error", "message": "User not found"}), 404
-    page = int(request.args.get('page', 1))
+    page = max(request.args.get('page', 1, type=int), 1)
     page_size = 12
-    pipeline = [
-        {"$match": {
-            "$or": [
-                {"tags": {"$in": user_profile.get('dietary_preferences', [])}},
-                {"cuisine": {"$in": user_profile.get('favorite_cuisines', [])}},
-                {"difficulty": {"$in": get_difficulty_levels(user_profile.get('cooking_skill_level', 'Beginner'))}}
-            ]
-        }},
-        {"$addFields": {
-            "dietaryMatchCount": {
-                "$size": {
-                    "$setIntersection": ["$tags", user_profile.get('dietary_preferences', [])]
-                }
-            },
-            "isFavoriteCuisine": {
-                "$cond": [
-                    {"$in": ["$cuisine", user_profile.get('favorite_cuisines', [])]},
-                    1,
-                    0
-                ]
-            },
-            "isAppropriateSkillLevel": {
-                "$cond": [
-                    {"$in": ["$difficulty", get_difficulty_levels(user_profile.get('cooking_skill_level', 'Beginner'))]},
-                    1,
-                    0
-                ]
-            }
-        }},
-        {"$addFields": {
-            "recommendationScore": {
-                "$add": [
-                    "$dietaryMatchCount",
-                    "$isFavoriteCuisine",
-                    "$isAppropriateSkillLevel"
-                ]
-            }
-        }},
-        {"$sort": {"recommendationScore": -1}},
-        {"$skip": (page - 1) * page_size},
-        {"$limit": page_size}
-    ]
-    if not user_profile.get('dietary_preferences') and not user_profile.get('favorite_cuisines'):
-        pipeline.pop(0)
-    recommended_recipes = list(recipe_service.collection.aggregate(pipeline))
-    recipes = [Recipe.from_dict(doc) for doc in recommended_recipes]
-    count_pipeline = pipeline.copy()
-    if len(count_pipeline) > 3:
-        count_pipeline = count_pipeline[:-2]
-    count_pipeline.append({"$count": "total"})
-    count_result = list(recipe_service.collection.aggregate(count_pipeline))
-    total_items = count_result[0]['total'] if count_result else 0
-    total_pages = (total_items + page_size - 1) // page_size if total_items > 0 else 1
-    pagination = {
-        "page": page,
-        "page_size": page_size,
-        "total_items": total_items,
-        "total_pages": total_pages
-    }
-    return render_template(
+    result = recommendation_service.get_recommendations(user_id, page=page, page_size=page_size)
+    recipes = result['recipes']
+    pagination = result['pagination']
+    etag = make_etag(user.updated_at, page, pagination['total_items'], recipe_versions(recipes))
+    response = not_modified(etag)
+    if response:
+        return response
+    return add_validators(render_template(
         'users/recommendations.html',
         recipes=recipes,
         pagination=pagination,
         user=user
-    )
-
-def get_difficulty_levels(skill_level):
-    """Get appropriate difficulty levels based on skill level"""
-    skill_to_difficulty = {
-        "Beginner": ["Easy"],
-        "Intermediate": ["Easy", "Medium"],
-        "Advanced": ["Easy", "Medium", "Hard"]
-    }
-    return skill_to_difficulty.get(skill_level, ["Easy"])
\ No newline at end of file
+    ), etag)
\ No newline at end of file
@@ -84,6 +84,12 @@ db.recipes.createIndex({ "difficulty": 1 });
 db.recipes.createIndex({ "tags": 1 });
 db.recipes.createIndex({ "user_id": 1 });
 db.recipes.createIndex({ "created_at": 1 });
+db.recipes.createIndex({ "weighted_rating": -1, "ratings_count": -1 }, { name: "popular_recipes_index" });
+db.recipes.createIndex({ "created_at": -1, "_id": -1 }, { name: "recent_recipes_index" });
+db.recipes.createIndex({ "user_id": 1, "created_at": -1, "_id": -1 }, { name: "user_recent_recipes_index" });
+db.recipes.createIndex({ "cuisine": 1, "created_at": -1, "_id": -1 }, { name: "cuisine_recent_recipes_index" });
+
+db.comments.createIndex({ "recipe_id": 1, "seq": -1 }, { unique: true, name: "recipe_comment_buckets_index" });
 
 db.users.createIndex({ "username": 1 }, { unique: true });
 db.users.createIndex({ "email": 1 }, { unique: true });
@@ -0,0 +1,175 @@
+import argparse
+import os
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+from bson import ObjectId
+
+# Add parent directory to path so we can import app
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.config import Config
+from app.models.recipe import Recipe, RecipeSummary
+
+CARD_FIELDS = ('_id', 'name', 'cuisine', 'difficulty', 'cooking_time', 'tags', 'average_rating')
+
+class EagerRecipe:
+    """The Recipe model as it was before lazy decoding: from_dict() decodes
+    every field into the instance __dict__ up front"""
+
+    def __init__(self, name, ingredients, instructions, cuisine, difficulty, preparation_time,
+                 cooking_time, nutritional_info, tags, image_url=None, user_id=None, user_ratings=None,
+                 recent_comments=None, comment_count=0, average_rating=None, ratings_count=None,
+                 weighted_rating=None, created_at=None, updated_at=None, _id=None):
+        self.name = name
+        self.ingredients = ingredients
+        self.instructions = instructions
+        self.cuisine = cuisine
+        self.difficulty = difficulty
+        self.preparation_time = preparation_time
+        self.cooking_time = cooking_time
+        self.nutritional_info = nutritional_info
+        self.tags = tags
+        self.image_url = image_url
+        self.user_id = user_id
+        self.user_ratings = user_ratings or []
+        self.recent_comments = recent_comments or []
+        self.comment_count = comment_count
+        if ratings_count is None:
+            average_rating, ratings_count, weighted_rating = Recipe.rating_aggregates(self.user_ratings)
+        self.average_rating = average_rating
+        self.ratings_count = ratings_count
+        self.weighted_rating = weighted_rating
+        self.created_at = created_at or datetime.utcnow()
+        self.updated_at = updated_at or datetime.utcnow()
+        self._id = str(ObjectId()) if _id is None else _id
+
+    def to_api_dict(self):
+        return {
+            "_id": str(self._id),
+            "name": self.name,
+            "ingredients": self.ingredients,
+            "instructions": self.instructions,
+            "cuisine": self.cuisine,
+            "difficulty": self.difficulty,
+            "preparation_time": self.preparation_time,
+            "cooking_time": self.cooking_time,
+            "nutritional_info": self.nutritional_info,
+            "tags": self.tags,
+            "image_url": self.image_url,
+            "user_id": str(self.user_id) if self.user_id else None,
+            "user_ratings": self.user_ratings,
+            "recent_comments": self.recent_comments,
+            "comment_count": self.comment_count,
+            "average_rating": self.average_rating,
+            "ratings_count": self.ratings_count,
+            "weighted_rating": self.weighted_rating,
+            "created_at": self.created_at,
+            "updated_at": self.updated_at
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        if data is None:
+            return None
+        recent_comments = data.get('recent_comments', [])
+        comment_count = data.get('comment_count')
+        if comment_count is None:
+            recent_comments = data.get('comments', [])[-Config.RECENT_COMMENTS_LIMIT:]
+            comment_count = len(data.get('comments', []))
+        return cls(
+            name=data.get('name'),
+            ingredients=data.get('ingredients', []),
+            instructions=data.get('instructions', []),
+            cuisine=data.get('cuisine'),
+            difficulty=data.get('difficulty'),
+            preparation_time=data.get('preparation_time'),
+            cooking_time=data.get('cooking_time'),
+            nutritional_info=data.get('nutritional_info', {}),
+            tags=data.get('tags', []),
+            image_url=data.get('image_url'),
+            user_id=str(data.get('user_id')) if data.get('user_id') else None,
+            user_ratings=data.get('user_ratings', []),
+            recent_comments=recent_comments,
+            comment_count=comment_count,
+            average_rating=data.get('average_rating'),
+            ratings_count=data.get('ratings_count'),
+            weighted_rating=data.get('weighted_rating'),
+            created_at=data.get('created_at'),
+            updated_at=data.get('updated_at'),
+            _id=str(data.get('_id')) if data.get('_id') else None
+        )
+
+def make_documents(count):
+    """Recipe documents shaped like the stored ones"""
+    created = datetime(2024, 1, 1)
+    return [{
+        "_id": ObjectId(),
+        "name": f"Recipe {i}",
+        "ingredients": [{"name": f"ingredient {j}", "quantity": "1 cup"} for j in range(8)],
+        "instructions": [f"Step {j}" for j in range(6)],
+        "cuisine": ("Italian", "Thai", "Mexican", "Indian")[i % 4],
+        "difficulty": ("Easy", "Medium", "Hard")[i % 3],
+        "preparation_time": 10 + i % 30,
+        "cooking_time": 15 + i % 60,
+        "nutritional_info": {"calories": 400, "protein": 20, "carbs": 50, "fat": 12},
+        "tags": ["dinner", "quick", f"tag{i % 20}"],
+        "image_url": None,
+        "user_id": ObjectId(),
+        "user_ratings": [{"user_id": ObjectId(), "rating": 4}],
+        "recent_comments": [],
+        "comment_count": 0,
+        "average_rating": 4.0,
+        "ratings_count": 1,
+        "weighted_rating": 3.2,
+        "created_at": created + timedelta(minutes=i),
+        "updated_at": created + timedelta(minutes=i)
+    } for i in range(count)]
+
+def measure(name, build, documents, repeat):
+    """Report the best build time over repeat runs and the memory the models retain"""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        build(documents)
+        best = min(best, time.perf_counter() - start)
+    tracemalloc.start()
+    models = build(documents)
+    retained, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"{name:<28} {best * 1000:8.1f} ms {len(documents) / best:12.0f} models/s {retained / 1024:10.0f} KiB")
+    return models
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare eager and lazy recipe model materialization")
+    parser.add_argument('--count', type=int, default=10000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    documents = make_documents(args.count)
+    print(f"Materializing {args.count} recipes (best of {args.repeat})")
+    measure("eager", lambda docs: [EagerRecipe.from_dict(doc) for doc in docs], documents, args.repeat)
+    measure("lazy", lambda docs: [Recipe.from_dict(doc) for doc in docs], documents, args.repeat)
+
+    def read_cards(model):
+        # Keep the models, so the retained memory includes the decoded values they hold
+        def build(docs):
+            recipes = [model.from_dict(doc) for doc in docs]
+            for recipe in recipes:
+                for field in CARD_FIELDS:
+                    getattr(recipe, field)
+            return recipes
+        return build
+
+    measure("eager + card fields", read_cards(EagerRecipe), documents, args.repeat)
+    measure("lazy + card fields", read_cards(Recipe), documents, args.repeat)
+    measure("eager + to_api_dict",
+            lambda docs: [EagerRecipe.from_dict(doc).to_api_dict() for doc in docs], documents, args.repeat)
+    measure("lazy + to_api_dict",
+            lambda docs: [Recipe.from_dict(doc).to_api_dict() for doc in docs], documents, args.repeat)
+    measure("lazy summary + to_api_dict",
+            lambda docs: [RecipeSummary.from_dict(doc).to_api_dict() for doc in docs], documents, args.repeat)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,60 @@
+import argparse
+import os
+import sys
+import time
+from flask import current_app
+
+# Add parent directory to path so we can import app
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app import create_app, mongo
+from app.models.recipe import RecipeSummary
+from app.services import raw_json
+from app.services.pagination import RECENT_SORT
+from benchmark_models import make_documents
+
+SCRATCH_COLLECTION = 'benchmark_raw_json'
+
+def model_page(collection, page_size):
+    """The current path: decoded documents, RecipeSummary models and the JSON provider"""
+    docs = collection.find({}, RecipeSummary.PROJECTION).sort(RECENT_SORT).limit(page_size)
+    return current_app.json.dumps_bytes([RecipeSummary.from_dict(doc).to_api_dict() for doc in docs])
+
+def raw_page(collection, page_size):
+    """The raw path: server-side API projection, raw BSON and direct BSON to JSON conversion"""
+    documents = raw_json.raw_collection(collection).aggregate([
+        {"$sort": dict(RECENT_SORT)},
+        {"$limit": page_size},
+        {"$project": raw_json.api_projection(RecipeSummary)}
+    ])
+    return raw_json.json_array(documents)
+
+def measure(name, render, collection, page_size, repeat):
+    best = float('inf')
+    size = 0
+    for _ in range(repeat):
+        start = time.perf_counter()
+        size = len(render(collection, page_size))
+        best = min(best, time.perf_counter() - start)
+    print(f"{name:<10} {best * 1000:8.1f} ms/page {page_size / best:12.0f} recipes/s {size / 1024:8.0f} KiB")
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare model-based and raw BSON JSON rendering of recipe pages")
+    parser.add_argument('--page-size', type=int, default=1000)
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    app = create_app('development')
+    with app.app_context():
+        collection = mongo.db[SCRATCH_COLLECTION]
+        collection.drop()
+        collection.insert_many(make_documents(args.page_size))
+        try:
+            print(f"{args.page_size}-recipe pages, best of {args.repeat}")
+            measure("models", model_page, collection, args.page_size, args.repeat)
+            measure("raw", raw_page, collection, args.page_size, args.repeat)
+        finally:
+            collection.drop()
+
+if __name__ == '__main__':
+    main()
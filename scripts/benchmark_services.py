@@ -0,0 +1,211 @@
+import argparse
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import time
+from datetime import datetime
+
+# Add parent directory to path so we can import app
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, ROOT)
+
+from pymongo.errors import OperationFailure
+from app import create_app, mongo
+from app.config import Config
+from app.models.recipe import Recipe
+from app.services.recipe_service import RecipeService
+from app.services.recommendation_service import RecommendationService
+import generate_corpus
+
+PERCENTILES = (50, 90, 95, 99)
+METRICS = ('mean_ms', 'p50_ms', 'p90_ms', 'p95_ms', 'p99_ms', 'max_ms')
+
+
+def connect(app, backend, uri):
+    """Point the app's PyMongo at the benchmark database"""
+    if backend == 'mongomock':
+        import mongomock
+        mongo.cx = mongomock.MongoClient()
+        mongo.db = mongo.cx['recipe_benchmark']
+    else:
+        app.config['MONGO_URI'] = uri
+        mongo.init_app(app, uri)
+    return mongo.db
+
+
+def seed(app, db, backend, size, args):
+    """Replace the benchmark database with a generated corpus of `size` recipes"""
+    generate_corpus.drop_corpus(db)
+    options = generate_corpus.corpus_options(args.uri, max(size // 10, 10), size, args.seed)
+    # The in-memory stand-in lives in this process, so it is filled without the worker pool
+    for _ in generate_corpus.generate(options, args.workers, args.chunk_size,
+                                      db if backend == 'mongomock' else None):
+        pass
+    generate_corpus.finalize(Config.MIGRATION_BATCH_SIZE, app=app)
+    with app.app_context():
+        RecipeService.cache.clear()
+        RecipeService.result_counter.invalidate()
+        RecipeService.similarity_index.warm(db[Config.RECIPES_COLLECTION], background=False)
+
+
+def operations(db, rng):
+    """Benchmarked calls, each drawing its arguments from the corpus with a seeded RNG"""
+    recipes = RecipeService()
+    recommendations = RecommendationService()
+    recipe_ids = [str(doc["_id"]) for doc in db[Config.RECIPES_COLLECTION].find({}, {"_id": 1}).limit(1000)]
+    user_ids = [str(doc["_id"]) for doc in db[Config.USERS_COLLECTION].find({}, {"_id": 1}).limit(1000)]
+    documents = list(db[Config.RECIPES_COLLECTION].find().limit(200))
+    cuisines = generate_corpus.CUISINES[:8]
+    tags = generate_corpus.BASE_TAGS
+    return {
+        "RecipeService.search_recipes[filter]": lambda: recipes.search_recipes(
+            filters={"cuisine": rng.choice(cuisines)}, page_size=12),
+        "RecipeService.search_recipes[text]": lambda: recipes.search_recipes(query=rng.choice(tags), page_size=12),
+        "RecipeService.faceted_search": lambda: recipes.faceted_search(
+            filters={"difficulty": {"$in": ["Easy"]}}, page_size=12),
+        "RecipeService.get_recipe_by_id": lambda: recipes.get_recipe_by_id(rng.choice(recipe_ids)),
+        "RecipeService.get_popular_recipes": lambda: recipes.get_popular_recipes(limit=10),
+        "RecipeService.get_similar_recipes": lambda: recipes.get_similar_recipes(rng.choice(recipe_ids), limit=3),
+        "RecipeService.get_recipe_stats": recipes.get_recipe_stats,
+        "RecommendationService.refresh": lambda: recommendations.refresh(rng.choice(user_ids)),
+        "RecommendationService.get_recommendations": lambda: recommendations.get_recommendations(
+            rng.choice(user_ids)),
+        "Recipe.from_dict+to_api_dict": lambda: Recipe.from_dict(rng.choice(documents)).to_api_dict()
+    }
+
+
+def measure(call, warmup, iterations, max_seconds):
+    """Latency percentiles (nearest rank) and throughput of repeated calls"""
+    for _ in range(warmup):
+        call()
+    samples = []
+    started = time.perf_counter()
+    deadline = started + max_seconds
+    while len(samples) < iterations and time.perf_counter() < deadline:
+        begin = time.perf_counter_ns()
+        call()
+        samples.append(time.perf_counter_ns() - begin)
+    elapsed = time.perf_counter() - started
+    samples.sort()
+    result = {"count": len(samples), "ops_per_sec": round(len(samples) / elapsed, 1),
+              "mean_ms": round(sum(samples) / len(samples) / 1e6, 4), "max_ms": round(samples[-1] / 1e6, 4)}
+    for percentile in PERCENTILES:
+        rank = max(int(round(percentile / 100 * len(samples))) - 1, 0)
+        result[f"p{percentile}_ms"] = round(samples[rank] / 1e6, 4)
+    return result
+
+
+def run(args):
+    app = create_app('development')
+    db = connect(app, args.backend, args.uri)
+    results = {}
+    for size in args.sizes:
+        print(f"Seeding {size} recipes ({args.backend})...")
+        seed(app, db, args.backend, size, args)
+        results[str(size)] = {}
+        with app.app_context():
+            calls = operations(db, random.Random(args.seed))
+            for name, call in calls.items():
+                if args.only and not any(part in name for part in args.only):
+                    continue
+                try:
+                    result = measure(call, args.warmup, args.iterations, args.max_seconds)
+                except (NotImplementedError, OperationFailure) as exc:
+                    # e.g. $text without a text index, or operators the stand-in lacks
+                    result = {"error": f"{type(exc).__name__}: {exc}"}
+                results[str(size)][name] = result
+                print_result(size, name, result)
+    return {
+        "created_at": datetime.utcnow().isoformat(),
+        "backend": args.backend,
+        "seed": args.seed,
+        "python": platform.python_version(),
+        "commit": git_commit(),
+        "results": results
+    }
+
+
+def print_result(size, name, result):
+    if "error" in result:
+        print(f"{size:>8} {name:<44} {result['error'][:60]}")
+        return
+    print(f"{size:>8} {name:<44} p50 {result['p50_ms']:9.3f} ms  p99 {result['p99_ms']:9.3f} ms  "
+          f"{result['ops_per_sec']:10.1f} ops/s")
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(baseline, current, metric, threshold):
+    """Print per-method changes against a baseline; return the regressions beyond threshold"""
+    regressions = []
+    print(f"\nComparing {metric} against baseline {baseline.get('commit') or ''} "
+          f"({baseline.get('created_at')}), threshold {threshold:.0%}")
+    for size, methods in current["results"].items():
+        for name, result in methods.items():
+            old = baseline["results"].get(size, {}).get(name)
+            if not old or "error" in old or "error" in result:
+                continue
+            change = result[metric] / old[metric] - 1 if old[metric] else 0.0
+            status = ""
+            if change > threshold:
+                status = "REGRESSION"
+                regressions.append((size, name, change))
+            elif change < -threshold:
+                status = "improved"
+            print(f"{size:>8} {name:<44} {old[metric]:9.3f} -> {result[metric]:9.3f} ms {change:+8.1%} {status}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark service-layer methods over generated corpora")
+    parser.add_argument('--sizes', default='1000,10000',
+                        help='Comma-separated recipe counts; users are a tenth of each')
+    parser.add_argument('--backend', choices=('mongod', 'mongomock'), default='mongod',
+                        help='mongod at --uri, or the in-memory mongomock stand-in')
+    parser.add_argument('--uri', default=os.environ.get('BENCHMARK_MONGODB_URI',
+                                                        'mongodb://localhost:27017/recipe_benchmark'),
+                        help='Scratch database; its recipe, user and comment collections are replaced')
+    parser.add_argument('--only', action='append', help='Run methods whose name contains this (repeatable)')
+    parser.add_argument('--warmup', type=int, default=20)
+    parser.add_argument('--iterations', type=int, default=500)
+    parser.add_argument('--max-seconds', type=float, default=10.0, help='Time limit per method and size')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--workers', type=int, default=os.cpu_count())
+    parser.add_argument('--chunk-size', type=int, default=5000)
+    parser.add_argument('--save', help='Write the results as a JSON baseline')
+    parser.add_argument('--compare', help='Baseline JSON to compare against')
+    parser.add_argument('--input', help='Compare these saved results instead of running the suite')
+    parser.add_argument('--metric', choices=METRICS, default='p50_ms')
+    parser.add_argument('--threshold', type=float, default=0.15, help='Relative slowdown flagged as a regression')
+    args = parser.parse_args()
+    args.sizes = [int(size) for size in args.sizes.split(',')]
+
+    if args.input:
+        with open(args.input) as handle:
+            current = json.load(handle)
+    else:
+        current = run(args)
+    if args.save:
+        with open(args.save, 'w') as handle:
+            json.dump(current, handle, indent=2)
+        print(f"Saved results to {args.save}")
+    if args.compare:
+        with open(args.compare) as handle:
+            baseline = json.load(handle)
+        regressions = compare(baseline, current, args.metric, args.threshold)
+        if regressions:
+            print(f"{len(regressions)} regression(s) beyond {args.threshold:.0%}")
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
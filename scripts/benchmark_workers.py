@@ -0,0 +1,82 @@
+import argparse
+import os
+import subprocess
+import sys
+import time
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+# Add parent directory to path so we can import app
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, ROOT)
+
+from app import create_app, mongo
+
+def sample_paths(limit=20):
+    """Pick recipe detail and listing URLs from the seeded database"""
+    app = create_app('development')
+    with app.app_context():
+        recipe_ids = [str(doc['_id']) for doc in mongo.db.recipes.find({}, {"_id": 1}).limit(limit)]
+    paths = ['/', '/recipes/', '/recipes/?difficulty=Easy']
+    paths.extend(f'/recipes/{recipe_id}' for recipe_id in recipe_ids)
+    return paths
+
+def start_server(worker_class, port, threads):
+    """Start one gunicorn worker of the given class"""
+    server = subprocess.Popen([
+        sys.executable, '-m', 'gunicorn', '--bind', f'127.0.0.1:{port}', '--workers', '1',
+        '--worker-class', worker_class, '--threads', str(threads), 'run:app'
+    ], cwd=ROOT, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        try:
+            urllib.request.urlopen(f'http://127.0.0.1:{port}/health', timeout=1)
+            return server
+        except OSError:
+            time.sleep(0.2)
+    server.terminate()
+    raise RuntimeError(f"gunicorn did not start with {worker_class} workers")
+
+def run_load(port, paths, clients, duration):
+    """Fetch the paths round-robin from concurrent clients, returning (requests, errors)"""
+    deadline = time.monotonic() + duration
+
+    def client(offset):
+        done = errors = 0
+        index = offset
+        while time.monotonic() < deadline:
+            url = f'http://127.0.0.1:{port}{paths[index % len(paths)]}'
+            index += 1
+            try:
+                with urllib.request.urlopen(url, timeout=10) as response:
+                    response.read()
+                done += 1
+            except OSError:
+                errors += 1
+        return done, errors
+
+    with ThreadPoolExecutor(max_workers=clients) as pool:
+        results = list(pool.map(client, range(clients)))
+    return sum(done for done, _ in results), sum(errors for _, errors in results)
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare sync and threaded gunicorn workers, per worker process")
+    parser.add_argument('--clients', type=int, default=32)
+    parser.add_argument('--threads', type=int, default=8)
+    parser.add_argument('--duration', type=float, default=20)
+    parser.add_argument('--port', type=int, default=5055)
+    args = parser.parse_args()
+
+    paths = sample_paths()
+    for worker_class in ('sync', 'gthread'):
+        server = start_server(worker_class, args.port, args.threads)
+        try:
+            run_load(args.port, paths, args.clients, 2)  # warm caches and connection pools
+            done, errors = run_load(args.port, paths, args.clients, args.duration)
+        finally:
+            server.terminate()
+            server.wait()
+        print(f"{worker_class:>7}: {done / args.duration:8.1f} req/s per worker ({errors} errors)")
+
+if __name__ == '__main__':
+    main()
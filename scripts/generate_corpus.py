@@ -0,0 +1,347 @@
+import argparse
+import os
+import random
+import struct
+import sys
+import time
+from bisect import bisect
+from datetime import datetime, timedelta
+from itertools import accumulate
+from multiprocessing import Pool
+from bson import ObjectId
+from pymongo import MongoClient
+
+# Add parent directory to path so we can import app
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app import create_app, mongo
+from app.config import Config
+from app.models.comment import CommentBucket
+from app.models.recipe import Recipe
+from app.models.user import User
+
+CUISINES = [
+    "Italian", "Mexican", "American", "Indian", "Chinese", "Japanese", "Thai", "French", "Mediterranean",
+    "Greek", "Spanish", "Korean", "Vietnamese", "Middle Eastern", "International", "Caribbean", "Ethiopian",
+    "Moroccan", "Turkish", "Lebanese", "Brazilian", "Peruvian", "German", "British", "Filipino"
+]
+BASE_TAGS = [
+    "dinner", "quick-meal", "vegetarian", "healthy", "classic", "dessert", "breakfast", "vegan",
+    "gluten-free", "spicy", "comfort-food", "pasta", "chicken", "beef", "seafood", "soup", "salad",
+    "baking", "one-pot", "dairy-free", "grill", "slow-cooker", "lunch", "snack", "holiday"
+]
+INGREDIENTS = [
+    "Onion", "Garlic", "Olive oil", "Salt", "Black pepper", "Butter", "Flour", "Egg", "Milk", "Tomato",
+    "Chicken breast", "Ground beef", "Rice", "Pasta", "Lemon", "Ginger", "Soy sauce", "Cumin", "Paprika",
+    "Coconut milk", "Carrot", "Potato", "Bell pepper", "Spinach", "Parmesan cheese", "Basil", "Chickpeas"
+]
+QUANTITIES = ["1", "2", "1 cup", "1/2 cup", "2 tbsp", "1 tsp", "200g", "400g", "to taste", "1 can"]
+DIETARY = ["vegetarian", "vegan", "gluten-free", "dairy-free", "keto", "paleo"]
+SKILLS = ["Beginner", "Intermediate", "Advanced"]
+DIFFICULTIES = ["Easy", "Medium", "Hard"]
+COMMENT_TEXTS = [
+    "Delicious, will make again!", "Family loved it.", "A bit too salty for me.", "Perfect weeknight dinner.",
+    "Added extra garlic, great result.", "Took longer than stated.", "Best version I have tried."
+]
+# Every generated user signs in with this password
+PASSWORD = "password123"
+# Timestamps are spread over the two years before this date
+EPOCH = datetime(2024, 1, 1)
+SPAN_SECONDS = 2 * 365 * 86400
+
+USER_KIND = 1
+RECIPE_KIND = 2
+COMMENT_KIND = 3
+
+# Comment ids hold the recipe index above a 16-bit position
+MAX_THREAD_LENGTH = 0xFFFF
+
+# Per-process state set up by init_worker
+_db = None
+_options = None
+_samplers = None
+
+
+def object_id(kind, index, created_at):
+    """Deterministic ObjectId: creation second, document kind and a 7-byte index"""
+    seconds = int((created_at - datetime(1970, 1, 1)).total_seconds())
+    return ObjectId(struct.pack(">IB", seconds, kind) + index.to_bytes(7, 'big'))
+
+
+def created_at_for(kind, index, seed):
+    """Stable creation time for a document, independent of which worker builds it"""
+    # 64-bit multiplicative hash: cheap enough to recompute for every reference
+    mixed = (index * 0x9E3779B97F4A7C15 + kind * 0xBF58476D1CE4E5B9 + seed) & 0xFFFFFFFFFFFFFFFF
+    mixed ^= mixed >> 31
+    return EPOCH - timedelta(seconds=SPAN_SECONDS - mixed % SPAN_SECONDS)
+
+
+def ref_id(kind, index, seed):
+    """ObjectId of another generated document"""
+    return object_id(kind, index, created_at_for(kind, index, seed))
+
+
+class Zipf:
+    """Sampler over ranks 0..n-1 with P(rank) proportional to 1 / (rank + 1) ** s"""
+
+    def __init__(self, n, s):
+        self.cumulative = list(accumulate(1 / (rank + 1) ** s for rank in range(n)))
+
+    def sample(self, rng):
+        return min(bisect(self.cumulative, rng.random() * self.cumulative[-1]), len(self.cumulative) - 1)
+
+
+def long_tail(rng, alpha, cap):
+    """Count drawn from a Pareto tail: mostly zero or a few, occasionally up to cap"""
+    return min(int(rng.paretovariate(alpha)) - 1, cap)
+
+
+def init_worker(options, db=None):
+    global _db, _options, _samplers
+    _options = options
+    _samplers = {
+        "cuisines": Zipf(len(CUISINES), options["zipf"]),
+        "tags": Zipf(len(options["tags"]), options["zipf"]),
+        "authors": Zipf(options["users"], options["zipf"]),
+        "recipes": Zipf(options["recipes"], options["zipf"])
+    }
+    # Each process opens its own client; connections must not cross a fork
+    _db = db if db is not None else MongoClient(options["uri"]).get_default_database()
+
+
+def build_users(start, end):
+    """User documents start..end-1 with long-tail favorites lists skewed to popular recipes"""
+    options = _options
+    recipe_popularity = _samplers["recipes"]
+    password_hash = User.hash_password(PASSWORD)
+    docs = []
+    for index in range(start, end):
+        rng = random.Random(f"{options['seed']}:{USER_KIND}:{index}")
+        created_at = created_at_for(USER_KIND, index, options["seed"])
+        favorites = set()
+        for _ in range(long_tail(rng, options["favorites_alpha"], options["max_favorites"])):
+            favorites.add(ref_id(RECIPE_KIND, recipe_popularity.sample(rng), options["seed"]))
+        docs.append(User(
+            username=f"user{index}",
+            email=f"user{index}@example.com",
+            password_hash=password_hash,
+            dietary_preferences=rng.sample(DIETARY, rng.randrange(3)),
+            favorite_cuisines=rng.sample(CUISINES[:10], rng.randrange(1, 4)),
+            favorite_recipes=list(favorites),
+            cooking_skill_level=rng.choice(SKILLS),
+            created_at=created_at,
+            updated_at=created_at,
+            _id=object_id(USER_KIND, index, created_at)
+        ).to_dict())
+    return docs, []
+
+
+def build_recipes(start, end):
+    """Recipe documents start..end-1 plus the comment buckets of their long-tail comment threads"""
+    options = _options
+    seed = options["seed"]
+    cuisines = _samplers["cuisines"]
+    tags = _samplers["tags"]
+    authors = _samplers["authors"]
+    recipes = []
+    buckets = []
+    for index in range(start, end):
+        rng = random.Random(f"{seed}:{RECIPE_KIND}:{index}")
+        created_at = created_at_for(RECIPE_KIND, index, seed)
+        recipe_id = object_id(RECIPE_KIND, index, created_at)
+        # Popular recipes (low indexes under the favorites Zipf) also collect more activity
+        boost = 1 + 10 / (1 + index / 100)
+        ratings = {}
+        ratings_count = min(int(long_tail(rng, options["ratings_alpha"], options["max_ratings"]) * boost),
+                            options["max_ratings"])
+        for _ in range(ratings_count):
+            user_index = rng.randrange(options["users"])
+            ratings[user_index] = {
+                "user_id": ref_id(USER_KIND, user_index, seed),
+                "rating": rng.choices((1, 2, 3, 4, 5), weights=(1, 2, 6, 14, 12))[0],
+                "date": created_at + timedelta(seconds=rng.randrange(SPAN_SECONDS // 4))
+            }
+        comments = []
+        thread_length = min(int(long_tail(rng, options["comments_alpha"], options["max_comments"]) * boost),
+                            options["max_comments"], MAX_THREAD_LENGTH)
+        for position in range(thread_length):
+            user_index = rng.randrange(options["users"])
+            date = created_at + timedelta(minutes=position * 30 + rng.randrange(30))
+            comments.append({
+                "_id": object_id(COMMENT_KIND, (index << 16) | position, date),
+                "user_id": ref_id(USER_KIND, user_index, seed),
+                "username": f"user{user_index}",
+                "text": rng.choice(COMMENT_TEXTS),
+                "date": date
+            })
+        for seq in range(0, len(comments), Config.COMMENTS_BUCKET_SIZE):
+            buckets.append(CommentBucket(
+                recipe_id=recipe_id,
+                seq=seq // Config.COMMENTS_BUCKET_SIZE,
+                comments=comments[seq:seq + Config.COMMENTS_BUCKET_SIZE],
+                created_at=comments[seq]["date"],
+                updated_at=comments[min(seq + Config.COMMENTS_BUCKET_SIZE, len(comments)) - 1]["date"]
+            ).to_dict())
+        author = authors.sample(rng)
+        recipe_tags = []
+        for _ in range(rng.randrange(2, 7)):
+            tag = options["tags"][tags.sample(rng)]
+            if tag not in recipe_tags:
+                recipe_tags.append(tag)
+        updated_at = max([created_at] + [comment["date"] for comment in comments[-1:]])
+        recipes.append(Recipe(
+            name=f"{rng.choice(INGREDIENTS)} {rng.choice(['Stew', 'Bake', 'Salad', 'Curry', 'Bowl', 'Skillet'])} {index}",
+            ingredients=[{"name": name, "quantity": rng.choice(QUANTITIES)}
+                         for name in rng.sample(INGREDIENTS, rng.randrange(4, 13))],
+            instructions=[f"Step {step + 1}: {rng.choice(COMMENT_TEXTS)}" for step in range(rng.randrange(3, 10))],
+            cuisine=CUISINES[cuisines.sample(rng)],
+            difficulty=rng.choices(DIFFICULTIES, weights=(5, 4, 1))[0],
+            preparation_time=rng.randrange(5, 60, 5),
+            cooking_time=rng.randrange(0, 180, 5),
+            nutritional_info={"calories": rng.randrange(150, 1200), "protein": rng.randrange(2, 60),
+                              "carbs": rng.randrange(5, 120), "fat": rng.randrange(1, 60)},
+            tags=recipe_tags,
+            user_id=ref_id(USER_KIND, author, seed),
+            user_ratings=list(ratings.values()),
+            recent_comments=comments[-Config.RECENT_COMMENTS_LIMIT:],
+            comment_count=len(comments),
+            created_at=created_at,
+            updated_at=updated_at,
+            _id=recipe_id
+        ).to_dict())
+    return recipes, buckets
+
+
+def write_chunk(task):
+    """Build one chunk of documents and write it with unordered bulk inserts"""
+    kind, start, end = task
+    started = time.perf_counter()
+    if kind == USER_KIND:
+        docs, buckets = build_users(start, end)
+        collection = _db[Config.USERS_COLLECTION]
+    else:
+        docs, buckets = build_recipes(start, end)
+        collection = _db[Config.RECIPES_COLLECTION]
+    batch_size = _options["batch_size"]
+    for offset in range(0, len(docs), batch_size):
+        collection.insert_many(docs[offset:offset + batch_size], ordered=False)
+    for offset in range(0, len(buckets), batch_size):
+        _db[Config.COMMENTS_COLLECTION].insert_many(buckets[offset:offset + batch_size], ordered=False)
+    return kind, len(docs), len(buckets), time.perf_counter() - started
+
+
+def chunks(kind, total, chunk_size):
+    return [(kind, start, min(start + chunk_size, total)) for start in range(0, total, chunk_size)]
+
+
+def corpus_options(uri, users, recipes, seed=42, tags=500, zipf=1.1, ratings_alpha=1.2, comments_alpha=1.5,
+                   favorites_alpha=0.8, max_ratings=500, max_comments=300, max_favorites=2000, batch_size=1000):
+    """Generation parameters shared by every worker"""
+    return {
+        "uri": uri,
+        "seed": seed,
+        "users": users,
+        "recipes": recipes,
+        "zipf": zipf,
+        "tags": BASE_TAGS + [f"tag-{index}" for index in range(max(tags - len(BASE_TAGS), 0))],
+        "ratings_alpha": ratings_alpha,
+        "comments_alpha": comments_alpha,
+        "favorites_alpha": favorites_alpha,
+        "max_ratings": max_ratings,
+        "max_comments": max_comments,
+        "max_favorites": max_favorites,
+        "batch_size": batch_size
+    }
+
+
+def drop_corpus(db):
+    for name in (Config.USERS_COLLECTION, Config.RECIPES_COLLECTION, Config.COMMENTS_COLLECTION,
+                 Config.STATS_COLLECTION, Config.RECOMMENDATIONS_COLLECTION):
+        db.drop_collection(name)
+
+
+def generate(options, workers, chunk_size, db=None):
+    """Write the corpus, yielding (kind, documents, comment buckets, seconds) per chunk
+
+    With db given (e.g. an in-memory stand-in) the chunks are written from
+    this process instead of the worker pool.
+    """
+    tasks = chunks(USER_KIND, options["users"], chunk_size) + chunks(RECIPE_KIND, options["recipes"], chunk_size)
+    if db is not None:
+        init_worker(options, db)
+        yield from map(write_chunk, tasks)
+        return
+    with Pool(workers, initializer=init_worker, initargs=(options,)) as pool:
+        yield from pool.imap_unordered(write_chunk, tasks)
+
+
+def finalize(batch_size, uri=None, app=None):
+    """Indexes and derived data the app maintains incrementally, built once after the load
+
+    Without an app, one is created for `uri` so the rebuilds run against
+    the database the corpus was written to.
+    """
+    from app.services.recipe_service import RecipeService
+    from app.services.user_service import UserService
+    if app is None:
+        app = create_app('development')
+        if uri:
+            app.config['MONGO_URI'] = uri
+            mongo.init_app(app, uri)
+    with app.app_context():
+        print("Creating indexes...")
+        Recipe.create_indexes(mongo.db[Config.RECIPES_COLLECTION])
+        User.create_indexes(mongo.db[Config.USERS_COLLECTION])
+        CommentBucket.create_indexes(mongo.db[Config.COMMENTS_COLLECTION])
+        print("Rebuilding statistics snapshot and user comment counters...")
+        RecipeService().rebuild_recipe_stats()
+        UserService().rebuild_comment_counts(batch_size)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate a deterministic synthetic recipe corpus for load testing")
+    parser.add_argument('--users', type=int, default=10000)
+    parser.add_argument('--recipes', type=int, default=100000)
+    parser.add_argument('--tags', type=int, default=500, help='Tag vocabulary size')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--zipf', type=float, default=1.1, help='Zipf exponent for tag, cuisine, author and '
+                                                               'favorite popularity')
+    parser.add_argument('--ratings-alpha', type=float, default=1.2, help='Pareto shape of ratings per recipe')
+    parser.add_argument('--comments-alpha', type=float, default=1.5, help='Pareto shape of comments per recipe')
+    parser.add_argument('--favorites-alpha', type=float, default=0.8, help='Pareto shape of favorites per user')
+    parser.add_argument('--max-ratings', type=int, default=500)
+    parser.add_argument('--max-comments', type=int, default=300)
+    parser.add_argument('--max-favorites', type=int, default=2000)
+    parser.add_argument('--workers', type=int, default=os.cpu_count())
+    parser.add_argument('--chunk-size', type=int, default=5000, help='Documents per worker task')
+    parser.add_argument('--batch-size', type=int, default=1000, help='Documents per insert_many')
+    parser.add_argument('--uri', default=Config.MONGO_URI)
+    parser.add_argument('--drop', action='store_true', help='Drop the users, recipes and comments collections first')
+    parser.add_argument('--skip-finalize', action='store_true', help='Skip index, stats and counter rebuilds')
+    args = parser.parse_args()
+
+    options = corpus_options(args.uri, args.users, args.recipes, args.seed, args.tags, args.zipf,
+                             args.ratings_alpha, args.comments_alpha, args.favorites_alpha, args.max_ratings,
+                             args.max_comments, args.max_favorites, args.batch_size)
+    if args.drop:
+        drop_corpus(MongoClient(args.uri).get_default_database())
+
+    totals = {USER_KIND: 0, RECIPE_KIND: 0}
+    comment_buckets = 0
+    started = time.perf_counter()
+    print(f"Generating {args.users} users and {args.recipes} recipes with {args.workers} workers (seed {args.seed})")
+    for kind, count, buckets, _ in generate(options, args.workers, args.chunk_size):
+        totals[kind] += count
+        comment_buckets += buckets
+        elapsed = time.perf_counter() - started
+        written = totals[USER_KIND] + totals[RECIPE_KIND]
+        print(f"  {totals[USER_KIND]:>9} users {totals[RECIPE_KIND]:>9} recipes {comment_buckets:>9} "
+              f"comment buckets  {written / elapsed:8.0f} docs/s")
+    print(f"Loaded in {time.perf_counter() - started:.1f}s")
+    if not args.skip_finalize:
+        finalize(args.batch_size, args.uri)
+    print(f"Corpus ready in {time.perf_counter() - started:.1f}s")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,359 @@
+import argparse
+import asyncio
+import json
+import random
+import sys
+import time
+from collections import defaultdict
+from urllib.parse import urlencode, urlsplit
+
+# Share of requests per route; every route but home, search and recipe needs a signed-in user
+DEFAULT_MIX = "home=20,search=25,recipe=30,profile=10,favorite=8,comment=7"
+SEARCH_TERMS = ["chicken", "pasta", "curry", "salad", "vegan", "spicy", "soup", "beef", "baking", "quick-meal"]
+PERCENTILES = (50, 95, 99)
+# Password of the users created by seed_data.py and generate_corpus.py
+PASSWORD = "password123"
+
+
+class HTTPError(Exception):
+    pass
+
+
+class Connection:
+    """Keep-alive HTTP/1.1 connection carrying one user's session cookies"""
+
+    def __init__(self, host, port, timeout):
+        self.host = host
+        self.port = port
+        self.timeout = timeout
+        self.cookies = {}
+        self.reader = None
+        self.writer = None
+
+    async def request(self, method, path, body=None, headers=None):
+        """Send one request, reconnecting once if the server closed the idle connection"""
+        for attempt in (0, 1):
+            if self.writer is None:
+                self.reader, self.writer = await asyncio.wait_for(
+                    asyncio.open_connection(self.host, self.port), self.timeout)
+            try:
+                return await asyncio.wait_for(self._exchange(method, path, body, headers or {}), self.timeout)
+            except (ConnectionError, asyncio.IncompleteReadError):
+                self.close()
+                if attempt:
+                    raise
+            except BaseException:
+                self.close()
+                raise
+
+    async def _exchange(self, method, path, body, headers):
+        lines = [f"{method} {path} HTTP/1.1", f"Host: {self.host}:{self.port}", "Connection: keep-alive"]
+        if self.cookies:
+            lines.append("Cookie: " + "; ".join(f"{name}={value}" for name, value in self.cookies.items()))
+        if body is not None:
+            lines.append(f"Content-Length: {len(body)}")
+        lines.extend(f"{name}: {value}" for name, value in headers.items())
+        self.writer.write(("\r\n".join(lines) + "\r\n\r\n").encode('latin-1') + (body or b''))
+        await self.writer.drain()
+
+        status_line = await self.reader.readuntil(b"\r\n")
+        if not status_line:
+            raise ConnectionError("connection closed")
+        status = int(status_line.split()[1])
+        response_headers = {}
+        while True:
+            line = (await self.reader.readuntil(b"\r\n")).decode('latin-1').rstrip("\r\n")
+            if not line:
+                break
+            name, _, value = line.partition(":")
+            name = name.strip().lower()
+            value = value.strip()
+            if name == 'set-cookie':
+                cookie_name, _, cookie_value = value.split(";", 1)[0].partition("=")
+                self.cookies[cookie_name] = cookie_value
+            response_headers[name] = value
+        if response_headers.get('transfer-encoding') == 'chunked':
+            payload = bytearray()
+            while True:
+                size = int((await self.reader.readuntil(b"\r\n")).split(b";")[0], 16)
+                chunk = await self.reader.readexactly(size + 2)
+                if not size:
+                    break
+                payload += chunk[:-2]
+        else:
+            payload = await self.reader.readexactly(int(response_headers.get('content-length', 0)))
+        if response_headers.get('connection', '').lower() == 'close':
+            self.close()
+        return status, bytes(payload)
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+        self.reader = self.writer = None
+
+
+class Session:
+    """A virtual user: one connection plus the state its routes need"""
+
+    def __init__(self, connection, username=None):
+        self.connection = connection
+        self.username = username
+        self.favorited = set()
+
+    async def login(self):
+        body = urlencode({"username": self.username, "password": PASSWORD}).encode()
+        status, _ = await self.connection.request(
+            "POST", "/users/login", body, {"Content-Type": "application/x-www-form-urlencoded"})
+        if status != 302:
+            raise HTTPError(f"login failed for {self.username} ({status})")
+
+
+class Routes:
+    """Requests of the traffic mix, each returning the response status"""
+
+    def __init__(self, recipe_ids, rng):
+        self.recipe_ids = recipe_ids
+        self.rng = rng
+
+    async def home(self, session):
+        return (await session.connection.request("GET", "/"))[0]
+
+    async def search(self, session):
+        query = urlencode({"q": self.rng.choice(SEARCH_TERMS)})
+        return (await session.connection.request("GET", f"/recipes/?{query}"))[0]
+
+    async def recipe(self, session):
+        return (await session.connection.request("GET", f"/recipes/{self.rng.choice(self.recipe_ids)}"))[0]
+
+    async def profile(self, session):
+        return (await session.connection.request("GET", "/users/profile"))[0]
+
+    async def favorite(self, session):
+        # Toggle: favorite a new recipe or drop one favorited earlier in the run
+        if session.favorited and self.rng.random() < 0.5:
+            recipe_id = session.favorited.pop()
+            method = "DELETE"
+        else:
+            recipe_id = self.rng.choice(self.recipe_ids)
+            session.favorited.add(recipe_id)
+            method = "POST"
+        return (await session.connection.request(method, f"/users/recipes/{recipe_id}/favorite"))[0]
+
+    async def comment(self, session):
+        body = json.dumps({"text": f"Load test comment {self.rng.randrange(1_000_000)}"}).encode()
+        return (await session.connection.request(
+            "POST", f"/recipes/{self.rng.choice(self.recipe_ids)}/comments", body,
+            {"Content-Type": "application/json", "Accept": "application/json"}))[0]
+
+
+class Recorder:
+    """Latencies and failures per route"""
+
+    def __init__(self):
+        self.latencies = defaultdict(list)
+        self.errors = defaultdict(int)
+        self.dropped = 0
+
+    def record(self, route, seconds, ok):
+        self.latencies[route].append(seconds)
+        if not ok:
+            self.errors[route] += 1
+
+    def report(self, elapsed):
+        rows = {}
+        for route in sorted(self.latencies, key=lambda name: -len(self.latencies[name])):
+            rows[route] = self._summary(self.latencies[route], self.errors[route], elapsed)
+        everything = [latency for latencies in self.latencies.values() for latency in latencies]
+        if everything:
+            rows["total"] = self._summary(everything, sum(self.errors.values()), elapsed)
+            rows["total"]["dropped"] = self.dropped
+        return rows
+
+    @staticmethod
+    def _summary(latencies, errors, elapsed):
+        latencies = sorted(latencies)
+        summary = {
+            "requests": len(latencies),
+            "throughput": round(len(latencies) / elapsed, 1),
+            "error_rate": round(errors / len(latencies), 4)
+        }
+        for percentile in PERCENTILES:
+            rank = max(int(round(percentile / 100 * len(latencies))) - 1, 0)
+            summary[f"p{percentile}_ms"] = round(latencies[rank] * 1000, 2)
+        return summary
+
+
+def parse_mix(value):
+    mix = {}
+    for part in value.split(","):
+        route, _, weight = part.partition("=")
+        if not hasattr(Routes, route.strip()):
+            raise argparse.ArgumentTypeError(f"unknown route '{route}'")
+        mix[route.strip()] = float(weight)
+    return mix
+
+
+async def discover_recipe_ids(connection, pages):
+    """Recipe ids from the JSON listing, so the harness needs nothing but HTTP"""
+    recipe_ids = []
+    for page in range(1, pages + 1):
+        status, body = await connection.request("GET", f"/recipes/?page={page}", headers={"Accept": "application/json"})
+        if status != 200:
+            break
+        recipes = json.loads(body)["recipes"]
+        recipe_ids.extend(recipe["_id"] for recipe in recipes)
+        if not recipes:
+            break
+    if not recipe_ids:
+        raise HTTPError("no recipes found; seed the database first")
+    return recipe_ids
+
+
+async def open_sessions(args, count):
+    host, port = args.target
+    sessions = []
+    for index in range(count):
+        session = Session(Connection(host, port, args.timeout), f"{args.user_prefix}{index % args.user_count}")
+        await session.login()
+        sessions.append(session)
+    return sessions
+
+
+async def issue(routes, recorder, route, session, scheduled):
+    try:
+        status = await getattr(routes, route)(session)
+        ok = status < 400
+    except (OSError, asyncio.TimeoutError, asyncio.IncompleteReadError, ValueError, HTTPError):
+        ok = False
+    # Measured from the scheduled start, so time spent queued behind a saturated server counts
+    recorder.record(route, time.perf_counter() - scheduled, ok)
+
+
+async def closed_loop(args, routes, sessions, recorder):
+    """Each virtual user sends its next request as soon as the previous one completes"""
+    routes_list, weights = zip(*args.mix.items())
+    deadline = time.perf_counter() + args.duration
+
+    async def user(session):
+        rng = random.Random(f"{args.seed}:{session.username}")
+        while time.perf_counter() < deadline:
+            await issue(routes, recorder, rng.choices(routes_list, weights)[0], session, time.perf_counter())
+            if args.think_time:
+                await asyncio.sleep(rng.expovariate(1 / args.think_time))
+
+    await asyncio.gather(*(user(session) for session in sessions))
+
+
+async def open_loop(args, rate, routes, sessions, recorder):
+    """Requests arrive at a fixed rate whether or not earlier ones have completed"""
+    routes_list, weights = zip(*args.mix.items())
+    rng = random.Random(args.seed)
+    idle = asyncio.Queue()
+    for session in sessions:
+        idle.put_nowait(session)
+    tasks = set()
+
+    async def arrival(route, scheduled):
+        session = await idle.get()
+        try:
+            await issue(routes, recorder, route, session, scheduled)
+        finally:
+            idle.put_nowait(session)
+
+    started = time.perf_counter()
+    next_arrival = started
+    while next_arrival < started + args.duration:
+        delay = next_arrival - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        if len(tasks) >= args.max_inflight:
+            # The server has fallen this far behind; shed the request rather than queue forever
+            recorder.dropped += 1
+        else:
+            task = asyncio.ensure_future(arrival(rng.choices(routes_list, weights)[0], next_arrival))
+            tasks.add(task)
+            task.add_done_callback(tasks.discard)
+        next_arrival += rng.expovariate(rate) if args.arrivals == 'poisson' else 1 / rate
+    if tasks:
+        await asyncio.gather(*tasks)
+
+
+def print_report(title, rows):
+    print(f"\n{title}")
+    print(f"{'route':<10} {'requests':>9} {'req/s':>9} {'errors':>8} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+    for route, row in rows.items():
+        print(f"{route:<10} {row['requests']:>9} {row['throughput']:>9.1f} {row['error_rate']:>8.2%} "
+              f"{row['p50_ms']:>9.1f} {row['p95_ms']:>9.1f} {row['p99_ms']:>9.1f}")
+    if "total" in rows and rows["total"]["dropped"]:
+        print(f"dropped {rows['total']['dropped']} arrivals at the in-flight limit")
+
+
+async def run(args):
+    host, port = args.target
+    discovery = Connection(host, port, args.timeout)
+    recipe_ids = await discover_recipe_ids(discovery, args.discover_pages)
+    discovery.close()
+    routes = Routes(recipe_ids, random.Random(args.seed))
+    sessions = await open_sessions(args, args.concurrency)
+    print(f"{len(sessions)} signed-in sessions, {len(recipe_ids)} recipes, mix {args.mix}")
+    runs = {}
+    try:
+        steps = args.rates or [None]
+        for rate in steps:
+            recorder = Recorder()
+            started = time.perf_counter()
+            if rate is None:
+                await closed_loop(args, routes, sessions, recorder)
+                title = f"closed loop, {len(sessions)} users"
+            else:
+                await open_loop(args, rate, routes, sessions, recorder)
+                title = f"open loop, {rate:g} req/s offered"
+            rows = recorder.report(time.perf_counter() - started)
+            print_report(title, rows)
+            runs[title] = rows
+    finally:
+        for session in sessions:
+            session.connection.close()
+    if args.rates and len(args.rates) > 1:
+        print("\noffered   achieved   p99 ms   errors")
+        for rate, rows in zip(args.rates, runs.values()):
+            total = rows.get("total", {"throughput": 0, "p99_ms": 0, "error_rate": 0})
+            print(f"{rate:>7g} {total['throughput']:>10.1f} {total['p99_ms']:>8.1f} {total['error_rate']:>8.2%}")
+    return runs
+
+
+def main():
+    parser = argparse.ArgumentParser(description="HTTP load test with a realistic route mix")
+    parser.add_argument('--url', default='http://127.0.0.1:5000', help='Base URL of the deployment under test')
+    parser.add_argument('--duration', type=float, default=60, help='Seconds per run (per rate with --rate)')
+    parser.add_argument('--concurrency', type=int, default=50,
+                        help='Signed-in sessions: closed-loop users, or the connection pool in open loop')
+    parser.add_argument('--rate', dest='rates', type=float, action='append',
+                        help='Open loop at this many requests/s; repeat to step through rates')
+    parser.add_argument('--arrivals', choices=('uniform', 'poisson'), default='poisson')
+    parser.add_argument('--max-inflight', type=int, default=1000,
+                        help='Open-loop requests allowed to wait for a session before arrivals are dropped')
+    parser.add_argument('--think-time', type=float, default=0.0, help='Mean closed-loop pause between requests')
+    parser.add_argument('--mix', type=parse_mix, default=parse_mix(DEFAULT_MIX),
+                        help=f'route=weight pairs (default {DEFAULT_MIX})')
+    parser.add_argument('--user-prefix', default='user', help='Sign in as PREFIX0..PREFIX(N-1) (generate_corpus users)')
+    parser.add_argument('--user-count', type=int, default=1000)
+    parser.add_argument('--discover-pages', type=int, default=10, help='Listing pages read to collect recipe ids')
+    parser.add_argument('--timeout', type=float, default=30)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output', help='Write the per-route results as JSON')
+    args = parser.parse_args()
+    target = urlsplit(args.url)
+    args.target = (target.hostname, target.port or 80)
+
+    try:
+        runs = asyncio.run(run(args))
+    except HTTPError as exc:
+        sys.exit(str(exc))
+    if args.output:
+        with open(args.output, 'w') as handle:
+            json.dump(runs, handle, indent=2)
+
+
+if __name__ == '__main__':
+    main()
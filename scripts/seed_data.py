@@ -262,24 +262,20 @@ def create_sample_recipes(user_ids):
         now = datetime.utcnow()
         recipe_data['created_at'] = now
         recipe_data['updated_at'] = now
-        # Create recipe
-        recipe = Recipe(**recipe_data)
-        result = mongo.db.recipes.insert_one(recipe.to_dict())
-        print(f"Created recipe: {recipe.name}")
         # Dunno where to put it, randomize
         num_ratings = random.randint(3, 10)
         ratings = []
         for _ in range(num_ratings):
             ratings.append({
-                "user_id": random.choice(user_ids),
+                "user_id": ObjectId(random.choice(user_ids)),
                 "rating": round(random.uniform(3.0, 5.0), 1),
                 "date": datetime.utcnow()
             })
-        
-        mongo.db.recipes.update_one(
-            {"_id": result.inserted_id},
-            {"$set": {"user_ratings": ratings}}
-        )
+        recipe_data['user_ratings'] = ratings
+        # Create recipe (rating aggregates are derived from user_ratings)
+        recipe = Recipe(**recipe_data)
+        mongo.db.recipes.insert_one(recipe.to_dict())
+        print(f"Created recipe: {recipe.name}")
     
     # Add some recipes to user favorites
     recipe_ids = [str(r["_id"]) for r in mongo.db.recipes.find({}, {"_id": 1})]
@@ -0,0 +1,99 @@
+from datetime import datetime
+from bson import ObjectId
+from app.models.document import Document, Field
+from app.models.recipe import Recipe, RecipeSummary
+
+
+def recipe_document(**overrides):
+    doc = {
+        "_id": ObjectId(),
+        "name": "Pad Thai",
+        "ingredients": [{"name": "noodles", "quantity": "200 g"}],
+        "instructions": ["Soak", "Fry"],
+        "cuisine": "Thai",
+        "difficulty": "Medium",
+        "preparation_time": 15,
+        "cooking_time": 10,
+        "tags": ["dinner"],
+        "user_id": ObjectId(),
+        "user_ratings": [{"user_id": ObjectId(), "rating": 4}],
+        "created_at": datetime(2024, 1, 2)
+    }
+    doc.update(overrides)
+    return doc
+
+
+# Lazy field decoding (user-019)
+
+def test_field_is_decoded_on_first_read_and_cached():
+    calls = []
+
+    class Model(Document):
+        value = Field(decode=lambda stored: calls.append(stored) or stored.upper())
+
+    model = Model.wrap({"value": "abc"})
+    assert calls == []
+    assert model.value == "ABC"
+    assert model.value == "ABC"
+    assert calls == ["abc"]
+    assert model.__dict__ == {"value": "ABC"}
+
+
+def test_missing_fields_use_their_default():
+    recipe = Recipe.from_dict({"_id": ObjectId(), "name": "Toast"})
+    assert recipe.tags == [] and recipe.nutritional_info == {} and recipe.image_url is None
+    assert recipe.tags is not Recipe.from_dict({"name": "Jam"}).tags
+
+
+def test_wrapped_document_is_not_modified():
+    doc = recipe_document()
+    before = dict(doc)
+    recipe = Recipe.from_dict(doc)
+    recipe.name = "Renamed"
+    recipe.to_dict()
+    assert doc == before
+    assert recipe.name == "Renamed"
+
+
+def test_to_dict_copies_unread_fields_and_encodes_set_ones():
+    doc = recipe_document()
+    recipe = Recipe.from_dict(doc)
+    assert recipe._id == str(doc["_id"])
+    user_id = ObjectId()
+    recipe.user_id = str(user_id)
+    result = recipe.to_dict()
+    assert result["_id"] == doc["_id"]
+    assert result["user_id"] == user_id
+    assert result["ingredients"] is doc["ingredients"]
+    assert result["average_rating"] == 4 and result["ratings_count"] == 1
+
+
+def test_to_api_dict_is_the_same_before_and_after_reading_fields():
+    doc = recipe_document()
+    unread = Recipe.from_dict(doc).to_api_dict()
+    read = Recipe.from_dict(doc)
+    for name in Recipe._fields:
+        getattr(read, name)
+    exported = read.to_api_dict()
+    assert exported["_id"] == str(doc["_id"]) and unread["_id"] == doc["_id"]
+    assert {key: value for key, value in exported.items() if key not in ("_id", "user_id")} == \
+        {key: value for key, value in unread.items() if key not in ("_id", "user_id")}
+
+
+def test_summary_exports_only_its_own_fields():
+    summary = RecipeSummary.from_dict(recipe_document())
+    assert list(summary.to_api_dict()) == list(RecipeSummary._fields)
+
+
+def test_subclass_gets_its_own_copy_of_inherited_fields():
+    class Base(Document):
+        value = Field(decode=str)
+
+    class Child(Base):
+        extra = Field()
+
+    assert Child.__dict__["value"] is not Base.__dict__["value"]
+    assert Child._fields["value"].name == "value"
+    assert Base._fields["value"] is Base.__dict__["value"]
+    assert list(Base._fields) == ["value"]
+    assert Child.wrap({"value": 1, "extra": 2}).value == "1"
@@ -0,0 +1,667 @@
+import contextvars
+import json
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timedelta
+import pytest
+from bson import ObjectId
+from app import mongo
+from app.config import Config
+from app.services.command_monitor import CommandStats, EndpointStats, command_shape, query_shape
+from app.services.comment_service import CommentService
+from app.services.ingest_service import IngestService
+from app.services.pagination import (
+    RECENT_SORT, ResultCounter, apply_cursor, build_pagination, decode_cursor, encode_cursor, keyset_filter
+)
+from app.services.similarity_index import SimilarityIndex
+from app.services.stats_service import StatsService
+
+
+# Keyset pagination (user-003)
+
+def test_cursor_round_trip():
+    created_at = datetime(2024, 1, 2, 3, 4, 5, 678000)
+    doc_id = ObjectId()
+    assert decode_cursor(encode_cursor(created_at, doc_id)) == (created_at, doc_id)
+    assert decode_cursor(encode_cursor(None, doc_id)) == (None, doc_id)
+
+
+def test_cursor_token_is_url_safe():
+    token = encode_cursor(datetime(2024, 1, 1), ObjectId())
+    assert "=" not in token and "+" not in token and "/" not in token
+
+
+@pytest.mark.parametrize("token", ["", "not-base64!", "e30", "eyJ2IjogMX0", "eyJ2IjogMSwgImkiOiAieCJ9"])
+def test_decode_cursor_rejects_malformed_tokens(token):
+    with pytest.raises(ValueError):
+        decode_cursor(token)
+
+
+def test_keyset_filter_without_sort_value_only_uses_id():
+    doc_id = ObjectId()
+    assert keyset_filter("created_at", None, doc_id) == {"created_at": None, "_id": {"$lt": doc_id}}
+
+
+def test_apply_cursor_keeps_the_original_query():
+    doc_id = ObjectId()
+    token = encode_cursor(datetime(2024, 1, 1), doc_id)
+    query = apply_cursor({"cuisine": "Thai"}, token, "created_at")
+    assert query["$and"][0] == {"cuisine": "Thai"}
+    assert apply_cursor({"cuisine": "Thai"}, None, "created_at") == {"cuisine": "Thai"}
+
+
+def test_build_pagination_cursor_points_at_last_returned_document():
+    docs = [{"_id": ObjectId(), "created_at": datetime(2024, 1, 1) - timedelta(minutes=i)} for i in range(4)]
+    pagination = build_pagination(1, 3, 10, docs, "created_at")
+    assert pagination["has_next"] is True
+    assert pagination["total_pages"] == 4
+    assert decode_cursor(pagination["next_cursor"]) == (docs[2]["created_at"], docs[2]["_id"])
+    assert build_pagination(1, 3, 3, docs[:3], "created_at")["next_cursor"] is None
+
+
+def test_cursor_pages_cover_created_at_ties_exactly_once():
+    mongomock = pytest.importorskip("mongomock")
+    collection = mongomock.MongoClient().db.recipes
+    tied = datetime(2024, 1, 1)
+    # Three distinct timestamps, several documents sharing each, plus undated documents
+    docs = [{"_id": ObjectId(), "created_at": tied - timedelta(minutes=i % 3)} for i in range(10)]
+    docs += [{"_id": ObjectId(), "created_at": None} for _ in range(3)]
+    collection.insert_many(docs)
+
+    seen, cursor = [], None
+    while True:
+        page = list(collection.find(apply_cursor({}, cursor, "created_at")).sort(RECENT_SORT).limit(4))
+        pagination = build_pagination(1, 3, len(docs), page, "created_at")
+        seen += [doc["_id"] for doc in page[:3]]
+        cursor = pagination["next_cursor"]
+        if not cursor:
+            break
+    expected = [doc["_id"] for doc in collection.find().sort(RECENT_SORT)]
+    assert seen == expected
+    assert len(set(seen)) == len(docs)
+
+
+# Count strategies (user-004)
+
+class CountingCollection:
+    """Collection stand-in that records the count calls it receives"""
+
+    name = "recipes"
+
+    def __init__(self, total):
+        self.total = total
+        self.calls = []
+
+    def count_documents(self, query, limit=None):
+        self.calls.append((query, limit))
+        return min(self.total, limit) if limit else self.total
+
+    def estimated_document_count(self):
+        self.calls.append(("estimate", None))
+        return self.total
+
+
+def test_result_counter_uses_estimate_without_filter():
+    collection = CountingCollection(42)
+    assert ResultCounter(mode=ResultCounter.EXACT).count(collection, {}) == (42, False)
+    assert collection.calls == [("estimate", None)]
+
+
+def test_result_counter_exact_counts_every_call():
+    collection = CountingCollection(7)
+    counter = ResultCounter(mode=ResultCounter.EXACT)
+    assert counter.count(collection, {"cuisine": "Thai"}) == (7, False)
+    assert counter.count(collection, {"cuisine": "Thai"}) == (7, False)
+    assert len(collection.calls) == 2
+
+
+def test_result_counter_capped_reports_the_cap():
+    collection = CountingCollection(5000)
+    counter = ResultCounter(mode=ResultCounter.CAPPED, cap=100)
+    assert counter.count(collection, {"cuisine": "Thai"}) == (100, True)
+    assert collection.calls == [({"cuisine": "Thai"}, 101)]
+    assert ResultCounter(mode=ResultCounter.CAPPED, cap=100).count(CountingCollection(100), {"a": 1}) == (100, False)
+
+
+def test_result_counter_cache_ignores_set_operator_order_and_is_invalidated():
+    collection = CountingCollection(3)
+    counter = ResultCounter(mode=ResultCounter.CACHED, ttl=60, max_entries=10)
+    assert counter.count(collection, {"tags": {"$in": ["a", "b"]}}) == (3, False)
+    collection.total = 4
+    assert counter.count(collection, {"tags": {"$in": ["b", "a"]}}) == (3, False)
+    assert len(collection.calls) == 1
+    counter.invalidate()
+    assert counter.count(collection, {"tags": {"$in": ["a", "b"]}}) == (4, False)
+
+
+def test_result_counter_cache_evicts_least_recently_used():
+    collection = CountingCollection(1)
+    counter = ResultCounter(mode=ResultCounter.CACHED, ttl=60, max_entries=2)
+    for cuisine in ("a", "b", "a", "c"):
+        counter.count(collection, {"cuisine": cuisine})
+    calls = len(collection.calls)
+    counter.count(collection, {"cuisine": "a"})
+    assert len(collection.calls) == calls
+    counter.count(collection, {"cuisine": "b"})
+    assert len(collection.calls) == calls + 1
+
+
+# Statistics snapshot deltas (user-002)
+
+RECIPE = {"cuisine": "Thai", "difficulty": "Easy", "tags": ["spicy", "quick"],
+          "preparation_time": 10, "cooking_time": 20}
+
+
+def test_recipe_delta_counts_every_field():
+    assert StatsService.recipe_delta(RECIPE) == Counter({
+        "total_recipes": 1, "cuisines.Thai": 1, "difficulties.Easy": 1, "tags.spicy": 1, "tags.quick": 1,
+        "prep_time_sum": 10, "prep_time_count": 1, "cook_time_sum": 20, "cook_time_count": 1
+    })
+
+
+def test_recipe_delta_skips_missing_and_invalid_values_and_escapes_keys():
+    delta = StatsService.recipe_delta({"cuisine": "", "tags": ["a.b$", 3], "preparation_time": True})
+    assert delta == Counter({"total_recipes": 1, "tags.a%2Eb%24": 1})
+    assert StatsService.decode_key("a%2Eb%24") == "a.b$"
+
+
+def test_delete_delta_cancels_create_delta():
+    delta = StatsService.recipe_delta(RECIPE)
+    delta.update(StatsService.recipe_delta(RECIPE, -1))
+    assert not {key: value for key, value in delta.items() if value}
+
+
+def test_update_delta_only_moves_changed_counters():
+    updated = dict(RECIPE, cuisine="Indian", tags=["spicy", "curry"], cooking_time=35)
+    delta = {key: value for key, value in StatsService.update_delta(RECIPE, updated).items() if value}
+    assert delta == {
+        "cuisines.Thai": -1, "cuisines.Indian": 1, "tags.quick": -1, "tags.curry": 1, "cook_time_sum": 15
+    }
+
+
+def test_update_delta_handles_added_and_removed_times():
+    delta = StatsService.update_delta(dict(RECIPE, preparation_time=None), RECIPE)
+    assert {key: value for key, value in delta.items() if value} == {"prep_time_sum": 10, "prep_time_count": 1}
+
+
+# Comment buckets (user-007)
+
+@pytest.fixture
+def db(monkeypatch):
+    """Point the app's PyMongo at an in-memory database"""
+    mongomock = pytest.importorskip("mongomock")
+    database = mongomock.MongoClient().db
+    monkeypatch.setattr(mongo, "db", database, raising=False)
+    return database
+
+
+def embedded_comments(count):
+    return [{"username": "u", "text": f"c{i}", "date": datetime(2024, 1, 1) + timedelta(minutes=i)}
+            for i in range(count)]
+
+
+def test_page_window_positions():
+    recent = [{"text": f"c{i}"} for i in range(7, 10)]
+    # Newest page comes straight from the preview
+    comments, oldest, newest = CommentService.page_window(10, recent, 1, 3)
+    assert [comment["text"] for comment in comments] == ["c9", "c8", "c7"]
+    assert (oldest, newest) == (7, 9)
+    assert CommentService.page_window(10, recent, 2, 3) == (None, 4, 6)
+    assert CommentService.page_window(10, recent, 4, 3) == (None, 0, 0)
+    assert CommentService.page_window(10, recent, 5, 3)[0] == []
+
+
+def test_bucket_query_and_comments_from_buckets(monkeypatch):
+    monkeypatch.setattr(Config, "COMMENTS_BUCKET_SIZE", 3)
+    recipe_id = ObjectId()
+    assert CommentService.bucket_query(recipe_id, 2, 7) == {"recipe_id": recipe_id, "seq": {"$gte": 0, "$lte": 2}}
+    buckets = [{"seq": 2, "comments": [{"n": 6}, {"n": 7}]},
+               {"seq": 1, "comments": [{"n": 3}, {"n": 4}, {"n": 5}]},
+               {"seq": 0, "comments": [{"n": 0}, {"n": 1}, {"n": 2}]}]
+    assert [comment["n"] for comment in CommentService.comments_from_buckets(buckets, 2, 6)] == [6, 5, 4, 3, 2]
+
+
+def test_add_comment_migrates_embedded_comments_first(db, monkeypatch):
+    monkeypatch.setattr(Config, "COMMENTS_BUCKET_SIZE", 3)
+    recipe_id = db.recipes.insert_one({"name": "r", "comments": embedded_comments(4)}).inserted_id
+    service = CommentService()
+    assert service.add_comment(str(recipe_id), {"username": "u", "text": "new"})
+    recipe = db.recipes.find_one({"_id": recipe_id})
+    assert "comments" not in recipe and recipe["comment_count"] == 5
+    page = service.get_comments(str(recipe_id), page=1, page_size=5)["comments"]
+    assert [comment["text"] for comment in page] == ["new", "c3", "c2", "c1", "c0"]
+    assert [bucket["count"] for bucket in db.comments.find().sort("seq", 1)] == [3, 2]
+    assert service.add_comment(str(ObjectId()), {"text": "missing recipe"}) is None
+
+
+def test_migration_merges_bucketed_comments_and_is_repeatable(db, monkeypatch):
+    monkeypatch.setattr(Config, "COMMENTS_BUCKET_SIZE", 2)
+    embedded = [dict(comment, _id=ObjectId()) for comment in embedded_comments(3)]
+    late = {"_id": ObjectId(), "text": "late", "date": datetime(2024, 2, 1)}
+    recipe_id = db.recipes.insert_one({"name": "r", "comments": embedded, "comment_count": 1}).inserted_id
+    # A comment posted to the buckets directly, and an interrupted run that
+    # bucketed two embedded comments without switching the recipe over
+    db.comments.insert_many([
+        {"recipe_id": recipe_id, "seq": 0, "count": 2, "comments": [embedded[0], late]},
+        {"recipe_id": recipe_id, "seq": 1, "count": 1, "comments": [embedded[1]]}
+    ])
+    service = CommentService()
+    assert service.migrate_embedded_comments(batch_size=10) == {"recipes": 1, "comments": 4}
+    recipe = db.recipes.find_one({"_id": recipe_id})
+    assert "comments" not in recipe and recipe["comment_count"] == 4
+    texts = [comment["text"] for bucket in db.comments.find().sort("seq", 1) for comment in bucket["comments"]]
+    assert texts == ["c0", "c1", "c2", "late"]
+    assert service.migrate_embedded_comments() == {"recipes": 0, "comments": 0}
+
+
+def test_migration_retries_a_recipe_changed_after_it_was_read(db):
+    recipe_id = db.recipes.insert_one({"name": "r", "comments": embedded_comments(2)}).inserted_id
+    stale = db.recipes.find_one({"_id": recipe_id})
+    db.recipes.update_one({"_id": recipe_id}, {"$push": {"comments": embedded_comments(3)[2]}})
+    service = CommentService()
+    assert service._migrate_document(stale, []) is None
+    assert service.migrate_recipe(recipe_id) == 3
+
+
+def test_bucket_comments_stay_in_position_order(db, monkeypatch):
+    monkeypatch.setattr(Config, "COMMENTS_BUCKET_SIZE", 5)
+    recipe_id = db.recipes.insert_one({"name": "r", "comment_count": 3, "recent_comments": []}).inserted_id
+    service = CommentService()
+    # Concurrent writers can push their reserved positions out of order
+    for position in (2, 0, 1):
+        service._push_to_bucket(recipe_id, 0, [{"text": f"c{position}", "position": position}])
+    assert [comment["text"] for comment in db.comments.find_one()["comments"]] == ["c0", "c1", "c2"]
+    # Legacy buckets without positions, and positions that do not match offsets
+    buckets = [{"seq": 0, "comments": [{"text": "c0"}, {"text": "c2", "position": 2}]}]
+    assert [comment["text"] for comment in CommentService.comments_from_buckets(buckets, 1, 2)] == ["c2"]
+
+
+def test_failed_bucket_push_gives_the_position_back(db, monkeypatch):
+    from pymongo.errors import WriteError
+    recipe_id = db.recipes.insert_one({"name": "r", "comment_count": 0, "recent_comments": []}).inserted_id
+    service = CommentService()
+    assert service.add_comment(str(recipe_id), {"username": "u", "text": "kept"})
+
+    def fail(*args):
+        raise WriteError("bucket write failed")
+
+    monkeypatch.setattr(service, "_push_to_bucket", fail)
+    with pytest.raises(WriteError):
+        service.add_comment(str(recipe_id), {"username": "u", "text": "lost"})
+    recipe = db.recipes.find_one({"_id": recipe_id})
+    assert recipe["comment_count"] == 1
+    assert [comment["text"] for comment in recipe["recent_comments"]] == ["kept"]
+    assert db.comments.find_one()["comments"][0]["position"] == 0
+
+
+
+# Recommendation corpus version (user-009)
+
+def test_only_score_relevant_writes_bump_the_corpus_version(db):
+    db[Config.STATS_COLLECTION].insert_one({"_id": StatsService.SNAPSHOT_ID, "version": 1, "corpus_version": 1})
+    stats = StatsService()
+    stats.apply_delta(StatsService.update_delta(RECIPE, dict(RECIPE, cooking_time=45)))
+    assert (stats.get_version(), stats.get_corpus_version()) == (2, 1)
+    stats.apply_delta(StatsService.update_delta(RECIPE, dict(RECIPE, tags=["spicy"])))
+    assert (stats.get_version(), stats.get_corpus_version()) == (3, 2)
+    stats.apply_delta(StatsService.recipe_delta(RECIPE, -1))
+    assert stats.get_corpus_version() == 3
+    assert not stats.apply_delta(StatsService.update_delta(RECIPE, dict(RECIPE)))
+
+
+# Similarity index (user-010)
+
+def similarity_entries():
+    ids = [ObjectId() for _ in range(6)]
+    return ids, [
+        (ids[0], ["spicy", "quick", "common"], "Thai"),
+        (ids[1], ["spicy", "quick", "common"], "Indian"),
+        (ids[2], ["spicy", "common"], "Thai"),
+        (ids[3], ["common"], "Thai"),
+        (ids[4], ["common"], None),
+        (ids[5], ["quick"], "Mexican"),
+    ]
+
+
+def loaded_index(entries, **options):
+    index = SimilarityIndex(**options)
+    index._loaded_at = index._rebuilt_at = time.monotonic()
+    index.add_many(entries)
+    return index
+
+
+def test_similarity_scores_shared_tags_plus_cuisine():
+    ids, entries = similarity_entries()
+    index = loaded_index(entries)
+    assert index.similar(ids[0], ["spicy", "quick", "common"], "Thai", 3) == [ids[2], ids[1], ids[3]]
+    index.remove(ids[2])
+    assert index.similar(ids[0], ["spicy", "quick", "common"], "Thai", 2) == [ids[1], ids[3]]
+    assert SimilarityIndex().similar(ids[0], ["spicy"], None, 3) is None
+
+
+def test_similarity_long_postings_only_rescore_candidates():
+    ids, entries = similarity_entries()
+    index = loaded_index(entries, postings_cap=3)
+    # "common" (5 recipes) is over the cap: it is only probed, so the
+    # candidates found through the other lists keep their exact scores
+    assert index.similar(ids[0], ["spicy", "quick", "common"], "Thai", 3) == [ids[2], ids[1], ids[3]]
+    assert index.similar(ids[0], ["common"], "Mexican", 1) == [ids[5]]
+    # Too few candidates from the short lists: the long ones are sampled
+    assert set(index.similar(ids[4], ["common"], None, 3)) <= set(ids[:4])
+
+
+def test_similarity_refresh_reads_only_recent_updates(db):
+    ids, entries = similarity_entries()
+    now = datetime.utcnow().replace(microsecond=0)
+    db.recipes.insert_many([{"_id": recipe_id, "tags": tags, "cuisine": cuisine, "updated_at": now - timedelta(days=1)}
+                            for recipe_id, tags, cuisine in entries])
+    index = SimilarityIndex(ttl=60, rebuild_interval=3600)
+    index.warm(db.recipes, background=False)
+    assert index.similar(ids[3], ["common"], "Thai", 1) == [ids[2]]
+    db.recipes.update_one({"_id": ids[4]}, {"$set": {"cuisine": "Thai", "updated_at": now}})
+    db.recipes.update_one({"_id": ids[5]}, {"$set": {"cuisine": "Thai", "updated_at": now - timedelta(days=2)}})
+    index._loaded_at -= 61
+    index.warm(db.recipes, background=False)
+    assert index._recipes[ids[4]][1] == "Thai"
+    # Stamped before the last sync, so the refresh does not see it
+    assert index._recipes[ids[5]][1] == "Mexican"
+    assert index._synced_to == now
+
+
+# Command monitoring (user-025)
+
+def test_query_shape_hides_literals_and_collapses_repeated_items():
+    shape = query_shape({"cuisine": "Thai", "tags": {"$in": ["a", "b", "c"]},
+                         "$or": [{"a": 1}, {"a": 2}, {"b": {"$gt": 3}}]})
+    assert shape == {"cuisine": "?", "tags": {"$in": ["?"]}, "$or": [{"a": "?"}, {"b": {"$gt": "?"}}]}
+
+
+def test_command_shape_keeps_the_collection_and_filter_keys():
+    command = {"find": "recipes", "filter": {"_id": ObjectId()}, "limit": 1, "lsid": {"id": "x"}}
+    assert command_shape("find", command) == {"command": "find", "collection": "recipes", "filter": {"_id": "?"}}
+    pipeline = {"aggregate": "recipes", "pipeline": [{"$match": {"a": 1}}, {"$limit": 5}], "cursor": {}}
+    assert command_shape("aggregate", pipeline)["pipeline"] == [{"$match": {"a": "?"}}, {"$limit": "?"}]
+
+
+def test_command_stats_and_endpoint_totals():
+    stats = CommandStats()
+    stats.add(1.5, 10, 100)
+    stats.add(2.0, 0, 0, failed=True)
+    summary = stats.as_dict()
+    assert summary == {"commands": 2, "failed": 1, "duration_ms": 3.5, "documents": 10, "bytes": 100}
+    endpoints = EndpointStats()
+    endpoints.add("recipe.list_recipes", summary)
+    endpoints.add("recipe.list_recipes", CommandStats().as_dict())
+    totals = endpoints.snapshot()["recipe.list_recipes"]
+    assert totals["requests"] == 2 and totals["max_commands"] == 2
+    assert totals["commands_per_request"] == 1.0 and totals["ms_per_request"] == 1.75
+
+
+# Faceted listing (user-014)
+
+def test_facet_counts_are_cached_until_the_stats_version_changes(db):
+    from app.services.recipe_service import RecipeService
+    db.recipes.insert_many([dict(RECIPE, cuisine=cuisine) for cuisine in ("Thai", "Thai", "Greek")])
+    service = RecipeService()
+    service.facet_cache.clear()
+    facets = service.get_facets(filters={"cuisine": "Thai"})
+    # The cuisine facet ignores its own filter; the others apply it
+    assert facets["cuisines"] == [{"_id": "Thai", "count": 2}, {"_id": "Greek", "count": 1}]
+    assert facets["difficulties"] == [{"_id": "Easy", "count": 2}]
+    assert [bucket["count"] for bucket in facets["cooking_time"]] == [0, 2, 2, 2]
+    db.recipes.insert_one(dict(RECIPE, cuisine="Greek"))
+    assert service.get_facets(filters={"cuisine": "Thai"}) == facets
+    service.stats.apply_delta(StatsService.recipe_delta(dict(RECIPE, cuisine="Greek")))
+    assert service.get_facets(filters={"cuisine": "Thai"})["cuisines"] == [
+        {"_id": "Greek", "count": 2}, {"_id": "Thai", "count": 2}
+    ]
+
+
+# NDJSON import (user-021)
+
+@pytest.fixture
+def app_context(monkeypatch):
+    from app import create_app
+    database = getattr(mongo, "db", None)
+    app = create_app('testing')
+    # create_app points PyMongo at TEST_MONGODB_URI; keep any in-memory database
+    monkeypatch.setattr(mongo, "db", database, raising=False)
+    with app.app_context():
+        yield
+
+
+def ndjson_record(**overrides):
+    record = {"name": "Pad Thai", "ingredients": [{"name": "noodles", "quantity": "200 g"}],
+              "instructions": ["Soak", "Fry"], "cuisine": "Thai", "difficulty": "Medium", "tags": ["dinner"]}
+    record.update(overrides)
+    return json.dumps(record)
+
+
+@pytest.mark.parametrize("line, message", [
+    ("{not json", "invalid JSON"),
+    ("[1, 2]", "record must be a JSON object"),
+    (ndjson_record(rating=5), "unexpected field 'rating'"),
+    (ndjson_record(cooking_time="ten"), "'cooking_time' must be a number"),
+    (ndjson_record(tags="dinner"), "'tags' must be an array of strings"),
+    (ndjson_record(nutritional_info=[]), "'nutritional_info' must be an object"),
+])
+def test_parse_record_rejects_invalid_lines(app_context, line, message):
+    doc, messages = IngestService.parse_record(line)
+    assert doc is None
+    assert any(item.startswith(message) for item in messages)
+
+
+def test_parse_record_derives_a_stable_id(app_context):
+    user_id, other_user_id = str(ObjectId()), str(ObjectId())
+    first, _ = IngestService.parse_record(ndjson_record(), user_id)
+    again, _ = IngestService.parse_record(ndjson_record(), user_id)
+    other, _ = IngestService.parse_record(ndjson_record(), other_user_id)
+    assert isinstance(first["_id"], ObjectId)
+    assert first["_id"] == again["_id"] != other["_id"]
+    explicit_id = ObjectId()
+    assert IngestService.parse_record(ndjson_record(_id=str(explicit_id)))[0]["_id"] == explicit_id
+
+
+def test_ingest_checkpoints_runs_of_rejected_lines(app_context, db):
+    batches = list(IngestService().ingest(["{bad"] * 5, batch_size=2))
+    assert [batch["checkpoint"] for batch in batches] == [2, 4, 5]
+    assert [batch["failed"] for batch in batches] == [2, 2, 1]
+    assert db.recipes.count_documents({}) == 0
+
+
+def test_ingest_replay_does_not_duplicate_records(app_context, db):
+    lines = [ndjson_record(name=f"Recipe {i}") for i in range(3)]
+    service = IngestService()
+    assert sum(batch["inserted"] for batch in service.ingest(lines, batch_size=2)) == 3
+    replayed = list(service.ingest(lines, start_line=1, batch_size=2))
+    assert sum(batch["existing"] for batch in replayed) == 2
+    assert sum(batch["inserted"] + batch["failed"] for batch in replayed) == 0
+    assert db.recipes.count_documents({}) == 3
+
+
+# Recipe cache (user-011)
+
+def test_cached_recipe_is_refetched_when_the_validators_changed(db):
+    from app.services.recipe_service import RecipeService
+    service = RecipeService()
+    recipe_id = db.recipes.insert_one(dict(RECIPE, name="Old", updated_at=datetime(2024, 1, 1))).inserted_id
+    assert service.get_recipe_by_id(str(recipe_id)).name == "Old"
+    # Written by another worker, so this process's cache is not invalidated
+    db.recipes.update_one({"_id": recipe_id}, {"$set": {"name": "New", "updated_at": datetime(2024, 1, 2)}})
+    assert service.get_recipe_by_id(str(recipe_id)).name == "Old"
+    validators = service.get_recipe_validators(str(recipe_id))
+    assert service.get_recipe_by_id(str(recipe_id), validators=validators).name == "New"
+    assert service.get_recipe_by_id(str(recipe_id)).name == "New"
+
+
+# User comment counters (user-008)
+
+def test_record_comment_counts_and_keeps_the_latest_date(db):
+    from app.services.user_service import UserService
+    user_id = db.users.insert_one({"username": "cook"}).inserted_id
+    service = UserService()
+    assert service.record_comment(str(user_id), datetime(2024, 1, 2))
+    assert service.record_comment(user_id, datetime(2024, 1, 1))
+    user = db.users.find_one({"_id": user_id})
+    assert user["comment_count"] == 2 and user["last_comment_at"] == datetime(2024, 1, 2)
+
+
+def test_adjust_comment_counts_skips_invalid_ids_and_zero_deltas(db):
+    from app.services.user_service import UserService
+    first, second = db.users.insert_many([{"comment_count": 5}, {"comment_count": 1}]).inserted_ids
+    assert UserService().adjust_comment_counts({str(first): -2, second: 0, "not-an-id": -1}) == 1
+    assert [user["comment_count"] for user in db.users.find().sort("_id", 1)] == [3, 1]
+    assert UserService().adjust_comment_counts({}) == 0
+
+
+def test_rebuild_comment_counts_corrects_drift(db):
+    from app.services.user_service import UserService
+    drifted, idle = db.users.insert_many([
+        {"comment_count": 40, "last_comment_at": datetime(2020, 1, 1)},
+        {"comment_count": 3, "last_comment_at": datetime(2020, 1, 1)}
+    ]).inserted_ids
+    db[Config.COMMENTS_COLLECTION].insert_many([
+        {"recipe_id": ObjectId(), "seq": 0, "comments": [
+            {"user_id": drifted, "date": datetime(2024, 1, 1)},
+            # Older comments stored the author as a string id
+            {"user_id": str(drifted), "date": datetime(2024, 3, 1)}
+        ]},
+        {"recipe_id": ObjectId(), "seq": 0, "comments": [{"user_id": drifted, "date": datetime(2024, 2, 1)}]}
+    ])
+    UserService().rebuild_comment_counts(batch_size=1)
+    users = {user["_id"]: user for user in db.users.find()}
+    assert users[drifted]["comment_count"] == 3
+    assert users[drifted]["last_comment_at"] == datetime(2024, 3, 1)
+    assert users[idle]["comment_count"] == 0 and users[idle]["last_comment_at"] is None
+
+
+# Recipe ratings (user-001)
+
+@pytest.fixture
+def live_db(monkeypatch):
+    """The test MongoDB; rate_recipe's pipeline update is beyond mongomock"""
+    from pymongo import MongoClient
+    from pymongo.errors import PyMongoError
+    from app.config import TestingConfig
+    client = MongoClient(TestingConfig.MONGO_URI, serverSelectionTimeoutMS=500)
+    try:
+        client.admin.command("ping")
+    except PyMongoError:
+        pytest.skip("no MongoDB at TEST_MONGODB_URI")
+    database = client.get_default_database()
+    database[Config.RECIPES_COLLECTION].drop()
+    monkeypatch.setattr(mongo, "db", database, raising=False)
+    yield database
+    database[Config.RECIPES_COLLECTION].drop()
+    client.close()
+
+
+def test_rating_maintains_the_aggregates(live_db):
+    from app.services.recipe_service import RecipeService
+    service = RecipeService()
+    recipe_id = str(live_db.recipes.insert_one(dict(RECIPE)).inserted_id)
+    first_user, second_user = str(ObjectId()), str(ObjectId())
+    prior = Config.RATING_PRIOR_MEAN * Config.RATING_PRIOR_WEIGHT
+    assert service.rate_recipe(recipe_id, first_user, 5) == {
+        "average_rating": 5, "ratings_count": 1, "weighted_rating": (prior + 5) / (Config.RATING_PRIOR_WEIGHT + 1)
+    }
+    # A second rating by the same user replaces the first
+    assert service.rate_recipe(recipe_id, first_user, 3)["ratings_count"] == 1
+    result = service.rate_recipe(recipe_id, second_user, 4)
+    assert result["ratings_count"] == 2 and result["average_rating"] == 3.5
+    assert result["weighted_rating"] == (prior + 7) / (Config.RATING_PRIOR_WEIGHT + 2)
+    stored = live_db.recipes.find_one({"_id": ObjectId(recipe_id)})
+    assert sorted((str(rating["user_id"]), rating["rating"]) for rating in stored["user_ratings"]) == \
+        sorted([(first_user, 3), (second_user, 4)])
+    assert service.get_recipe_by_id(recipe_id).average_rating == 3.5
+
+
+def test_rating_an_unknown_recipe_returns_none(live_db):
+    from app.services.recipe_service import RecipeService
+    assert RecipeService().rate_recipe(str(ObjectId()), str(ObjectId()), 4) is None
+
+
+# Request identity map (user-017)
+
+def identity_map_stats():
+    from app.services.identity_map import current_identity_map
+    return current_identity_map().stats()
+
+
+def test_identity_map_returns_one_instance_per_request():
+    from flask import Flask
+    from app.services.cache import make_cache
+    cache = make_cache('identity-test')
+    key = str(ObjectId())
+    cache.set(key, {"_id": key, "name": "Soup"})
+    # The backend decodes a fresh copy on every lookup
+    assert cache.get(key) is not cache.get(key)
+    app = Flask(__name__)
+    with app.test_request_context():
+        first = cache.get(key)
+        assert cache.get(key) is first
+        assert identity_map_stats() == {"loads": 1, "hits": 1}
+    with app.test_request_context():
+        second = cache.get(key)
+        assert second == first and second is not first
+        assert identity_map_stats() == {"loads": 1, "hits": 0}
+
+
+def test_identity_map_drops_deleted_documents():
+    from flask import Flask
+    from app.services.cache import make_cache
+    cache = make_cache('identity-test')
+    key = str(ObjectId())
+    cache.set(key, {"_id": key})
+    with Flask(__name__).test_request_context():
+        assert cache.get(key) is not None
+        cache.delete(key)
+        assert cache.get(key) is None
+
+
+# Concurrent service calls (user-016)
+
+REQUEST_TAG = contextvars.ContextVar("request_tag")
+
+
+def test_run_concurrently_keeps_order_and_context():
+    from flask import Flask, g, request
+    from app.services.concurrency import run_concurrently
+    REQUEST_TAG.set("caller")
+    with Flask(__name__).test_request_context('/recipes/'):
+        g.user = "cook"
+        results = run_concurrently(
+            lambda: (REQUEST_TAG.get(), threading.current_thread().name),
+            lambda: request.path,
+            lambda: g.user
+        )
+    tag, thread_name = results[0]
+    assert tag == "caller" and thread_name.startswith("query")
+    assert results[1:] == ["/recipes/", "cook"]
+
+
+def test_run_concurrently_reraises_after_every_call_finished():
+    from app.services.concurrency import run_concurrently
+    finished = []
+
+    def fail():
+        raise ValueError("boom")
+
+    def slow():
+        time.sleep(0.05)
+        finished.append(True)
+
+    with pytest.raises(ValueError, match="boom"):
+        run_concurrently(fail, slow)
+    assert finished == [True]
+
+
+def test_nested_run_concurrently_runs_inline():
+    from app.services.concurrency import run_concurrently
+
+    def nested():
+        return run_concurrently(lambda: threading.current_thread().name, lambda: threading.current_thread().name)
+
+    outer, inner = run_concurrently(lambda: threading.current_thread().name, nested)
+    assert inner[0] == inner[1] and inner[0].startswith("query")
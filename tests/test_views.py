@@ -0,0 +1,128 @@
+from datetime import datetime
+import pytest
+from bson import ObjectId
+from app import create_app, mongo
+from app.services.recipe_service import RecipeService
+
+
+@pytest.fixture
+def db(monkeypatch):
+    """Point the app's PyMongo at an in-memory database"""
+    mongomock = pytest.importorskip("mongomock")
+    database = mongomock.MongoClient().db
+    monkeypatch.setattr(mongo, "db", database, raising=False)
+    return database
+
+
+@pytest.fixture
+def client(db, monkeypatch):
+    app = create_app('testing')
+    # create_app points PyMongo at TEST_MONGODB_URI; keep the in-memory database
+    monkeypatch.setattr(mongo, "db", db)
+    return app.test_client()
+
+
+@pytest.fixture
+def recipe_id(db):
+    return str(db.recipes.insert_one({
+        "name": "Old Name", "ingredients": [{"name": "rice", "quantity": "1 cup"}], "instructions": ["Boil"],
+        "cuisine": "Thai", "difficulty": "Easy", "tags": ["quick"], "preparation_time": 5, "cooking_time": 10,
+        "comment_count": 0, "recent_comments": [],
+        "created_at": datetime(2024, 1, 1), "updated_at": datetime(2024, 1, 1)
+    }).inserted_id)
+
+
+def sign_in(client, db):
+    user_id = str(db.users.insert_one({"username": "cook", "email": "cook@example.com",
+                                       "favorite_recipes": []}).inserted_id)
+    with client.session_transaction() as session:
+        session['user_id'] = user_id
+    return user_id
+
+
+# Conditional GET (user-012)
+
+def test_recipe_page_revalidates_with_304(client, recipe_id):
+    response = client.get(f'/recipes/{recipe_id}')
+    assert response.status_code == 200 and response.headers['ETag'].startswith('W/')
+    assert response.headers['Last-Modified'] and 'no-cache' in response.headers['Cache-Control']
+    revalidated = client.get(f'/recipes/{recipe_id}', headers={'If-None-Match': response.headers['ETag']})
+    assert revalidated.status_code == 304 and revalidated.headers['ETag'] == response.headers['ETag']
+    since = client.get(f'/recipes/{recipe_id}', headers={'If-Modified-Since': response.headers['Last-Modified']})
+    assert since.status_code == 304
+
+
+def test_recipe_etag_changes_after_an_update(client, recipe_id):
+    etag = client.get(f'/recipes/{recipe_id}').headers['ETag']
+    RecipeService().update_recipe(recipe_id, {"name": "New Name"})
+    response = client.get(f'/recipes/{recipe_id}', headers={'If-None-Match': etag})
+    assert response.status_code == 200 and response.headers['ETag'] != etag
+    assert b'New Name' in response.data
+
+
+def test_recipe_page_is_never_stale_under_a_new_etag(client, db, recipe_id):
+    etag = client.get(f'/recipes/{recipe_id}').headers['ETag']
+    # Written by another worker, so this process's recipe cache is not invalidated
+    db.recipes.update_one({"_id": ObjectId(recipe_id)},
+                          {"$set": {"name": "New Name", "updated_at": datetime(2024, 1, 2)}})
+    response = client.get(f'/recipes/{recipe_id}', headers={'If-None-Match': etag})
+    assert response.status_code == 200 and response.headers['ETag'] != etag
+    assert b'New Name' in response.data and b'Old Name' not in response.data
+
+
+def test_recipe_etag_changes_after_a_new_comment(client, db, recipe_id):
+    sign_in(client, db)
+    etag = client.get(f'/recipes/{recipe_id}').headers['ETag']
+    posted = client.post(f'/recipes/{recipe_id}/comments', json={"text": "Lovely"},
+                         headers={'Accept': 'application/json'})
+    assert posted.status_code == 200
+    response = client.get(f'/recipes/{recipe_id}', headers={'If-None-Match': etag})
+    assert response.status_code == 200 and response.headers['ETag'] != etag
+    assert b'Lovely' in response.data
+
+
+def test_signed_in_pages_stay_out_of_shared_caches(client, db, recipe_id):
+    sign_in(client, db)
+    response = client.get(f'/recipes/{recipe_id}')
+    assert 'private' in response.headers['Cache-Control'] and 'Cookie' in response.headers['Vary']
+
+
+# Favorites paging (user-006)
+
+@pytest.mark.parametrize("page", ["abc", "0", "-3"])
+def test_favorites_clamps_invalid_pages(client, db, page):
+    sign_in(client, db)
+    assert client.get(f'/users/favorites?page={page}').status_code == 200
+
+
+# JSON provider (user-018)
+
+@pytest.fixture(params=["orjson", "json"])
+def json_app(request, monkeypatch):
+    from app import json_provider
+    if request.param == "json":
+        monkeypatch.setattr(json_provider, "orjson", None)
+    elif json_provider.orjson is None:
+        pytest.skip("orjson is not installed")
+    app = create_app('testing')
+    with app.app_context():
+        yield app
+
+
+def test_json_provider_encodes_mongo_types(json_app):
+    from bson import Decimal128
+    doc_id = ObjectId()
+    payload = {"_id": doc_id, "created_at": datetime(2024, 1, 2, 3, 4, 5), "price": Decimal128("1.10"),
+               "name": "Crème brûlée"}
+    expected = {"_id": str(doc_id), "created_at": "2024-01-02T03:04:05", "price": "1.10", "name": "Crème brûlée"}
+    assert json_app.json.loads(json_app.json.dumps(payload)) == expected
+    assert json_app.json.loads(json_app.json.dumps_bytes(payload)) == expected
+    with json_app.test_request_context():
+        from flask import jsonify
+        response = jsonify(payload)
+    assert response.mimetype == 'application/json' and response.get_json() == expected
+
+
+def test_json_provider_rejects_unknown_types(json_app):
+    with pytest.raises(TypeError):
+        json_app.json.dumps({"value": object()})